@@ -0,0 +1,311 @@
+#! /usr/bin/env python2.7
+
+# xinput-ui benchmarks
+# Measures how refreshing and planning scale with the number of devices,
+# without an X server: a stub xinput is put first on $PATH that prints a
+# synthetic "xinput list" for each scenario and accepts every other
+# command. Results are printed as JSON and checked against thresholds.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import timeit
+
+# Must happen before xinputui is imported: the stub is found through $PATH,
+# and XInput2 would bypass it.
+os.environ["XINPUT_UI_BACKEND"] = "xinput"
+
+sys.path.insert (0, os.path.join (os.path.dirname (os.path.abspath (__file__)), os.pardir))
+
+from xinputui.devices import read_raw_device_data, get_device_status
+from xinputui.commands import CommandExecutor
+from xinputui.plan import Plan
+
+DEFAULT_THRESHOLDS = os.path.join (os.path.dirname (os.path.abspath (__file__)), "thresholds.json")
+
+# (devices, masters) pairs; devices counts slaves only
+SCENARIOS = [(10, 1), (100, 1), (100, 10), (500, 10), (500, 100), (2000, 10), (2000, 100)]
+
+STUB = """#!/bin/sh
+case "$1$2" in
+    list--short) exec grep -v "^	" "$XINPUT_BENCH_LIST" ;;
+    list*) exec cat "$XINPUT_BENCH_LIST" ;;
+    *) exit 0 ;;
+esac
+"""
+
+def make_listing (devices, masters):
+    
+    """Synthetic "xinput list --long" output.
+    
+    There are that many master pairs, the first being the virtual core one,
+    each with an XTEST pointer and keyboard that get filtered out. The
+    slaves are spread evenly over all the masters, with every tenth one
+    floating; a third of them are keyboards. Pointers report buttons and
+    valuators, keyboards keys, so floating slaves can be told apart as they
+    would be in a real session.
+    
+    """
+    
+    lines = []
+    next_id = [2]
+    
+    def new_id ():
+        next_id[0] += 1
+        return next_id[0] - 1
+    
+    def device (name, device_id, kind, classes):
+        lines.append ("\xe2\x8e\x9c   \xe2\x86\xb3 %-40s\tid=%d\t[%s]" % (name, device_id, kind))
+        if len (classes):
+            lines.append ("\tReporting %d classes:" % len (classes))
+            for cls in classes:
+                lines.append ("\t\tClass originated from: %d. Type: %s" % (device_id, cls))
+    
+    pairs = []
+    for m in range (masters):
+        name = "Virtual core" if m == 0 else "Master %d" % m
+        pointer_id = new_id ()
+        keyboard_id = new_id ()
+        pairs.append ((pointer_id, keyboard_id))
+        device (name+" pointer", pointer_id, "master pointer  (%d)" % keyboard_id, [])
+        device (name+" keyboard", keyboard_id, "master keyboard (%d)" % pointer_id, [])
+        device (name+" XTEST pointer", new_id (), "slave  pointer  (%d)" % pointer_id, ["XIButtonClass"])
+        device (name+" XTEST keyboard", new_id (), "slave  keyboard (%d)" % keyboard_id, ["XIKeyClass"])
+    
+    for d in range (devices):
+        keyboard = d % 3 == 2
+        if keyboard:
+            classes = ["XIKeyClass"]
+        else:
+            classes = ["XIButtonClass", "XIValuatorClass"]
+        pointer_id, keyboard_id = pairs[d % masters]
+        if d % 10 == 9:
+            kind = "floating slave"
+        elif keyboard:
+            kind = "slave  keyboard (%d)" % keyboard_id
+        else:
+            kind = "slave  pointer  (%d)" % pointer_id
+        device ("Input device %d" % d, new_id (), kind, classes)
+    
+    return "\n".join (lines)+"\n"
+
+def measure (func, setup = None, repeat = 5):
+    
+    """Run func repeat times, returns (min, median) in milliseconds.
+    
+    setup, if given, is called before each run, outside the timing, and
+    its result is passed to func.
+    
+    """
+    
+    times = []
+    for _ in range (repeat):
+        arg = setup () if setup is not None else None
+        start = timeit.default_timer ()
+        func (arg) if setup is not None else func ()
+        times.append ((timeit.default_timer () - start) * 1000.0)
+    times.sort ()
+    return times[0], times[len (times) // 2]
+
+def loaded_plan ():
+    plan = Plan ()
+    plan.Load (get_device_status ())
+    return plan
+
+def slaves_of (plan):
+    slaves = []
+    for master in plan.master_devices.values ():
+        if master != plan.floating_group:
+            slaves.extend (master.children)
+    return slaves
+
+def drag_one (plan):
+    
+    """A single drag and drop, which is what the GUI does per user action."""
+    
+    slave = slaves_of (plan)[0]
+    plan.MoveDeviceCmd (slave, plan.floating_group)
+
+def drag_all (plan):
+    
+    """A multi-selection drag of every attached slave to one master."""
+    
+    slaves = slaves_of (plan)
+    target = [m for m in plan.master_devices.values () if m.self_id == 2][0]
+    plan.MoveDevicesCmd (slaves, target)
+
+def reload (args):
+    
+    """Reloading after applying: every slave was moved, and nothing else."""
+    
+    plan, master_devices = args
+    plan.Reload (master_devices)
+
+def dragged_all ():
+    plan = loaded_plan ()
+    drag_all (plan)
+    return plan, get_device_status ()
+
+def planned_float_all ():
+    plan = loaded_plan ()
+    plan.DetachDevicesCmd (slaves_of (plan))
+    return plan.all_commands
+
+def run_scenario (devices, masters, repeat, apply_limit):
+    
+    timings = {}
+    
+    def record (name, result):
+        timings[name] = {"min_ms": round (result[0], 3), "median_ms": round (result[1], 3)}
+    
+    record ("read_raw_device_data", measure (read_raw_device_data, repeat = repeat))
+    record ("get_device_status", measure (get_device_status, repeat = repeat))
+    record ("regenerate", measure (lambda master_devices: Plan ().Load (master_devices),
+                                   get_device_status, repeat))
+    record ("drag_one", measure (drag_one, loaded_plan, repeat))
+    record ("drag_all", measure (drag_all, loaded_plan, repeat))
+    record ("reload", measure (reload, dragged_all, repeat))
+    
+    if devices <= apply_limit:
+        executor = CommandExecutor ()
+        record ("apply", measure (executor.run, planned_float_all, repeat = min (repeat, 3)))
+    
+    return timings
+
+def scenario_key (devices, masters):
+    return "%dx%d" % (devices, masters)
+
+def check (results, thresholds, baseline, tolerance):
+    
+    """Returns a list of regressions, as human-readable strings.
+    
+    thresholds maps an operation to {scenario key: ceiling in ms}, and
+    baseline is the results of an earlier run, whose medians may be
+    exceeded by at most the given factor.
+    
+    """
+    
+    regressions = []
+    
+    previous = {}
+    if baseline is not None:
+        for entry in baseline["results"]:
+            previous[entry["scenario"]] = entry["timings"]
+    
+    for entry in results:
+        key = entry["scenario"]
+        for op, timing in sorted (entry["timings"].iteritems ()):
+            ceiling = thresholds.get (op, {}).get (key)
+            if ceiling is not None and timing["median_ms"] > ceiling:
+                regressions.append ("%s %s: %.1f ms, threshold %.1f ms" % (op, key, timing["median_ms"], ceiling))
+            old = previous.get (key, {}).get (op)
+            if old is not None and timing["median_ms"] > old["median_ms"] * tolerance:
+                regressions.append ("%s %s: %.1f ms, baseline %.1f ms" % (op, key, timing["median_ms"], old["median_ms"]))
+    
+    return regressions
+
+def run_synthetic (args):
+    
+    """Run every scenario against the stub xinput."""
+    
+    results = []
+    
+    stub_dir = tempfile.mkdtemp (prefix = "xinput-bench-")
+    try:
+        stub = os.path.join (stub_dir, "xinput")
+        with open (stub, "w") as f:
+            f.write (STUB)
+        os.chmod (stub, 0755)
+        os.environ["PATH"] = stub_dir+os.pathsep+os.environ.get ("PATH", "")
+        listing = os.path.join (stub_dir, "list.txt")
+        os.environ["XINPUT_BENCH_LIST"] = listing
+        
+        for devices, masters in SCENARIOS:
+            if args.quick and devices > 100:
+                continue
+            with open (listing, "w") as f:
+                f.write (make_listing (devices, masters))
+            sys.stderr.write ("%s...\n" % scenario_key (devices, masters))
+            results.append ({
+                "scenario": scenario_key (devices, masters),
+                "devices": devices,
+                "masters": masters,
+                "timings": run_scenario (devices, masters, args.repeat, args.apply_limit),
+            })
+    finally:
+        shutil.rmtree (stub_dir)
+    
+    return results
+
+def run_replay (args):
+    
+    """Run the same measurements against a recorded session."""
+    
+    os.environ["XINPUT_UI_REPLAY"] = args.transcript
+    
+    master_devices = get_device_status ()
+    devices = sum (len (master.children) for master in master_devices.values ())
+    masters = len (master_devices) - 1 # not counting the floating group
+    
+    return [{
+        "scenario": "replay",
+        "devices": devices,
+        "masters": masters,
+        "timings": run_scenario (devices, masters, args.repeat, args.apply_limit),
+    }]
+
+def main ():
+    
+    parser = argparse.ArgumentParser (description = "Time refreshing and planning against a stub xinput.")
+    parser.add_argument ("--repeat", type = int, default = 5,
+                         help = "runs per measurement; the median is reported")
+    parser.add_argument ("--quick", action = "store_true",
+                         help = "only the scenarios with at most 100 devices")
+    parser.add_argument ("--apply-limit", type = int, default = 500, metavar = "N",
+                         help = "skip timing apply above N devices (it forks once per command)")
+    parser.add_argument ("--thresholds", default = DEFAULT_THRESHOLDS, metavar = "FILE",
+                         help = "JSON file of ceilings in ms (default: %(default)s)")
+    parser.add_argument ("--baseline", type = argparse.FileType ("r"), metavar = "FILE",
+                         help = "earlier output to compare against")
+    parser.add_argument ("--tolerance", type = float, default = 1.5,
+                         help = "how many times slower than the baseline counts as a regression")
+    parser.add_argument ("--transcript", metavar = "FILE",
+                         help = "time a recorded session (see XINPUT_UI_RECORD) instead")
+    parser.add_argument ("-o", "--output", type = argparse.FileType ("w"), default = sys.stdout,
+                         metavar = "FILE", help = "where to write the JSON results")
+    args = parser.parse_args ()
+    
+    with open (args.thresholds) as f:
+        thresholds = json.load (f)
+    baseline = json.load (args.baseline) if args.baseline is not None else None
+    
+    if args.transcript is not None:
+        results = run_replay (args)
+    else:
+        results = run_synthetic (args)
+    
+    regressions = check (results, thresholds, baseline, args.tolerance)
+    
+    json.dump ({
+        "python": platform.python_version (),
+        "platform": platform.platform (),
+        "repeat": args.repeat,
+        "results": results,
+        "regressions": regressions,
+    }, args.output, indent = 1, sort_keys = True)
+    args.output.write ("\n")
+    
+    for regression in regressions:
+        sys.stderr.write ("REGRESSION: "+regression+"\n")
+    
+    return 1 if len (regressions) else 0
+
+if __name__ == "__main__":
+    sys.exit (main ())
@@ -0,0 +1,127 @@
+# xinput-ui test support
+# The tests run without an X server: a stub xinput is put first on $PATH
+# that prints whatever device list the test asked for with use_devices,
+# logs how it was run, and accepts every other command. Each $DISPLAY can
+# have a device list of its own.
+#
+# Run the tests with "python2.7 -m unittest discover tests" from the top
+# directory.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+STUB = """#!/bin/sh
+echo "$@" >> "$XINPUT_TEST_LOG"
+list="$XINPUT_TEST_LIST$DISPLAY"
+[ -f "$list" ] || list="$XINPUT_TEST_LIST"
+case "$1$2$3" in
+    list--short) exec grep -v "^	" "$list" ;;
+    list--long?*) exec awk -v id="$3" '/^[^\\t]/ { found = index ($0, "\\tid=" id "\\t") } found' "$list" ;;
+    list*) exec cat "$list" ;;
+    *) exit 0 ;;
+esac
+"""
+POINTER_CLASSES = ["XIButtonClass", "XIValuatorClass"]
+KEYBOARD_CLASSES = ["XIKeyClass"]
+
+# (name, id, kind, classes), as "xinput list --long" shows them. The two
+# mice have the same name, and one device has a name that looks like the
+# fields after it.
+DEVICES = [
+    ("Virtual core pointer", 2, "master pointer  (3)", []),
+    ("Virtual core keyboard", 3, "master keyboard (2)", []),
+    ("Virtual core XTEST pointer", 4, "slave  pointer  (2)", POINTER_CLASSES),
+    ("Virtual core XTEST keyboard", 5, "slave  keyboard (3)", KEYBOARD_CLASSES),
+    ("Logitech USB Optical Mouse", 6, "slave  pointer  (2)", POINTER_CLASSES),
+    ("AT Translated Set 2 keyboard", 7, "slave  keyboard (3)", KEYBOARD_CLASSES),
+    ("Weird id=12 [slave  pointer  (9)]", 8, "slave  pointer  (2)", POINTER_CLASSES),
+    ("Second pointer", 9, "master pointer  (10)", []),
+    ("Second keyboard", 10, "master keyboard (9)", []),
+    ("Second XTEST pointer", 11, "slave  pointer  (9)", POINTER_CLASSES),
+    ("Second XTEST keyboard", 12, "slave  keyboard (10)", KEYBOARD_CLASSES),
+    ("Wacom tablet", 13, "floating slave", POINTER_CLASSES),
+    ("USB Keyboard", 14, "floating slave", KEYBOARD_CLASSES),
+    ("Logitech USB Optical Mouse", 15, "slave  pointer  (9)", POINTER_CLASSES),
+]
+
+_stub_dir = tempfile.mkdtemp (prefix = "xinput-ui-tests.")
+atexit.register (shutil.rmtree, _stub_dir, True)
+
+with open (os.path.join (_stub_dir, "xinput"), "w") as f:
+    f.write (STUB)
+os.chmod (os.path.join (_stub_dir, "xinput"), 0o755)
+
+os.environ["PATH"] = _stub_dir + os.pathsep + os.environ.get ("PATH", os.defpath)
+os.environ["XINPUT_TEST_LIST"] = os.path.join (_stub_dir, "list")
+os.environ["XINPUT_TEST_LOG"] = os.path.join (_stub_dir, "log")
+
+# XInput2 would bypass the stub, and talk to whatever X server is running
+os.environ["XINPUT_UI_BACKEND"] = "xinput"
+
+# the xinputui package, from the top directory
+sys.path.insert (0, os.path.join (os.path.dirname (os.path.abspath (__file__)), os.pardir))
+
+from xinputui.devices import get_metadata_cache
+
+def make_listing (devices = DEVICES):
+    
+    """"xinput list --long" output for a list like DEVICES."""
+    
+    lines = []
+    for name, device_id, kind, classes in devices:
+        lines.append ("\xe2\x8e\x9c   \xe2\x86\xb3 %-40s\tid=%d\t[%s]\n" % (name, device_id, kind))
+        if len (classes):
+            lines.append ("\tReporting %d classes:\n" % len (classes))
+            for cls in classes:
+                lines.append ("\t\tClass originated from: %d. Type: %s\n" % (device_id, cls))
+    return "".join (lines)
+
+def change_devices (devices = DEVICES, display_name = None):
+    
+    """Have the stub xinput list devices from now on, and clear its log.
+    
+    With display_name, only for that display; the others keep listing what
+    they did. Whatever xinput-ui has cached about the devices it saw before
+    is kept, as if they had been plugged in and out while it was running.
+    
+    """
+    
+    with open (os.environ["XINPUT_TEST_LIST"] + (display_name or ""), "w") as f:
+        f.write (make_listing (devices))
+    open (os.environ["XINPUT_TEST_LOG"], "w").close ()
+
+def use_devices (devices = DEVICES, display_name = None):
+    
+    """Like change_devices, but starting afresh, with nothing cached."""
+    
+    change_devices (devices, display_name)
+    get_metadata_cache (display_name).clear ()
+
+def xinput_runs ():
+    
+    """The arguments of every run of the stub since use_devices, in order."""
+    
+    with open (os.environ["XINPUT_TEST_LOG"]) as f:
+        return [line.split () for line in f]
+
+def without (*device_ids):
+    
+    return [device for device in DEVICES if device[1] not in device_ids]
+
+def find (master_devices, device_id):
+    
+    """The master or slave with that ID in a get_device_status result."""
+    
+    for master in master_devices.values ():
+        if master.self_id == device_id:
+            return master
+        for slave in master.children:
+            if slave.self_id == device_id:
+                return slave
+    return None
@@ -0,0 +1,112 @@
+# xinput-ui tests: noticing which devices are being used.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import os
+import threading
+import time
+import unittest
+
+from xinputui import activity
+
+class PipeSource:
+    
+    """A raw event source that has an event whenever fire() is called.
+    
+    Stands in for the XI2 connection, with the same fileno/read_device_events/
+    close interface.
+    
+    """
+    
+    def __init__ (self):
+        self.read_fd, self.write_fd = os.pipe ()
+        self.closed = False
+    
+    def fileno (self):
+        return self.read_fd
+    
+    def fire (self, device_id):
+        os.write (self.write_fd, chr (device_id))
+    
+    def read_device_events (self, active):
+        active.update (ord (byte) for byte in os.read (self.read_fd, 65536))
+    
+    def close (self):
+        os.close (self.read_fd)
+        os.close (self.write_fd)
+        self.closed = True
+
+class PipeMonitor (activity.ActivityMonitor):
+    
+    def _open_source (self):
+        return self.pipe_source
+
+class ActivityMonitorTest (unittest.TestCase):
+    
+    def setUp (self):
+        
+        self.lock = threading.Lock ()
+        self.calls = []
+        
+        self.monitor = PipeMonitor (self.callback, interval = 0.1)
+        self.monitor.pipe_source = PipeSource ()
+        self.assertTrue (self.monitor.start ())
+    
+    def tearDown (self):
+        self.monitor.stop ()
+    
+    def callback (self, device_ids):
+        with self.lock:
+            self.calls.append (set (device_ids))
+    
+    def wait_quiet (self):
+        
+        """The calls so far, once the devices have been reported quiet."""
+        
+        deadline = time.time () + 5
+        while (not len (self.calls) or len (self.calls[-1])) and time.time () < deadline:
+            time.sleep (0.01)
+        with self.lock:
+            return list (self.calls)
+    
+    def test_coalesced (self):
+        
+        for _ in range (20):
+            self.monitor.pipe_source.fire (6)
+            self.monitor.pipe_source.fire (7)
+        
+        # every device that was used, once, and then one call to say
+        # they've gone quiet
+        self.assertEqual (self.wait_quiet (), [set ([6, 7]), set ()])
+        time.sleep (0.3)
+        self.assertEqual (len (self.calls), 2)
+    
+    def test_rate (self):
+        
+        # about 1 kHz for half a second comes in at most every interval
+        end = time.time () + 0.5
+        while time.time () < end:
+            self.monitor.pipe_source.fire (6)
+            time.sleep (0.001)
+        
+        calls = self.wait_quiet ()
+        self.assertLessEqual (len (calls), 7)
+        self.assertEqual (calls[-1], set ())
+        self.assertTrue (all (device_ids == set ([6]) for device_ids in calls[:-1]))
+    
+    def test_quiet (self):
+        time.sleep (0.3)
+        self.assertEqual (self.calls, [])
+    
+    def test_stop (self):
+        
+        source = self.monitor.pipe_source
+        self.monitor.stop ()
+        self.assertTrue (source.closed)
+
+class UnavailableTest (unittest.TestCase):
+    
+    def test_xinput_backend (self):
+        # there's no xinput fallback, and the tests force that backend
+        self.assertFalse (activity.ActivityMonitor (lambda device_ids: None).start ())
@@ -0,0 +1,135 @@
+# xinput-ui tests: the command-line interface.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import os
+import StringIO
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from support import use_devices, without, xinput_runs
+from xinputui import cli
+
+TOP = os.path.join (os.path.dirname (os.path.abspath (__file__)), os.pardir)
+
+class CliTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+    
+    def run_cli (self, *argv):
+        
+        """Run xinput-ctl with argv, returning its exit status and output."""
+        
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = StringIO.StringIO (), StringIO.StringIO ()
+        try:
+            status = cli.main (list (argv))
+            return status, sys.stdout.getvalue (), sys.stderr.getvalue ()
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+    
+    def test_list (self):
+        
+        status, out, err = self.run_cli ("list")
+        
+        self.assertEqual (status, 0)
+        self.assertEqual (out.splitlines ()[:2], ["Virtual core pointer [pointer 2, keyboard 3]",
+                                                  "    Logitech USB Optical Mouse [6]"])
+        self.assertIn ("    Wacom tablet [13]", out)
+    
+    def test_dry_run (self):
+        
+        status, out, err = self.run_cli ("-n", "move", "AT Translated Set 2 keyboard", "13", "Second pointer")
+        
+        self.assertEqual (status, 0)
+        self.assertEqual (out, "xinput reattach 7 10\nxinput reattach 13 9\n")
+        self.assertEqual (xinput_runs (), [["list", "--long"]])
+    
+    def test_displays (self):
+        
+        use_devices (without (9, 10, 11, 12, 15), ":91")
+        try:
+            status, out, err = self.run_cli ("-n", "-D", ":91", "-D", ":92", "move", "13", "Second pointer")
+        finally:
+            os.remove (os.environ["XINPUT_TEST_LIST"] + ":91")
+        
+        # the same change planned for each display, as far as it can be
+        self.assertEqual (status, 2)
+        self.assertEqual (out, ":91:\n:92:\nxinput reattach 13 9\n")
+        self.assertEqual (err, ":91: No such master: Second pointer\n")
+    
+    def test_apply (self):
+        
+        status, out, err = self.run_cli ("float", "6")
+        
+        self.assertEqual (status, 0)
+        self.assertEqual (xinput_runs ()[1:], [["float", "6"]])
+    
+    def test_ambiguous_name (self):
+        
+        status, out, err = self.run_cli ("float", "Logitech USB Optical Mouse")
+        
+        self.assertEqual (status, 2)
+        self.assertIn ("use its ID", err)
+    
+    def test_master_base_name (self):
+        
+        status, out, err = self.run_cli ("-n", "move", "13", "Second")
+        
+        self.assertEqual (status, 0)
+        self.assertEqual (out, "xinput reattach 13 9\n")
+    
+    def test_remove_core_master (self):
+        
+        status, out, err = self.run_cli ("remove", "Virtual core")
+        
+        self.assertEqual (status, 2)
+        self.assertIn ("cannot be removed", err)
+        self.assertEqual (xinput_runs (), [["list", "--long"]])
+    
+    def test_not_a_master (self):
+        status, out, err = self.run_cli ("move", "13", "6")
+        self.assertEqual ((status, err), (2, "No such master: 6\n"))
+    
+    def test_apply_plan (self):
+        
+        with tempfile.NamedTemporaryFile (suffix = ".plan") as f:
+            f.write ('create "Left hand"  # for the tablet\n\nfloat 6 7\n')
+            f.flush ()
+            status, out, err = self.run_cli ("-n", "apply-plan", f.name)
+        
+        self.assertEqual (status, 0)
+        self.assertEqual (out, "xinput create-master 'Left hand'\nxinput float 6\nxinput float 7\n")
+    
+    def test_bad_plan_line (self):
+        
+        with tempfile.NamedTemporaryFile (suffix = ".plan") as f:
+            f.write ("float 6\nfloat nothing\n")
+            f.flush ()
+            status, out, err = self.run_cli ("apply-plan", f.name)
+        
+        self.assertEqual (status, 2)
+        self.assertEqual (err, f.name+":2: No such device: nothing\n")
+        self.assertEqual (xinput_runs (), [["list", "--long"]])
+    
+    def test_no_wx (self):
+        output = subprocess.check_output ([sys.executable, "-c",
+                                           "import sys; import xinputui.cli; print 'wx' in sys.modules"], cwd = TOP)
+        self.assertEqual (output, "False\n")
+    
+    def test_launcher (self):
+        
+        # with arguments, xinput-ui.py is the command-line interface, and
+        # reports how long it took to start if asked to
+        env = dict (os.environ, XINPUT_UI_TIMING = "1")
+        p = subprocess.Popen ([sys.executable, os.path.join (TOP, "xinput-ui.py"), "-n", "float", "6"],
+                              stdout = subprocess.PIPE, stderr = subprocess.PIPE, env = env)
+        out, err = p.communicate ()
+        
+        self.assertEqual ((p.returncode, out), (0, "xinput float 6\n"))
+        self.assertIn ("engine imported", err)
+        self.assertNotIn ("GUI imported", err)
@@ -0,0 +1,73 @@
+# xinput-ui tests: running command plans.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import time
+import unittest
+
+from support import use_devices, xinput_runs
+from xinputui import commands
+
+class CommandExecutorTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+    
+    def test_results (self):
+        
+        plan = [["sh", "-c", "echo done"], ["sh", "-c", "echo failed; exit 3"], ["/nonexistent/program", "--version"]]
+        results = commands.CommandExecutor ().run (plan)
+        
+        self.assertEqual ([result.command for result in results], plan)
+        self.assertEqual ([result.returncode for result in results], [0, 3, None])
+        self.assertEqual ([result.status_text () for result in results], ["OK", "exit 3", "not started"])
+        self.assertEqual ([result.succeeded () for result in results], [True, False, False])
+        self.assertEqual (results[0].output, "done\n")
+        self.assertEqual (results[1].output, "failed\n")
+    
+    def test_timeout (self):
+        
+        start = time.time ()
+        result = commands.CommandExecutor (timeout = 0.2).run ([["sleep", "10"]])[0]
+        
+        self.assertTrue (result.timed_out)
+        self.assertEqual (result.status_text (), "timed out")
+        self.assertFalse (result.succeeded ())
+        self.assertLess (time.time () - start, 5)
+    
+    def test_stages (self):
+        
+        plan = [["xinput", "float", "6"],
+                ["xinput", "reattach", "7", "Third keyboard"],
+                ["xinput", "create-master", "Third"],
+                ["xinput", "remove-master", "9"]]
+        results = commands.CommandExecutor ().run (plan)
+        
+        # results come back in plan order, but removals run before
+        # creations, and those before the moves that may depend on them
+        self.assertEqual ([result.command for result in results], plan)
+        runs = xinput_runs ()
+        self.assertEqual (runs[:2], [["remove-master", "9"], ["create-master", "Third"]])
+        self.assertEqual (sorted (runs[2:]), [["float", "6"], ["reattach", "7", "Third", "keyboard"]])
+    
+    def test_concurrent_within_stage (self):
+        
+        start = time.time ()
+        results = commands.CommandExecutor (max_workers = 4).run ([["sleep", "0.5"]] * 4)
+        
+        self.assertEqual ([result.returncode for result in results], [0] * 4)
+        self.assertLess (time.time () - start, 1.5)
+    
+    def test_run_one_fails (self):
+        
+        class FailingExecutor (commands.CommandExecutor):
+            def run_one (self, cmd):
+                if cmd[1] == "--fail":
+                    raise OSError ("no such thing")
+                return commands.CommandExecutor.run_one (self, cmd)
+        
+        # the other commands still run, and the failed one has a result
+        results = FailingExecutor ().run ([["false", "--fail"], ["true", "--ok"]])
+        self.assertEqual ([result.status_text () for result in results], ["not started", "OK"])
+        self.assertEqual (results[0].output, "no such thing")
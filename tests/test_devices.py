@@ -0,0 +1,198 @@
+# xinput-ui tests: reading the device list.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import unittest
+
+from support import DEVICES, KEYBOARD_CLASSES, POINTER_CLASSES, change_devices, find, use_devices, xinput_runs
+from xinputui import devices
+
+class ParseDeviceLineTest (unittest.TestCase):
+    
+    def test_attached (self):
+        line = "\xe2\x8e\x9c   \xe2\x86\xb3 Logitech USB Optical Mouse   \tid=6\t[slave  pointer  (2)]\n"
+        self.assertEqual (devices.parse_device_line (line),
+                          (6, "Logitech USB Optical Mouse", ["slave", "pointer", "2"]))
+    
+    def test_master (self):
+        line = "\xe2\x8e\xa1 Virtual core pointer                    \tid=2\t[master pointer  (3)]\n"
+        self.assertEqual (devices.parse_device_line (line),
+                          (2, "Virtual core pointer", ["master", "pointer", "3"]))
+    
+    def test_floating (self):
+        line = "\xe2\x88\xbc Wacom tablet\tid=13\t[floating slave]\n"
+        self.assertEqual (devices.parse_device_line (line), (13, "Wacom tablet", ["floating", "slave"]))
+    
+    def test_name_like_fields (self):
+        # split on the last id and class fields, not the first
+        line = "\xe2\x8e\x9c   \xe2\x86\xb3 Weird id=12 [slave  pointer  (9)]\tid=8\t[slave  pointer  (2)]\n"
+        self.assertEqual (devices.parse_device_line (line),
+                          (8, "Weird id=12 [slave  pointer  (9)]", ["slave", "pointer", "2"]))
+    
+    def test_not_a_device_line (self):
+        self.assertEqual (devices.parse_device_line ("unable to find device 42\n"), None)
+        self.assertEqual (devices.parse_device_line ("\n"), None)
+
+class DeviceStatusTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+    
+    def test_hierarchy (self):
+        
+        master_devices = devices.get_device_status ()
+        
+        self.assertEqual (sorted (master_devices), [devices.FLOATING_ID, 2, 9])
+        self.assertEqual (master_devices[2].keyboard_id, 3)
+        self.assertEqual (master_devices[9].name, "Second pointer")
+        self.assertEqual (master_devices[9].keyboard_id, 10)
+        
+        # XTEST devices are left out
+        self.assertEqual ([slave.self_id for slave in devices.device_sort (master_devices[2].children)], [6, 7, 8])
+        self.assertEqual ([slave.self_id for slave in devices.device_sort (master_devices[9].children)], [15])
+        self.assertEqual ([slave.self_id for slave in devices.device_sort (master_devices[devices.FLOATING_ID].children)],
+                          [13, 14])
+        
+        slave = find (master_devices, 8)
+        self.assertEqual (slave.name, "Weird id=12 [slave  pointer  (9)]")
+        self.assertIs (slave.parent, master_devices[2])
+    
+    def test_slave_types (self):
+        
+        master_devices = devices.get_device_status ()
+        
+        # attached slaves go by their master, floating ones by their
+        # classes, which mustn't run into those of the next device
+        self.assertEqual ([find (master_devices, device_id).is_pointer for device_id in (6, 7, 8, 13, 14, 15)],
+                          [True, False, True, True, False, True])
+        self.assertEqual (find (master_devices, 7).get_master_id (master_devices[9]), 10)
+        self.assertEqual (find (master_devices, 13).get_master_id (master_devices[9]), 9)
+    
+    def test_no_classes (self):
+        
+        use_devices ([device if device[1] != 13 else ("Wacom tablet", 13, "floating slave", [])
+                      for device in DEVICES])
+        master_devices = devices.get_device_status ()
+        slave = find (master_devices, 13)
+        
+        self.assertEqual (slave.is_pointer, None)
+        self.assertEqual (slave.get_master_id (master_devices[9]), None)
+    
+    def test_one_xinput_run (self):
+        devices.get_device_status ()
+        self.assertEqual (xinput_runs (), [["list", "--long"]])
+
+class MetadataCacheTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+        devices.get_device_status ()
+    
+    def refresh (self, device_list):
+        change_devices (device_list)
+        return devices.get_device_status ()
+    
+    def test_short_listing (self):
+        
+        master_devices = self.refresh (DEVICES)
+        
+        # what's known already isn't read again
+        self.assertEqual (xinput_runs (), [["list", "--short"]])
+        self.assertEqual ([find (master_devices, device_id).is_pointer for device_id in (6, 7, 13, 14)],
+                          [True, False, True, False])
+    
+    def test_empty_short_listing (self):
+        
+        # say xinput failed; that's no reason to forget everything
+        self.refresh ([])
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long"]])
+    
+    def test_new_floating_slave (self):
+        
+        master_devices = self.refresh (DEVICES + [("Pen", 16, "floating slave", POINTER_CLASSES)])
+        
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long", "16"]])
+        self.assertTrue (find (master_devices, 16).is_pointer)
+    
+    def test_many_new_floating_slaves (self):
+        
+        added = [("Pen %d" % device_id, device_id, "floating slave", POINTER_CLASSES)
+                 for device_id in range (16, 17 + devices.METADATA_QUERY_LIMIT)]
+        master_devices = self.refresh (DEVICES + added)
+        
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long"]])
+        self.assertTrue (find (master_devices, 16).is_pointer)
+    
+    def test_id_reused (self):
+        
+        # the tablet went away, and a keyboard got its ID
+        master_devices = self.refresh ([device if device[1] != 13 else ("Keypad", 13, "floating slave", KEYBOARD_CLASSES)
+                                        for device in DEVICES])
+        
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long", "13"]])
+        self.assertFalse (find (master_devices, 13).is_pointer)
+    
+    def test_id_forgotten (self):
+        
+        self.refresh ([device for device in DEVICES if device[1] != 13])
+        master_devices = self.refresh ([device if device[1] != 13 else ("Wacom tablet", 13, "floating slave", KEYBOARD_CLASSES)
+                                        for device in DEVICES])
+        
+        # a device of the same name on the same ID is still a new device
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long", "13"]])
+        self.assertFalse (find (master_devices, 13).is_pointer)
+
+class DeviceListTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+        master_devices = devices.get_device_status ()
+        self.slaves = dict ((device_id, find (master_devices, device_id)) for device_id in (6, 7, 8, 13, 14, 15))
+    
+    def ids (self, device_list):
+        return [device.self_id for device in device_list]
+    
+    def test_sorted (self):
+        
+        device_list = devices.DeviceList (self.slaves[device_id] for device_id in (15, 7, 13))
+        device_list.add (self.slaves[6])
+        device_list.add (self.slaves[13])
+        device_list.discard (self.slaves[7])
+        device_list.discard (self.slaves[14])
+        
+        self.assertEqual (self.ids (device_list), [6, 13, 15])
+        self.assertEqual (len (device_list), 3)
+        self.assertIn (self.slaves[13], device_list)
+        self.assertNotIn (self.slaves[7], device_list)
+        self.assertRaises (KeyError, device_list.remove, self.slaves[7])
+    
+    def test_same_id (self):
+        
+        # an old and a new device with the same ID, as while a refresh
+        # is being merged in
+        old = self.slaves[13]
+        new = devices.SlaveDevice (old.parent, 13, "Keypad", False)
+        device_list = devices.DeviceList ([self.slaves[14], old, new])
+        
+        device_list.discard (new)
+        self.assertEqual (list (device_list), [old, self.slaves[14]])
+
+class IsPointerDeviceTest (unittest.TestCase):
+    
+    def test_use (self):
+        self.assertTrue (devices.is_pointer_device (devices.XI_SLAVE_POINTER, set ()))
+        self.assertFalse (devices.is_pointer_device (devices.XI_SLAVE_KEYBOARD, set ([devices.XI_VALUATOR_CLASS])))
+    
+    def test_floating (self):
+        
+        def floating (*class_types):
+            return devices.is_pointer_device (devices.XI_FLOATING_SLAVE, set (class_types))
+        
+        # the same rule as IsPointerDevice () in the X server
+        self.assertTrue (floating (devices.XI_BUTTON_CLASS, devices.XI_VALUATOR_CLASS))
+        self.assertTrue (floating (devices.XI_VALUATOR_CLASS))
+        self.assertTrue (floating (devices.XI_KEY_CLASS, devices.XI_BUTTON_CLASS, devices.XI_VALUATOR_CLASS))
+        self.assertFalse (floating (devices.XI_KEY_CLASS, devices.XI_VALUATOR_CLASS))
+        self.assertFalse (floating (devices.XI_BUTTON_CLASS))
+        self.assertFalse (floating (devices.XI_KEY_CLASS))
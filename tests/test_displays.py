@@ -0,0 +1,148 @@
+# xinput-ui tests: working with several X displays at once.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import os
+import threading
+import time
+import unittest
+
+from support import DEVICES, change_devices, use_devices, without, xinput_runs
+from xinputui import commands, displays
+from xinputui.commands import CommandExecutor
+from xinputui.devices import FLOATING_ID, get_device_status, get_metadata_cache
+
+class DisplayNamesTest (unittest.TestCase):
+    
+    def setUp (self):
+        self.saved = os.environ.get ("XINPUT_UI_DISPLAYS")
+    
+    def tearDown (self):
+        if self.saved is None:
+            os.environ.pop ("XINPUT_UI_DISPLAYS", None)
+        else:
+            os.environ["XINPUT_UI_DISPLAYS"] = self.saved
+    
+    def test_unset (self):
+        os.environ.pop ("XINPUT_UI_DISPLAYS", None)
+        self.assertEqual (displays.get_display_names (), [])
+    
+    def test_list (self):
+        os.environ["XINPUT_UI_DISPLAYS"] = ":1, :2 kiosk3:0,:1"
+        self.assertEqual (displays.get_display_names (), [":1", ":2", "kiosk3:0"])
+
+class MapConcurrentlyTest (unittest.TestCase):
+    
+    def setUp (self):
+        self.lock = threading.Lock ()
+        self.running = 0
+        self.most = 0
+    
+    def wait (self, value):
+        
+        """Returns value after a while, noting how many ran at once."""
+        
+        with self.lock:
+            self.running += 1
+            self.most = max (self.most, self.running)
+        time.sleep (0.05)
+        with self.lock:
+            self.running -= 1
+        return value
+    
+    def test_results (self):
+        
+        def invert (value):
+            return 1.0 / value
+        
+        self.assertEqual ([result for result, error in displays.map_concurrently (invert, [1, 2, 4])], [1.0, 0.5, 0.25])
+        
+        results = displays.map_concurrently (invert, [2, 0])
+        self.assertEqual (results[0], (0.5, None))
+        self.assertEqual (results[1][0], None)
+        self.assertIsInstance (results[1][1], ZeroDivisionError)
+    
+    def test_max_workers (self):
+        
+        results = displays.map_concurrently (self.wait, range (6), max_workers = 2)
+        
+        self.assertEqual ([result for result, error in results], range (6))
+        self.assertEqual (self.most, 2)
+    
+    def test_shared_limit (self):
+        
+        def apply (display):
+            return [result for result, error in commands.run_concurrently (self.wait, range (4), 4)]
+        
+        # nested calls share two helpers: one thread each, and the caller
+        saved = commands._helper_slots
+        commands._helper_slots = threading.BoundedSemaphore (2)
+        try:
+            results = displays.map_concurrently (apply, range (4), max_workers = 4)
+        finally:
+            commands._helper_slots = saved
+        
+        self.assertEqual ([result for result, error in results], [range (4)] * 4)
+        self.assertEqual (self.most, 3)
+
+class DisplayDevicesTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+        use_devices (without (9, 10, 11, 12, 15), ":91")
+    
+    def tearDown (self):
+        os.remove (os.environ["XINPUT_TEST_LIST"] + ":91")
+    
+    def test_separate (self):
+        
+        self.assertEqual (sorted (get_device_status ()), [FLOATING_ID, 2, 9])
+        self.assertEqual (sorted (get_device_status (":91")), [FLOATING_ID, 2])
+    
+    def test_separate_caches (self):
+        
+        get_device_status ()
+        get_device_status (":91")
+        self.assertIsNot (get_metadata_cache (":91"), get_metadata_cache ())
+        
+        # what one display's refresh found out doesn't count for the other
+        get_metadata_cache (":91").clear ()
+        change_devices (DEVICES)
+        get_device_status ()
+        get_device_status (":91")
+        self.assertEqual (xinput_runs (), [["list", "--short"], ["list", "--long"]])
+    
+    def test_commands (self):
+        
+        results = CommandExecutor (display_name = ":91").run ([["sh", "-c", "echo $DISPLAY"]])
+        self.assertEqual (results[0].output, ":91\n")
+    
+    def test_shared_limit (self):
+        
+        lock = threading.Lock ()
+        running = [0]
+        most = [0]
+        
+        def wait (value):
+            with lock:
+                running[0] += 1
+                most[0] = max (most[0], running[0])
+            time.sleep (0.05)
+            with lock:
+                running[0] -= 1
+            return value
+        
+        def apply (display):
+            return [result for result, error in commands.run_concurrently (wait, range (4), 4)]
+        
+        # nested calls share two helpers: one thread each, and the caller
+        saved = commands._helper_slots
+        commands._helper_slots = threading.BoundedSemaphore (2)
+        try:
+            results = displays.map_concurrently (apply, range (4), max_workers = 4)
+        finally:
+            commands._helper_slots = saved
+        
+        self.assertEqual ([result for result, error in results], [range (4)] * 4)
+        self.assertEqual (most[0], 3)
@@ -0,0 +1,201 @@
+# xinput-ui tests: watching for devices being plugged in and removed.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import StringIO
+import os
+import sys
+import threading
+import time
+import unittest
+
+from xinputui import hotplug
+
+class PipeSource:
+    
+    """A hotplug event source that has an event whenever fire() is called.
+    
+    Stands in for the XI2 connection or inotify, with the same
+    fileno/drain_events/close interface.
+    
+    """
+    
+    def __init__ (self):
+        self.read_fd, self.write_fd = os.pipe ()
+        self.closed = False
+    
+    def fileno (self):
+        return self.read_fd
+    
+    def fire (self):
+        os.write (self.write_fd, b'x')
+    
+    def drain_events (self):
+        return len (os.read (self.read_fd, 65536))
+    
+    def close (self):
+        os.close (self.read_fd)
+        os.close (self.write_fd)
+        self.closed = True
+
+class PipeWatcher (hotplug.DeviceWatcher):
+    
+    def _open_source (self):
+        return self.pipe_source
+
+class DeviceWatcherTest (unittest.TestCase):
+    
+    def setUp (self):
+        
+        self.calls = []
+        self.called = threading.Event ()
+        
+        self.watcher = PipeWatcher (self.callback, settle_time = 0.1)
+        self.watcher.pipe_source = PipeSource ()
+        self.assertTrue (self.watcher.start ())
+    
+    def tearDown (self):
+        self.watcher.stop ()
+    
+    def callback (self):
+        self.calls.append (time.time ())
+        self.called.set ()
+    
+    def test_burst (self):
+        
+        # a burst of events is one change
+        for _ in range (5):
+            self.watcher.pipe_source.fire ()
+            time.sleep (0.02)
+        self.assertTrue (self.called.wait (2))
+        time.sleep (0.3)
+        self.assertEqual (len (self.calls), 1)
+        
+        self.called.clear ()
+        self.watcher.pipe_source.fire ()
+        self.assertTrue (self.called.wait (2))
+        self.assertEqual (len (self.calls), 2)
+    
+    def test_callback_fails (self):
+        
+        def fail ():
+            self.callback ()
+            raise OSError ("no xinput")
+        
+        # reported, and the next event is still noticed
+        self.watcher.callback = fail
+        saved_stderr = sys.stderr
+        sys.stderr = StringIO.StringIO ()
+        try:
+            self.watcher.pipe_source.fire ()
+            self.assertTrue (self.called.wait (2))
+            time.sleep (0.05)
+            self.assertIn ("no xinput", sys.stderr.getvalue ())
+        finally:
+            sys.stderr = saved_stderr
+        
+        self.called.clear ()
+        self.watcher.callback = self.callback
+        self.watcher.pipe_source.fire ()
+        self.assertTrue (self.called.wait (2))
+        self.assertEqual (len (self.calls), 2)
+    
+    def test_stop (self):
+        
+        source = self.watcher.pipe_source
+        self.watcher.stop ()
+        
+        self.assertTrue (source.closed)
+        self.assertEqual (self.calls, [])
+
+class BlockingScan:
+    
+    """A scan that waits to be released, and counts how often it ran."""
+    
+    def __init__ (self):
+        self.runs = 0
+        self.started = threading.Event ()
+        self.release = threading.Event ()
+    
+    def __call__ (self):
+        self.runs += 1
+        self.started.set ()
+        self.release.wait (5)
+        return self.runs
+
+class DeviceScannerTest (unittest.TestCase):
+    
+    def setUp (self):
+        
+        self.results = []
+        self.done = threading.Event ()
+        
+        self.scan = BlockingScan ()
+        self.scanner = hotplug.DeviceScanner (self.callback, self.scan)
+    
+    def callback (self, generation, master_devices, error):
+        self.results.append ((generation, master_devices, error))
+        self.done.set ()
+    
+    def wait_idle (self):
+        deadline = time.time () + 5
+        while self.scanner.running and time.time () < deadline:
+            time.sleep (0.01)
+        self.assertFalse (self.scanner.running)
+    
+    def test_result (self):
+        
+        self.scan.release.set ()
+        self.scanner.request ()
+        self.assertTrue (self.done.wait (5))
+        
+        generation, master_devices, error = self.results[0]
+        self.assertEqual ((master_devices, error), (1, None))
+        self.assertTrue (self.scanner.is_current (generation))
+    
+    def test_error (self):
+        
+        def scan ():
+            raise OSError ("no xinput")
+        
+        self.scanner.scan = scan
+        self.scanner.request ()
+        self.assertTrue (self.done.wait (5))
+        
+        self.assertEqual (self.results[0][1], None)
+        self.assertEqual (str (self.results[0][2]), "no xinput")
+    
+    def test_superseded (self):
+        
+        self.scanner.request ()
+        self.assertTrue (self.scan.started.wait (5))
+        self.scanner.request ()
+        self.scanner.request ()
+        self.scan.release.set ()
+        
+        # the outdated result is dropped, and one more scan makes up for
+        # however many requests came in meanwhile
+        self.assertTrue (self.done.wait (5))
+        self.wait_idle ()
+        self.assertEqual (self.scan.runs, 2)
+        self.assertEqual (len (self.results), 1)
+        self.assertEqual (self.results[0][1], 2)
+        self.assertTrue (self.scanner.is_current (self.results[0][0]))
+    
+    def test_cancel (self):
+        
+        self.scanner.request ()
+        self.assertTrue (self.scan.started.wait (5))
+        generation = self.scanner.generation
+        self.scanner.cancel ()
+        self.assertFalse (self.scanner.is_current (generation))
+        self.scan.release.set ()
+        
+        self.wait_idle ()
+        self.assertEqual (self.results, [])
+        
+        # and it can be asked again afterwards
+        self.scanner.request ()
+        self.assertTrue (self.done.wait (5))
+        self.assertEqual (self.scan.runs, 2)
@@ -0,0 +1,508 @@
+# xinput-ui tests: planning changes to the device hierarchy.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import unittest
+
+from support import DEVICES, KEYBOARD_CLASSES, change_devices, find, use_devices, without
+from xinputui.devices import PendingDevice, get_device_status, master_base_name
+from xinputui.plan import Plan, PlanError
+
+class RecordingPlan (Plan):
+    
+    """A Plan that remembers which devices its hooks were called for.
+    
+    It also keeps its own copy of all_commands, going only by the
+    CommandRemoved and CommandAdded hooks.
+    
+    """
+    
+    def __init__ (self):
+        Plan.__init__ (self)
+        self.updated = []
+        self.finished = 0
+        self.hook_commands = []
+    
+    def CommandRemoved (self, index):
+        del self.hook_commands[index]
+    
+    def CommandAdded (self, command):
+        self.hook_commands.append (command)
+    
+    def UpdateDevice (self, device):
+        self.updated.append (device)
+        Plan.UpdateDevice (self, device)
+    
+    def UpdateFinished (self):
+        self.finished += 1
+    
+    def forget_calls (self):
+        self.updated = []
+        self.finished = 0
+
+class PlanTestCase (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+    
+    def loaded_plan (self, devices = DEVICES):
+        use_devices (devices)
+        plan = RecordingPlan ()
+        plan.Load (get_device_status ())
+        plan.forget_calls ()
+        return plan
+    
+    def device (self, plan, device_id):
+        return find (plan.master_devices, device_id)
+
+class PlanTest (PlanTestCase):
+    
+    def test_load (self):
+        
+        plan = self.loaded_plan ()
+        
+        self.assertEqual (plan.all_commands, [])
+        for master in plan.master_devices.values ():
+            self.assertEqual (list (plan.display_heirarchy[master]), list (master.children))
+    
+    def test_one_reattach_per_move (self):
+        
+        plan = self.loaded_plan ()
+        second = plan.master_devices[9]
+        plan.MoveDevicesCmd ([self.device (plan, 7), self.device (plan, 13)], second)
+        plan.DetachDeviceCmd (self.device (plan, 6))
+        
+        # keyboards go to the master keyboard, pointers to the master pointer
+        self.assertEqual (plan.all_commands, [["xinput", "reattach", "7", "10"],
+                                              ["xinput", "reattach", "13", "9"],
+                                              ["xinput", "float", "6"]])
+    
+    def test_unknown_kind (self):
+        
+        plan = self.loaded_plan ([device if device[1] != 13 else ("Wacom tablet", 13, "floating slave", [])
+                                  for device in DEVICES])
+        plan.MoveDeviceCmd (self.device (plan, 13), plan.master_devices[9])
+        
+        self.assertEqual (plan.all_commands, [["xinput", "reattach", "13", "9"],
+                                              ["xinput", "reattach", "13", "10"]])
+    
+    def test_only_changed_devices_updated (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        plan.MoveDeviceCmd (slave, plan.master_devices[9])
+        
+        self.assertEqual (plan.updated, [slave, plan.master_devices[9]])
+        self.assertEqual (plan.finished, 1)
+        self.assertIn (slave, plan.display_heirarchy[plan.master_devices[9]])
+        self.assertNotIn (slave, plan.display_heirarchy[plan.master_devices[2]])
+    
+    def test_same_as_regenerated (self):
+        
+        plan = self.loaded_plan ()
+        pending = PendingDevice ("Third")
+        plan.MoveDeviceCmd (self.device (plan, 6), plan.master_devices[9])
+        plan.CreateDeviceCmd (pending)
+        plan.DetachDevicesCmd ([self.device (plan, 7), self.device (plan, 15)])
+        plan.UndoMoveDeviceCmd (self.device (plan, 7))
+        plan.DeleteDeviceCmd (plan.master_devices[9])
+        
+        # the incremental plan holds the same commands a from-scratch one
+        # would, if not in the same order
+        commands = sorted (plan.all_commands)
+        self.assertEqual (commands, [["xinput", "create-master", "Third"],
+                                     ["xinput", "float", "6"],
+                                     ["xinput", "remove-master", "9"]])
+        plan.Regenerate ()
+        self.assertEqual (sorted (plan.all_commands), commands)
+    
+    def test_command_hooks (self):
+        
+        plan = self.loaded_plan ()
+        second = plan.master_devices[9]
+        with plan.Transaction ():
+            plan.MoveDevicesCmd ([self.device (plan, 6), self.device (plan, 7)], second)
+            plan.DetachDeviceCmd (self.device (plan, 13))
+        plan.MoveDeviceCmd (self.device (plan, 6), plan.floating_group)
+        plan.UndoMoveDeviceCmd (self.device (plan, 13))
+        plan.DeleteDeviceCmd (second)
+        
+        # the hooks are enough to follow every change to all_commands
+        self.assertEqual (plan.hook_commands, plan.all_commands)
+        self.assertEqual (plan.stale_commands, {})
+        self.assertEqual (plan.all_commands, [["xinput", "float", "6"],
+                                              ["xinput", "float", "7"],
+                                              ["xinput", "remove-master", "9"]])
+        
+        # and when more than a few commands are replaced at once
+        plan.UndoDeleteDeviceCmd (second)
+        plan.MoveDevicesCmd ([self.device (plan, device_id) for device_id in (6, 7, 8, 13, 14)], second)
+        plan.MoveDevicesCmd ([self.device (plan, device_id) for device_id in (6, 7, 8, 13, 14)], plan.master_devices[2])
+        self.assertEqual (plan.hook_commands, plan.all_commands)
+        self.assertEqual (plan.all_commands, [["xinput", "float", "15"],
+                                              ["xinput", "reattach", "13", "2"],
+                                              ["xinput", "reattach", "14", "3"]])
+    
+    def test_undo_move (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        plan.MoveDeviceCmd (slave, plan.master_devices[9])
+        plan.UndoMoveDeviceCmd (slave)
+        
+        self.assertEqual (plan.all_commands, [])
+        self.assertEqual (plan.device_commands, {})
+        self.assertEqual (plan.display_parent[slave], plan.master_devices[2])
+    
+    def test_delete_master (self):
+        
+        plan = self.loaded_plan ()
+        second = plan.master_devices[9]
+        slave = self.device (plan, 15)
+        plan.DeleteDeviceCmd (second)
+        
+        # its slave floats along with it, which needs no command of its own
+        self.assertEqual (plan.all_commands, [["xinput", "remove-master", "9"]])
+        self.assertEqual (plan.display_parent[slave], plan.floating_group)
+        self.assertFalse (plan.CanRemove (second))
+        
+        plan.UndoDeleteDeviceCmd (second)
+        self.assertEqual (plan.all_commands, [["xinput", "float", "15"]])
+    
+    def test_core_master (self):
+        plan = self.loaded_plan ()
+        self.assertFalse (plan.CanRemove (plan.master_devices[2]))
+    
+    def test_pending_master (self):
+        
+        plan = self.loaded_plan ()
+        pending = PendingDevice ("Third")
+        plan.CreateDeviceCmd (pending)
+        plan.MoveDevicesCmd ([self.device (plan, 7), self.device (plan, 13)], pending)
+        
+        # it has no IDs yet, so it's addressed by name
+        self.assertEqual (plan.all_commands, [["xinput", "create-master", "Third"],
+                                              ["xinput", "reattach", "7", "Third keyboard"],
+                                              ["xinput", "reattach", "13", "Third pointer"]])
+        
+        # and taking it back takes the moves with it
+        plan.UndoCreateDeviceCmd (pending)
+        self.assertEqual (plan.all_commands, [])
+        self.assertNotIn (pending, plan.display_heirarchy)
+
+class TransactionTest (PlanTestCase):
+    
+    def test_bulk_operation (self):
+        
+        plan = self.loaded_plan ()
+        slaves = [self.device (plan, device_id) for device_id in (6, 7, 8)]
+        plan.DetachDevicesCmd (slaves)
+        
+        # one update for each device, and one redisplay for the lot
+        self.assertEqual (plan.updated, slaves + [plan.floating_group])
+        self.assertEqual (plan.finished, 1)
+        self.assertEqual (plan.all_commands, [["xinput", "float", "6"], ["xinput", "float", "7"],
+                                              ["xinput", "float", "8"]])
+    
+    def test_nested (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        
+        with plan.Transaction ():
+            plan.MoveDeviceCmd (slave, plan.master_devices[9])
+            plan.DetachDeviceCmd (slave)
+            
+            # the preview is up to date straight away, the commands aren't
+            self.assertEqual (plan.display_parent[slave], plan.floating_group)
+            self.assertEqual (plan.all_commands, [])
+            self.assertEqual (plan.finished, 0)
+        
+        self.assertEqual (plan.all_commands, [["xinput", "float", "6"]])
+        self.assertEqual (plan.updated.count (slave), 1)
+        self.assertEqual (plan.finished, 1)
+    
+    def test_commit_on_error (self):
+        
+        plan = self.loaded_plan ()
+        second = plan.master_devices[9]
+        
+        def change ():
+            with plan.Transaction ():
+                plan.DeleteDeviceCmd (second)
+                plan.MoveDeviceCmd (self.device (plan, 6), second)
+        
+        self.assertRaises (PlanError, change)
+        self.assertEqual (plan.transaction_depth, 0)
+        self.assertEqual (plan.all_commands, [["xinput", "remove-master", "9"]])
+
+class UndoTest (PlanTestCase):
+    
+    def make_changes (self, plan):
+        
+        """Several kinds of change, returning all_commands after each.
+        
+        The commands are sorted: an undone change that's redone is planned
+        again after the ones still pending, which CommandExecutor doesn't
+        mind, since it runs them stage by stage anyway.
+        
+        """
+        
+        history = [sorted (plan.all_commands)]
+        
+        plan.MoveDeviceCmd (self.device (plan, 6), plan.master_devices[9])
+        history.append (sorted (plan.all_commands))
+        
+        pending = PendingDevice ("Third")
+        plan.CreateDeviceCmd (pending)
+        history.append (sorted (plan.all_commands))
+        
+        plan.MoveDevicesCmd ([self.device (plan, 13), self.device (plan, 8)], pending)
+        history.append (sorted (plan.all_commands))
+        
+        plan.DeleteDeviceCmd (plan.master_devices[9])
+        history.append (sorted (plan.all_commands))
+        
+        return history
+    
+    def test_round_trip (self):
+        
+        plan = self.loaded_plan ()
+        history = self.make_changes (plan)
+        
+        for commands in reversed (history[:-1]):
+            plan.Undo ()
+            self.assertEqual (sorted (plan.all_commands), commands)
+        self.assertFalse (plan.CanUndo ())
+        self.assertEqual (plan.recorded_states, {})
+        
+        for commands in history[1:]:
+            plan.Redo ()
+            self.assertEqual (sorted (plan.all_commands), commands)
+        self.assertFalse (plan.CanRedo ())
+    
+    def test_display_restored (self):
+        
+        plan = self.loaded_plan ()
+        before = dict ((master, set (slaves)) for master, slaves in plan.display_heirarchy.iteritems ())
+        self.make_changes (plan)
+        
+        while plan.CanUndo ():
+            plan.Undo ()
+        after = dict ((master, set (slaves)) for master, slaves in plan.display_heirarchy.iteritems ())
+        self.assertEqual (after, before)
+    
+    def test_step_size (self):
+        
+        plan = self.loaded_plan ()
+        plan.DetachDevicesCmd ([self.device (plan, 6), self.device (plan, 7), self.device (plan, 8)])
+        
+        # a bulk change is one step, which only holds what it changed
+        self.assertEqual (len (plan.undo_steps), 1)
+        self.assertEqual (sorted (device.self_id for device in plan.undo_steps[0]), [6, 7, 8])
+        
+        plan.forget_calls ()
+        plan.Undo ()
+        self.assertEqual (plan.all_commands, [])
+        self.assertEqual (sorted (device.self_id for device in plan.updated), [6, 7, 8])
+    
+    def test_new_change_clears_redo (self):
+        
+        plan = self.loaded_plan ()
+        plan.DetachDeviceCmd (self.device (plan, 6))
+        plan.Undo ()
+        self.assertTrue (plan.CanRedo ())
+        
+        plan.DetachDeviceCmd (self.device (plan, 7))
+        self.assertFalse (plan.CanRedo ())
+
+def current_layout (plan):
+    
+    """The target that Reconcile needs to leave everything as it is."""
+    
+    masters = {}
+    for master in plan.master_devices.values ():
+        if master != plan.floating_group:
+            masters[master_base_name (master)] = list (master.children)
+    return masters, list (plan.floating_group.children)
+
+class ReconcileTest (PlanTestCase):
+    
+    def test_nothing_changed (self):
+        
+        plan = self.loaded_plan ()
+        masters, floating = current_layout (plan)
+        plan.Reconcile (masters, floating)
+        
+        self.assertEqual (plan.all_commands, [])
+        self.assertEqual (plan.updated, [])
+    
+    def test_pending_move_dropped (self):
+        
+        plan = self.loaded_plan ()
+        plan.MoveDeviceCmd (self.device (plan, 6), plan.master_devices[9])
+        
+        masters, floating = current_layout (plan)
+        plan.Reconcile (masters, floating)
+        self.assertEqual (plan.all_commands, [])
+    
+    def test_only_what_differs (self):
+        
+        plan = self.loaded_plan ()
+        masters, floating = current_layout (plan)
+        slave = self.device (plan, 13)
+        floating.remove (slave)
+        masters["Second"].append (slave)
+        plan.Reconcile (masters, floating)
+        
+        # only the slave that moves is looked at again
+        self.assertEqual (plan.all_commands, [["xinput", "reattach", "13", "9"]])
+        self.assertEqual (plan.updated, [slave])
+        self.assertEqual (plan.finished, 1)
+    
+    def test_new_master (self):
+        
+        plan = self.loaded_plan ()
+        plan.Reconcile ({"Third": [self.device (plan, 13)]})
+        
+        self.assertEqual (plan.all_commands, [["xinput", "create-master", "Third"],
+                                              ["xinput", "reattach", "13", "Third pointer"]])
+    
+    def test_one_place (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        self.assertRaises (PlanError, plan.Reconcile, {"Second": [slave]}, [slave])
+    
+    def test_revives_deleted_master (self):
+        
+        plan = self.loaded_plan ()
+        plan.DeleteDeviceCmd (plan.master_devices[9])
+        
+        masters, floating = current_layout (plan)
+        plan.Reconcile (masters, floating)
+        self.assertEqual (plan.all_commands, [])
+    
+    def test_prune (self):
+        
+        plan = self.loaded_plan ()
+        plan.Reconcile ({}, prune = True)
+        
+        # the virtual core master stays; the other one's slave floats along
+        # with it, which needs no command of its own
+        self.assertEqual (plan.all_commands, [["xinput", "remove-master", "9"]])
+        self.assertEqual (plan.display_parent[self.device (plan, 15)], plan.floating_group)
+    
+    def test_prune_pending_master (self):
+        
+        plan = self.loaded_plan ()
+        pending = PendingDevice ("Temporary")
+        plan.CreateDeviceCmd (pending)
+        plan.MoveDeviceCmd (self.device (plan, 6), pending)
+        
+        masters, floating = current_layout (plan)
+        plan.Reconcile (masters, floating, prune = True)
+        
+        self.assertEqual (plan.all_commands, [])
+        self.assertNotIn (pending, plan.display_heirarchy)
+        self.assertEqual (plan.display_parent[self.device (plan, 6)], plan.master_devices[2])
+
+class MergeTest (PlanTestCase):
+    
+    def merge (self, plan, devices = DEVICES):
+        use_devices (devices)
+        plan.forget_calls ()
+        plan.MergeDeviceStatus (get_device_status ())
+    
+    def test_before_load (self):
+        
+        plan = RecordingPlan ()
+        plan.MergeDeviceStatus (get_device_status ())
+        self.assertEqual (plan.master_devices, None)
+    
+    def test_unchanged (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        plan.MoveDeviceCmd (slave, plan.master_devices[9])
+        commands = list (plan.all_commands)
+        
+        self.merge (plan)
+        
+        # the same objects, with their pending changes and history, and
+        # nothing redone
+        self.assertIs (self.device (plan, 6), slave)
+        self.assertEqual (plan.all_commands, commands)
+        self.assertEqual (plan.updated, [])
+        self.assertTrue (plan.CanUndo ())
+    
+    def test_slave_added (self):
+        
+        plan = self.loaded_plan (without (15))
+        self.merge (plan)
+        
+        slave = self.device (plan, 15)
+        self.assertIn (slave, plan.display_heirarchy[plan.master_devices[9]])
+        self.assertEqual (plan.updated, [slave])
+        self.assertEqual (plan.all_commands, [])
+    
+    def test_moved_slave_removed (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        plan.MoveDeviceCmd (slave, plan.master_devices[9])
+        
+        self.merge (plan, without (6))
+        
+        # and the history that mentions it
+        self.assertEqual (plan.all_commands, [])
+        self.assertFalse (plan.CanUndo ())
+        self.assertNotIn (slave, plan.display_parent)
+        self.assertNotIn (slave, plan.display_heirarchy[plan.master_devices[9]])
+    
+    def test_destination_removed (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        plan.MoveDeviceCmd (slave, plan.master_devices[9])
+        
+        self.merge (plan, without (9, 10, 11, 12, 15))
+        
+        self.assertEqual (plan.all_commands, [])
+        self.assertEqual (plan.display_parent[slave], plan.master_devices[2])
+        self.assertNotIn (9, plan.master_devices)
+    
+    def test_moved_outside (self):
+        
+        # another program floated a slave since the last refresh
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 7)
+        
+        self.merge (plan, [device if device[1] != 7 else (device[0], 7, "floating slave", KEYBOARD_CLASSES)
+                           for device in DEVICES])
+        
+        self.assertIs (self.device (plan, 7), slave)
+        self.assertEqual (plan.display_parent[slave], plan.floating_group)
+    
+    def test_reload (self):
+        
+        plan = self.loaded_plan ()
+        slave = self.device (plan, 6)
+        pending = PendingDevice ("Third")
+        plan.CreateDeviceCmd (pending)
+        plan.MoveDevicesCmd ([slave, self.device (plan, 13)], pending)
+        plan.DeleteDeviceCmd (plan.master_devices[9])
+        
+        # as after applying: the pending changes go, and the devices
+        # that are still there stay as they were
+        change_devices (without (14))
+        plan.Reload (get_device_status ())
+        
+        self.assertEqual (plan.all_commands, [])
+        self.assertIs (self.device (plan, 6), slave)
+        self.assertEqual (plan.display_parent[slave], plan.master_devices[2])
+        self.assertNotIn (pending, plan.display_heirarchy)
+        self.assertEqual (self.device (plan, 14), None)
+        for master in plan.master_devices.values ():
+            self.assertEqual (list (plan.display_heirarchy[master]), list (master.children))
@@ -0,0 +1,157 @@
+# xinput-ui tests: saving and restoring MPX layouts.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import find, use_devices
+from xinputui.devices import get_device_status
+from xinputui.plan import Plan
+from xinputui import profiles
+
+class ProfileStoreTest (unittest.TestCase):
+    
+    def setUp (self):
+        self.config_home = tempfile.mkdtemp (prefix = "xinput-ui-tests.")
+        self.old_config_home = os.environ.get ("XDG_CONFIG_HOME")
+        os.environ["XDG_CONFIG_HOME"] = self.config_home
+    
+    def tearDown (self):
+        if self.old_config_home is None:
+            del os.environ["XDG_CONFIG_HOME"]
+        else:
+            os.environ["XDG_CONFIG_HOME"] = self.old_config_home
+        shutil.rmtree (self.config_home)
+    
+    def test_round_trip (self):
+        
+        profile = {"version": profiles.PROFILE_VERSION, "floating": [],
+                   "masters": {"Left hand": [{"name": "Wacom tablet", "ordinal": 0}]}}
+        self.assertEqual (profiles.list_profiles (), [])
+        
+        profiles.save_profile ("work", profile)
+        
+        self.assertEqual (profiles.list_profiles (), ["work"])
+        self.assertEqual (profiles.load_profile ("work"), profile)
+        # names come back as strs, like the rest of xinput-ui uses
+        self.assertIs (type (profiles.load_profile ("work")["masters"].keys ()[0]), str)
+    
+    def test_missing (self):
+        self.assertRaises (profiles.ProfileError, profiles.load_profile, "nothing")
+    
+    def test_bad_name (self):
+        for name in ("", "../work", ".hidden"):
+            self.assertRaises (profiles.ProfileError, profiles.save_profile, name, {})
+    
+    def test_bad_version (self):
+        
+        profiles.save_profile ("old", {"version": 0, "masters": {}, "floating": []})
+        self.assertRaises (profiles.ProfileError, profiles.load_profile, "old")
+        
+        with open (profiles.profile_path ("broken"), "w") as f:
+            f.write ("{")
+        self.assertRaises (profiles.ProfileError, profiles.load_profile, "broken")
+
+class DeviceIndexTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+        self.master_devices = get_device_status ()
+    
+    def test_identities (self):
+        
+        identities = profiles.get_slave_identities (self.master_devices, {})
+        
+        # same name, told apart by ID order
+        self.assertEqual (identities[find (self.master_devices, 6)], {"name": "Logitech USB Optical Mouse", "ordinal": 0})
+        self.assertEqual (identities[find (self.master_devices, 15)], {"name": "Logitech USB Optical Mouse", "ordinal": 1})
+    
+    def test_each_slave_once (self):
+        
+        index = profiles.DeviceIndex (profiles.get_slave_identities (self.master_devices, {}))
+        identity = {"name": "Wacom tablet", "ordinal": 0}
+        
+        self.assertIs (index.find_slave (identity), find (self.master_devices, 13))
+        self.assertEqual (index.find_slave (identity), None)
+    
+    def test_best_identity_first (self):
+        
+        first = find (self.master_devices, 6)
+        second = find (self.master_devices, 15)
+        identities = profiles.get_slave_identities (self.master_devices, {})
+        # identical mice without serial numbers share a by_id
+        identities[first].update (by_id = "usb-Logitech_Mouse-event-mouse",
+                                  by_path = "pci-0000:00:14.0-usb-0:1:1.0-event-mouse")
+        identities[second].update (by_id = "usb-Logitech_Mouse-event-mouse",
+                                   by_path = "pci-0000:00:14.0-usb-0:2:1.0-event-mouse")
+        index = profiles.DeviceIndex (identities)
+        
+        # by_path wins over name and ordinal
+        self.assertIs (index.find_slave ({"by_path": "pci-0000:00:14.0-usb-0:2:1.0-event-mouse",
+                                          "name": "Logitech USB Optical Mouse", "ordinal": 0}), second)
+        # the shared by_id is ignored, so name and ordinal decide
+        self.assertIs (index.find_slave ({"by_id": "usb-Logitech_Mouse-event-mouse",
+                                          "name": "Logitech USB Optical Mouse", "ordinal": 0}), first)
+
+class RestoreTest (unittest.TestCase):
+    
+    def loaded_plan (self):
+        use_devices ()
+        plan = Plan ()
+        plan.Load (get_device_status ())
+        return plan, profiles.get_slave_identities (plan.master_devices, {})
+    
+    def test_restore_own_profile (self):
+        
+        plan, identities = self.loaded_plan ()
+        profile = profiles.capture_profile (plan, identities)
+        
+        # and it survives being saved
+        profile = json.loads (json.dumps (profile))
+        self.assertEqual (profiles.restore_profile (plan, profiles._from_json (profile), identities), [])
+        self.assertEqual (plan.all_commands, [])
+    
+    def test_restore_after_moves (self):
+        
+        plan, identities = self.loaded_plan ()
+        plan.MoveDeviceCmd (find (plan.master_devices, 6), plan.master_devices[9])
+        plan.DetachDeviceCmd (find (plan.master_devices, 7))
+        profile = profiles.capture_profile (plan, identities)
+        commands = list (plan.all_commands)
+        
+        # the same layout, arrived at from scratch
+        plan, identities = self.loaded_plan ()
+        self.assertEqual (profiles.restore_profile (plan, profile, identities), [])
+        self.assertEqual (sorted (plan.all_commands), sorted (commands))
+    
+    def test_new_master (self):
+        
+        plan, identities = self.loaded_plan ()
+        profile = {"version": profiles.PROFILE_VERSION, "floating": [],
+                   "masters": {"Left hand": [{"name": "Wacom tablet", "ordinal": 0},
+                                             {"name": "Missing mouse", "ordinal": 0}]}}
+        
+        missing = profiles.restore_profile (plan, profile, identities)
+        
+        # created and filled in one batch, going by the name it will have
+        self.assertEqual (missing, [{"name": "Missing mouse", "ordinal": 0}])
+        self.assertEqual (plan.all_commands, [["xinput", "create-master", "Left hand"],
+                                              ["xinput", "reattach", "13", "Left hand pointer"]])
+    
+    def test_prune (self):
+        
+        plan, identities = self.loaded_plan ()
+        profile = profiles.capture_profile (plan, identities)
+        del profile["masters"]["Second"]
+        
+        plan, identities = self.loaded_plan ()
+        profiles.restore_profile (plan, profile, identities)
+        self.assertEqual (plan.all_commands, [])
+        
+        profiles.restore_profile (plan, profile, identities, prune = True)
+        self.assertEqual (plan.all_commands, [["xinput", "remove-master", "9"]])
@@ -0,0 +1,128 @@
+# xinput-ui tests: reading, caching and writing device properties.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import unittest
+
+from support import use_devices, xinput_runs
+from xinputui import properties
+
+LIST_PROPS = """Device 'Logitech USB Optical Mouse':
+\tDevice Enabled (152):\t1
+\tCoordinate Transformation Matrix (154):\t1.000000, 0.000000, 0.000000, 0.000000, 1.000000, 0.000000, 0.000000, 0.000000, 1.000000
+\tlibinput Accel Speed (290):\t0.000000
+\tDevice Node (275):\t"/dev/input/event5"
+\tEvdev Axis Labels (280):\t"Rel X" (161), "Rel Y" (162), "Rel Vert Wheel" (163)
+\tlibinput Button Scrolling Button (300):\t<no items>
+"""
+
+class ParseTest (unittest.TestCase):
+    
+    def test_list_props (self):
+        
+        props = properties.parse_list_props (LIST_PROPS.splitlines (True))
+        
+        self.assertEqual ([(prop.name, prop.prop_id) for prop in props],
+                          [("Device Enabled", 152), ("Coordinate Transformation Matrix", 154),
+                           ("libinput Accel Speed", 290), ("Device Node", 275),
+                           ("Evdev Axis Labels", 280), ("libinput Button Scrolling Button", 300)])
+        self.assertEqual (props[0].values, ["1"])
+        self.assertEqual (len (props[1].values), 9)
+        # strings and atom names lose their quotes, and atoms their numbers
+        self.assertEqual (props[3].values, ["/dev/input/event5"])
+        self.assertEqual (props[4].values, ["Rel X", "Rel Y", "Rel Vert Wheel"])
+        self.assertEqual (props[5].values, [])
+    
+    def test_not_a_property (self):
+        self.assertEqual (properties.parse_list_props (["unable to find device 42\n"]), [])
+    
+    def test_typed_values (self):
+        self.assertEqual (properties.parse_property_values (" 1,2 , 3"), ["1", "2", "3"])
+        self.assertEqual (properties.parse_property_values ('"a, b", c'), ["a, b", "c"])
+    
+    def test_format (self):
+        for values in ([], ["1"], ["0.5", "1.000000"], ["a, b", "c"]):
+            text = properties.format_property_values (values)
+            self.assertEqual (properties.parse_property_values (text), values)
+
+class PropertyCacheTest (unittest.TestCase):
+    
+    def setUp (self):
+        self.cache = properties.PropertyCache ()
+        self.reads = 0
+    
+    def read (self):
+        self.reads += 1
+        return [properties.DeviceProperty ("Device Enabled", 152, [str (self.reads)])]
+    
+    def test_fetch (self):
+        
+        first = self.cache.fetch (6, "Mouse", self.read)
+        second = self.cache.fetch (6, "Mouse", self.read)
+        
+        self.assertIs (first, second)
+        self.assertEqual (self.reads, 1)
+        self.assertIs (self.cache.get (6, "Mouse"), first)
+    
+    def test_other_device (self):
+        
+        # the same ID, but not the same device
+        self.cache.fetch (6, "Mouse", self.read)
+        self.assertEqual (self.cache.get (6, "Keyboard"), None)
+        self.cache.fetch (6, "Keyboard", self.read)
+        self.assertEqual (self.reads, 2)
+    
+    def test_invalidate (self):
+        
+        self.cache.fetch (6, "Mouse", self.read)
+        self.cache.fetch (7, "Keyboard", self.read)
+        self.cache.invalidate ([6])
+        
+        self.assertEqual (self.cache.get (6, "Mouse"), None)
+        self.assertNotEqual (self.cache.get (7, "Keyboard"), None)
+        self.assertEqual (self.cache.fetch (6, "Mouse", self.read)[0].values, ["3"])
+    
+    def test_invalidated_while_reading (self):
+        
+        def read ():
+            # the property changes while it's being read
+            self.cache.invalidate ([6])
+            return self.read ()
+        
+        self.cache.fetch (6, "Mouse", read)
+        self.assertEqual (self.cache.get (6, "Mouse"), None)
+    
+    def test_clear (self):
+        
+        self.cache.fetch (6, "Mouse", self.read)
+        self.cache.clear ()
+        self.assertEqual (self.cache.get (6, "Mouse"), None)
+
+class XinputTest (unittest.TestCase):
+    
+    def setUp (self):
+        use_devices ()
+        properties.get_property_cache ().clear ()
+    
+    def test_write (self):
+        
+        results = properties.write_properties ([(6, "libinput Accel Speed", ["0.5"]),
+                                                (15, "libinput Accel Speed", ["-0.5"])])
+        
+        self.assertEqual ([result.returncode for result in results], [0, 0])
+        self.assertEqual (sorted (xinput_runs ()), [["set-prop", "15", "libinput", "Accel", "Speed", "-0.5"],
+                                                    ["set-prop", "6", "libinput", "Accel", "Speed", "0.5"]])
+    
+    def test_get_properties (self):
+        
+        properties.get_properties (6, "Logitech USB Optical Mouse")
+        properties.get_properties (6, "Logitech USB Optical Mouse")
+        self.assertEqual (xinput_runs (), [["list-props", "6"]])
+        
+        properties.get_property_cache ().invalidate ([6])
+        properties.get_properties (6, "Logitech USB Optical Mouse")
+        self.assertEqual (len (xinput_runs ()), 2)
+    
+    def test_per_display (self):
+        self.assertIsNot (properties.get_property_cache (":91"), properties.get_property_cache ())
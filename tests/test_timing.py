@@ -0,0 +1,124 @@
+# xinput-ui tests: timing and instrumentation.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from support import use_devices
+from xinputui import timing
+from xinputui.devices import get_device_status
+
+# The counters are shared by the whole program, so each test uses phase
+# names of its own and only looks at what changed since it started.
+
+class PhaseTest (unittest.TestCase):
+    
+    def test_nested (self):
+        
+        with timing.phase ("test_nested outer"):
+            time.sleep (0.05)
+            with timing.phase ("test_nested inner"):
+                time.sleep (0.05)
+                timing.count_spawn (2048)
+        
+        outer = timing.phases["test_nested outer"]
+        inner = timing.phases["test_nested inner"]
+        self.assertEqual ((outer.calls, inner.calls), (1, 1))
+        
+        # the inner phase's time counts for the outer one, but not as its own
+        self.assertGreaterEqual (outer.seconds, 0.1)
+        self.assertLess (outer.own_seconds, outer.seconds - inner.seconds + 0.01)
+        self.assertEqual ((outer.spawns, outer.bytes_read), (1, 2048))
+        self.assertEqual ((inner.spawns, inner.bytes_read), (1, 2048))
+    
+    def test_timed (self):
+        
+        @timing.timed ("test_timed")
+        def double (value):
+            
+            """Doubles a value."""
+            
+            return value * 2
+        
+        self.assertEqual ([double (1), double (2)], [2, 4])
+        self.assertEqual (timing.phases["test_timed"].calls, 2)
+        self.assertEqual ((double.__name__, double.__doc__), ("double", "Doubles a value."))
+    
+    def test_error (self):
+        
+        def fail ():
+            with timing.phase ("test_error"):
+                raise ValueError ()
+        
+        # still counted, and not left open
+        self.assertRaises (ValueError, fail)
+        self.assertEqual (timing.phases["test_error"].calls, 1)
+        self.assertEqual (getattr (timing._local, "stack", []), [])
+    
+    def test_describe (self):
+        
+        since = timing.snapshot ()
+        with timing.phase ("test_describe slow"):
+            time.sleep (0.05)
+            timing.count_spawn (1024)
+        for _ in range (2):
+            with timing.phase ("test_describe fast"):
+                pass
+        
+        description = timing.describe (since)
+        
+        # slowest first, with how often it ran if that was more than once
+        self.assertTrue (description.startswith ("1 spawned, 1.0 KB read; test_describe slow "), description)
+        self.assertIn ("; test_describe fast 0.0 ms (2x)", description)
+    
+    def test_device_status (self):
+        
+        use_devices ()
+        since = timing.snapshot ()
+        get_device_status ()
+        
+        phases, totals = timing.snapshot ()
+        self.assertEqual (totals["spawns"] - since[1]["spawns"], 1)
+        self.assertEqual (phases["get_device_status"].calls - since[0].get ("get_device_status", timing.PhaseStats ()).calls, 1)
+
+class MarkTest (unittest.TestCase):
+    
+    def test_first_only (self):
+        
+        timing.mark ("test_first_only")
+        timing.mark ("test_first_only")
+        
+        self.assertEqual ([label for label, _ in timing.marks].count ("test_first_only"), 1)
+
+class TraceTest (unittest.TestCase):
+    
+    def test_write_trace (self):
+        
+        with timing.phase ("test_write_trace"):
+            timing.count_spawn (10)
+        timing.mark ("test_write_trace mark")
+        
+        fd, path = tempfile.mkstemp (prefix = "xinput-ui-tests.", suffix = ".json")
+        os.close (fd)
+        try:
+            timing.write_trace (path)
+            with open (path) as f:
+                trace = json.load (f)["traceEvents"]
+        finally:
+            os.remove (path)
+        
+        phase = [event for event in trace if event["name"] == "test_write_trace"][-1]
+        self.assertEqual ((phase["ph"], phase["args"]), ("X", {"spawns": 1, "bytes_read": 10}))
+        self.assertGreaterEqual (phase["dur"], 0)
+        
+        mark = [event for event in trace if event["name"] == "test_write_trace mark"][0]
+        self.assertEqual (mark["ph"], "i")
+        
+        # the thread the phase ran on has a name
+        names = [event for event in trace if event["ph"] == "M" and event["tid"] == phase["tid"]]
+        self.assertEqual (names[0]["args"]["name"], "MainThread")
@@ -0,0 +1,184 @@
+# xinput-ui tests: recording and replaying xinput sessions.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from support import use_devices, without, xinput_runs
+from xinputui import transcript
+from xinputui.commands import CommandExecutor
+from xinputui.devices import FLOATING_ID, get_device_status, get_metadata_cache
+
+class TranscriptTestCase (unittest.TestCase):
+    
+    """Gives each test its own transcript file and transcript setting."""
+    
+    def setUp (self):
+        
+        use_devices ()
+        
+        fd, self.path = tempfile.mkstemp (prefix = "xinput-ui-tests.", suffix = ".jsonl")
+        os.close (fd)
+        
+        self.saved_transcript = transcript._transcript
+        self.saved_environ = dict ((name, os.environ.get (name)) for name in ("XINPUT_UI_RECORD", "XINPUT_UI_REPLAY"))
+    
+    def tearDown (self):
+        
+        transcript._transcript = self.saved_transcript
+        for name, value in self.saved_environ.iteritems ():
+            if value is None:
+                os.environ.pop (name, None)
+            else:
+                os.environ[name] = value
+        os.remove (self.path)
+    
+    def use (self, recorder_or_replayer):
+        transcript._transcript = recorder_or_replayer
+    
+    def write_entries (self, *entries):
+        with open (self.path, "w") as f:
+            for argv, returncode, output in entries:
+                f.write (json.dumps ({"argv": argv, "returncode": returncode,
+                                      "output": output, "elapsed": 0.1})+"\n")
+
+class RecordTest (TranscriptTestCase):
+    
+    def test_record (self):
+        
+        self.use (transcript.TranscriptRecorder (self.path))
+        get_device_status ()
+        CommandExecutor ().run ([["xinput", "float", "6"], ["/nonexistent/program", "--version"]])
+        
+        with open (self.path) as f:
+            entries = [json.loads (line) for line in f]
+        
+        # xinput is recorded by name, wherever it was found
+        self.assertEqual ([entry["argv"] for entry in entries],
+                          [["xinput", "list", "--long"], ["xinput", "float", "6"], ["/nonexistent/program", "--version"]])
+        self.assertEqual ([entry["returncode"] for entry in entries], [0, 0, None])
+        self.assertIn ("Wacom tablet", entries[0]["output"])
+        self.assertTrue (all (entry["elapsed"] >= 0 and not entry["timed_out"] for entry in entries))
+    
+    def test_replay (self):
+        
+        self.use (transcript.TranscriptRecorder (self.path))
+        recorded = get_device_status ()
+        recorded_results = CommandExecutor ().run ([["xinput", "float", "6"]])
+        
+        # nothing is run while replaying, and the answers are the same
+        use_devices ([])
+        self.use (transcript.TranscriptReplayer (self.path))
+        replayed = get_device_status ()
+        replayed_results = CommandExecutor ().run ([["xinput", "float", "6"]])
+        
+        self.assertEqual (xinput_runs (), [])
+        self.assertEqual (sorted (replayed), sorted (recorded))
+        self.assertEqual (sorted (slave.name for slave in replayed[2].children),
+                          sorted (slave.name for slave in recorded[2].children))
+        self.assertEqual ([(result.command, result.returncode) for result in replayed_results],
+                          [(result.command, result.returncode) for result in recorded_results])
+    
+    def test_repeated_replay (self):
+        
+        self.use (transcript.TranscriptRecorder (self.path))
+        get_device_status ()
+        
+        # a recording of one refresh answers any number of them, whatever
+        # has been cached meanwhile
+        use_devices ([])
+        self.use (transcript.TranscriptReplayer (self.path))
+        counts = [sum (len (master.children) for master in get_device_status ().values ()) for _ in range (3)]
+        self.assertEqual (counts, [6, 6, 6])
+    
+    def test_displays (self):
+        
+        use_devices (without (9, 10, 11, 12, 15), ":91")
+        try:
+            self.use (transcript.TranscriptRecorder (self.path))
+            get_device_status (":91")
+            get_device_status ()
+        finally:
+            os.remove (os.environ["XINPUT_TEST_LIST"] + ":91")
+        
+        # each display's answers are kept apart
+        use_devices ([])
+        get_metadata_cache (":91").clear ()
+        self.use (transcript.TranscriptReplayer (self.path))
+        self.assertEqual (sorted (get_device_status (":91")), [FLOATING_ID, 2])
+        self.assertEqual (sorted (get_device_status ()), [FLOATING_ID, 2, 9])
+
+class ReplayerTest (TranscriptTestCase):
+    
+    def test_order (self):
+        
+        self.write_entries ((["xinput", "float", "6"], 1, "first\n"),
+                            (["xinput", "float", "6"], 0, "second\n"))
+        replayer = transcript.TranscriptReplayer (self.path)
+        
+        # in the order recorded, and then the last one again
+        self.assertEqual ([replayer.replay (["/usr/bin/xinput", "float", "6"]).output for _ in range (3)],
+                          ["first\n", "second\n", "second\n"])
+    
+    def test_not_recorded (self):
+        
+        self.write_entries ()
+        self.use (transcript.TranscriptReplayer (self.path))
+        result = CommandExecutor ().run ([["xinput", "float", "6"]])[0]
+        
+        self.assertEqual (result.status_text (), "not started")
+        self.assertEqual (xinput_runs (), [])
+
+class EnvironmentTest (TranscriptTestCase):
+    
+    def test_none (self):
+        
+        os.environ.pop ("XINPUT_UI_RECORD", None)
+        os.environ.pop ("XINPUT_UI_REPLAY", None)
+        self.use (None)
+        self.assertEqual (transcript.get_transcript (), None)
+    
+    def test_replay_wins (self):
+        
+        self.write_entries ()
+        os.environ["XINPUT_UI_RECORD"] = self.path
+        os.environ["XINPUT_UI_REPLAY"] = self.path
+        self.use (None)
+        
+        replayer = transcript.get_transcript ()
+        self.assertTrue (replayer.replaying)
+        self.assertIs (transcript.get_transcript (), replayer)
+    
+    def test_threads (self):
+        
+        recorder_class = transcript.TranscriptRecorder
+        
+        class SlowRecorder (recorder_class):
+            def __init__ (self, path):
+                time.sleep (0.05)
+                recorder_class.__init__ (self, path)
+        
+        os.environ.pop ("XINPUT_UI_REPLAY", None)
+        os.environ["XINPUT_UI_RECORD"] = self.path
+        self.use (None)
+        transcript.TranscriptRecorder = SlowRecorder
+        try:
+            found = []
+            threads = [threading.Thread (target = lambda: found.append (transcript.get_transcript ())) for _ in range (4)]
+            for thread in threads:
+                thread.start ()
+            for thread in threads:
+                thread.join ()
+        finally:
+            transcript.TranscriptRecorder = recorder_class
+        
+        # every thread gets the one recorder
+        self.assertEqual (len (found), 4)
+        self.assertIsNotNone (found[0])
+        self.assertTrue (all (recorder is found[0] for recorder in found))
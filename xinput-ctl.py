@@ -0,0 +1,23 @@
+#! /usr/bin/env python2.7
+
+# xinput-ctl
+# The command-line counterpart of xinput-ui, for login scripts and the like.
+# It shares xinput-ui's device model and planner but never loads wx, so it
+# starts in a fraction of the time. Run it with --help for usage.
+
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+import time
+started = time.time ()
+
+import sys
+
+from xinputui import timing
+timing.start (started)
+
+from xinputui.cli import main
+timing.mark ("engine imported")
+status = main ()
+timing.mark ("done")
+sys.exit (status)
@@ -0,0 +1,21 @@
+# xinput-ui
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""The xinput-ui package. Only gui imports wx; the rest work without it.
+
+devices     --  The device model, and reading it from the X server.
+commands    --  Applying a command plan.
+hotplug     --  Watching for devices being plugged in and removed.
+plan        --  Planning changes to the device hierarchy.
+profiles    --  Saving and restoring MPX layouts.
+transcript  --  Recording and replaying xinput sessions.
+displays    --  Working with several X displays at once.
+activity    --  Noticing which devices are being used.
+properties  --  Reading, caching and writing device properties.
+cli         --  The headless command-line interface.
+gui         --  The wx front-end, which the launcher only imports when needed.
+timing      --  Startup timing and instrumentation.
+
+"""
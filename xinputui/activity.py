@@ -0,0 +1,138 @@
+# xinput-ui: noticing which devices are being used.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Input activity monitoring, for telling identical devices apart.
+
+When a lab has twenty slaves all called "USB Optical Mouse", the quickest way
+to find one is to move it and see which lights up. This needs XInput2 raw
+events, so there's no xinput fallback.
+
+The same monitor, given PROPERTY_EVENTS, reports devices whose properties
+changed instead, which is how cached properties are kept up to date.
+
+"""
+
+import os
+import select
+import threading
+import time
+
+from xinputui.devices import XI2Display, XI2Unavailable, XI_RAW_KEY_PRESS, XI_RAW_BUTTON_PRESS, \
+                             XI_RAW_MOTION, XI_PROPERTY_EVENT
+from xinputui.transcript import get_transcript
+
+# How often ActivityMonitor reports at most, in seconds
+ACTIVITY_UPDATE_INTERVAL = 0.25
+
+# The XI2 events that count as a device being used, or having its
+# properties changed
+INPUT_EVENTS = (XI_RAW_KEY_PRESS, XI_RAW_BUTTON_PRESS, XI_RAW_MOTION)
+PROPERTY_EVENTS = (XI_PROPERTY_EVENT,)
+
+class ActivityMonitor:
+    
+    """Reports which slaves are being used, from a background thread.
+    
+    Listens for raw key presses, button presses and motion on an XI2
+    connection of its own. callback (device_ids) is called from the monitor
+    thread with the set of slave IDs that sent any since the previous call,
+    at most once every interval seconds however fast the events come, so
+    that twenty mice at 1000 Hz still only cost a few updates a second. Once
+    the devices fall quiet there's one more call, with an empty set, so that
+    highlights can be cleared, and then none until something happens again.
+    
+    events are the XI2 event types to listen for; see select_events.
+    
+    """
+    
+    def __init__ (self, callback, display_name = None, interval = ACTIVITY_UPDATE_INTERVAL,
+                  events = INPUT_EVENTS):
+        
+        self.callback = callback
+        self.display_name = display_name
+        self.interval = interval
+        self.events = events
+        self.source = None
+        self.thread = None
+    
+    def _open_source (self):
+        
+        # a replayed session has nothing to do with the devices here
+        if get_transcript () is not None or os.environ.get ("XINPUT_UI_BACKEND") == "xinput":
+            return None
+        
+        try:
+            # sourceid is only filled in from XI 2.1 on
+            display = XI2Display (self.display_name, minor_version = 2)
+        except XI2Unavailable:
+            return None
+        display.select_events (self.events)
+        return display
+    
+    def start (self):
+        
+        """Start monitoring. Returns False if XInput2 can't be used."""
+        
+        self.source = self._open_source ()
+        if self.source is None:
+            return False
+        
+        # written to by stop(), to wake the thread up
+        self.wake_read, self.wake_write = os.pipe ()
+        
+        self.thread = threading.Thread (target = self._run)
+        self.thread.daemon = True
+        self.thread.start ()
+        
+        return True
+    
+    def stop (self):
+        
+        if self.thread is None:
+            return
+        
+        os.write (self.wake_write, b'x')
+        self.thread.join ()
+        self.thread = None
+        
+        os.close (self.wake_read)
+        os.close (self.wake_write)
+        self.source.close ()
+    
+    def _run (self):
+        
+        active = set ()
+        # when to call back next, or None while nothing is going on
+        deadline = None
+        # whether the last callback had any devices in it
+        reported = False
+        
+        while True:
+            
+            timeout = None
+            if deadline is not None:
+                timeout = max (0.0, deadline - time.time ())
+            readable = select.select ([self.source.fileno (), self.wake_read], [], [], timeout)[0]
+            if self.wake_read in readable:
+                return
+            
+            if len (readable):
+                self.source.read_device_events (active)
+                if deadline is None and len (active):
+                    deadline = time.time () + self.interval
+            
+            if deadline is None or time.time () < deadline:
+                continue
+            
+            if len (active):
+                self.callback (active)
+                active = set ()
+                reported = True
+                deadline = time.time () + self.interval
+            else:
+                if reported:
+                    self.callback (set ())
+                reported = False
+                deadline = None
@@ -0,0 +1,329 @@
+# xinput-ui: the headless command-line interface.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Command-line interface for scripts, which never loads wx.
+
+Each invocation reads the device list once, plans the requested changes with
+the same Plan the GUI uses, and applies them. Devices can be given by name or
+by numeric ID.
+
+With --display given more than once, the same thing is done to every one of
+those displays; reading and applying happen on all of them at once.
+
+"""
+
+import argparse
+import pipes
+import shlex
+import sys
+
+from xinputui.devices import CORE_MASTER_NAME, SlaveDevice, PendingDevice, XI2Error, device_sort, \
+                             get_device_status, master_base_name
+from xinputui.commands import apply_commands
+from xinputui.displays import map_concurrently
+from xinputui.plan import Plan, PlanError
+from xinputui.profiles import ProfileError, list_profiles, load_profile, save_profile, \
+                              capture_profile, restore_profile, get_slave_identities
+
+def find_device (plan, spec, masters = False):
+    
+    """Look up a device by ID or name, for the command line.
+    
+    A numeric spec matches a slave's ID or either ID of a master pair; any
+    other spec must match a device's name exactly, or the name a master was
+    created with (e.g. "Left hand" for "Left hand pointer"). Masters that are
+    pending creation can be found by name too. With masters set, only masters are
+    considered. Raises PlanError if there isn't exactly one match.
+    
+    """
+    
+    candidates = []
+    for master in plan.master_devices.values ():
+        if master != plan.floating_group:
+            candidates.append (master)
+        if not masters:
+            candidates.extend (master.children)
+    candidates.extend (plan.all_creations)
+    
+    if spec.isdigit ():
+        device_id = int (spec)
+        found = [device for device in candidates if device.__class__ != PendingDevice and
+                 device_id in (device.self_id, getattr (device, 'keyboard_id', None))]
+    else:
+        found = [device for device in candidates if device.name == spec or
+                 (device.__class__ != SlaveDevice and master_base_name (device) == spec)]
+    
+    kind = 'master' if masters else 'device'
+    if not len (found):
+        raise PlanError ('No such '+kind+': '+spec)
+    if len (found) > 1:
+        raise PlanError ('More than one '+kind+' is called "'+spec+'"; use its ID instead')
+    return found[0]
+
+def find_slaves (plan, specs):
+    
+    slaves = []
+    for spec in specs:
+        device = find_device (plan, spec)
+        if device.__class__ != SlaveDevice:
+            raise PlanError ('Not a physical device: '+spec)
+        slaves.append (device)
+    return slaves
+
+def plan_move (plan, args):
+    plan.MoveDevicesCmd (find_slaves (plan, args.devices), find_device (plan, args.master, masters = True))
+
+def plan_float (plan, args):
+    plan.DetachDevicesCmd (find_slaves (plan, args.devices))
+
+def plan_create (plan, args):
+    for name in args.names:
+        plan.CreateDeviceCmd (PendingDevice (name))
+
+def plan_remove (plan, args):
+    for spec in args.masters:
+        device = find_device (plan, spec, masters = True)
+        if master_base_name (device) == CORE_MASTER_NAME:
+            raise PlanError ('The X server always keeps '+device.name+'; it cannot be removed')
+        if not plan.CanRemove (device):
+            raise PlanError ('Cannot remove '+device.name)
+        plan.DeleteDeviceCmd (device)
+
+def plan_file (plan, args):
+    
+    """Plan every line of a plan file, as one transaction.
+    
+    Each line holds one move, float, create or remove, written the same way
+    as on the command line. Names with spaces in them need quoting, and
+    everything after a # is ignored.
+    
+    """
+    
+    plan_parser = make_plan_parser ()
+    
+    # read once, since the same plan may go to several displays
+    if not hasattr (args, 'lines'):
+        args.lines = args.file.readlines ()
+    
+    with plan.Transaction ():
+        for lineno, line in enumerate (args.lines, 1):
+            words = shlex.split (line, comments = True)
+            if not len (words):
+                continue
+            try:
+                line_args = plan_parser.parse_args (words)
+                line_args.func (plan, line_args)
+            except PlanError as e:
+                raise PlanError (args.file.name+':'+str(lineno)+': '+str(e))
+
+def plan_restore (plan, args):
+    
+    profile = load_profile (args.name)
+    identities = get_slave_identities (plan.master_devices, display_name = args.display_name)
+    missing = restore_profile (plan, profile, identities, args.prune)
+    for identity in missing:
+        sys.stderr.write ('Not found: '+identity["name"]+' (#'+str(identity.get ("ordinal", 0))+')\n')
+
+class PlanLineParser (argparse.ArgumentParser):
+    
+    """Reports bad plan file lines as PlanErrors instead of exiting."""
+    
+    def error (self, message):
+        raise PlanError (message)
+
+def add_plan_commands (subparsers):
+    
+    """The subcommands that can appear both on the command line and in plans."""
+    
+    sub = subparsers.add_parser ('move', help = 'attach physical devices to a master')
+    sub.add_argument ('devices', nargs = '+', metavar = 'DEVICE')
+    sub.add_argument ('master', metavar = 'MASTER')
+    sub.set_defaults (func = plan_move)
+    
+    sub = subparsers.add_parser ('float', help = 'detach physical devices from their master')
+    sub.add_argument ('devices', nargs = '+', metavar = 'DEVICE')
+    sub.set_defaults (func = plan_float)
+    
+    sub = subparsers.add_parser ('create', help = 'create master pointer/keyboard pairs')
+    sub.add_argument ('names', nargs = '+', metavar = 'NAME')
+    sub.set_defaults (func = plan_create)
+    
+    sub = subparsers.add_parser ('remove', help = 'remove masters, floating their devices')
+    sub.add_argument ('masters', nargs = '+', metavar = 'MASTER')
+    sub.set_defaults (func = plan_remove)
+    
+    return subparsers
+
+def make_plan_parser ():
+    
+    parser = PlanLineParser (prog = 'plan', add_help = False)
+    add_plan_commands (parser.add_subparsers ())
+    return parser
+
+def make_parser ():
+    
+    parser = argparse.ArgumentParser (
+        description = 'Inspect and change the MPX device hierarchy without a GUI.'
+    )
+    parser.add_argument ('-n', '--dry-run', action = 'store_true',
+                         help = 'print the commands instead of running them')
+    parser.add_argument ('-D', '--display', action = 'append', metavar = 'DISPLAY',
+                         help = 'the X display to use instead of $DISPLAY; may be given more than once')
+    
+    subparsers = add_plan_commands (parser.add_subparsers ())
+    
+    # commands that only look at the current state have a report
+    # function instead of a plan function
+    parser.set_defaults (report = None)
+    
+    sub = subparsers.add_parser ('list', help = 'show masters and their devices')
+    sub.set_defaults (report = print_devices)
+    
+    sub = subparsers.add_parser ('profiles', help = 'list saved profiles')
+    sub.set_defaults (report = print_profiles)
+    
+    sub = subparsers.add_parser ('save', help = 'save the current layout as a profile')
+    sub.add_argument ('name', metavar = 'PROFILE')
+    sub.set_defaults (report = save_current)
+    
+    sub = subparsers.add_parser ('restore', help = 'bring back a saved layout')
+    sub.add_argument ('--prune', action = 'store_true',
+                      help = 'also remove masters that are not in the profile')
+    sub.add_argument ('name', metavar = 'PROFILE')
+    sub.set_defaults (func = plan_restore)
+    
+    sub = subparsers.add_parser ('apply-plan', help = 'apply a file of changes in one go')
+    sub.add_argument ('file', type = argparse.FileType ('r'), help = 'plan file, or - for stdin')
+    sub.set_defaults (func = plan_file)
+    
+    return parser
+
+def print_devices (plan, args):
+    
+    masters = [master for master in device_sort (plan.master_devices.values ()) if master != plan.floating_group]
+    masters.append (plan.floating_group)
+    
+    for master in masters:
+        if master == plan.floating_group:
+            print master.name
+        else:
+            print master.name+' [pointer '+str(master.pointer_id)+', keyboard '+str(master.keyboard_id)+']'
+        for slave in master.children:
+            print '    '+slave.name+' ['+str(slave.self_id)+']'
+
+def print_profiles (plan, args):
+    
+    for name in list_profiles ():
+        print name
+
+def save_current (plan, args):
+    
+    identities = get_slave_identities (plan.master_devices, display_name = args.display_name)
+    save_profile (args.name, capture_profile (plan, identities))
+
+def format_command (cmd):
+    
+    """A command as it would be typed into a shell."""
+    
+    return ' '.join (pipes.quote (arg) for arg in cmd)
+
+def report_results (results, error, prefix = ''):
+    
+    """Report the commands that failed to apply. Returns an exit status.
+    
+    results and error are what apply_commands returned or raised.
+    
+    """
+    
+    if error is not None:
+        sys.stderr.write (prefix+'Could not apply changes: '+str(error)+'\n')
+        return 1
+    
+    if results is None:
+        return 0
+    
+    status = 0
+    for result in results:
+        if result.succeeded ():
+            continue
+        status = 1
+        sys.stderr.write (prefix+format_command (result.command)+': '+result.status_text ()+'\n')
+        if len (result.output):
+            sys.stderr.write (result.output)
+    return status
+
+def plan_display (args, plan, master_devices, error, display_name = None, prefix = ''):
+    
+    """Do what args ask for to one display's plan. Returns an exit status.
+    
+    master_devices and error are what get_device_status returned or raised
+    for display_name. Anything left in plan.all_commands afterwards is to
+    be applied.
+    
+    """
+    
+    # the plan and report functions only get args, and some of them need
+    # to talk to the same display
+    args.display_name = display_name
+    
+    if error is not None:
+        if not isinstance (error, (OSError, XI2Error)):
+            raise error
+        sys.stderr.write (prefix+'Could not load the device list: '+str(error)+'\n')
+        return 1
+    plan.Load (master_devices)
+    
+    try:
+        if args.report is not None:
+            args.report (plan, args)
+            return 0
+        args.func (plan, args)
+    except (PlanError, ProfileError) as e:
+        sys.stderr.write (prefix+str(e)+'\n')
+        return 2
+    
+    if args.dry_run:
+        for cmd in plan.all_commands:
+            print format_command (cmd)
+    
+    return 0
+
+def main (argv = None):
+    
+    """Entry point. Returns the exit status."""
+    
+    args = make_parser ().parse_args (argv)
+    
+    display_names = args.display or [None]
+    several = len (display_names) > 1
+    reporting = args.report is not None or args.dry_run
+    
+    # Read every display at once, plan for each in turn (so that their
+    # output and errors stay together), then apply to them all at once.
+    loaded = map_concurrently (get_device_status, display_names)
+    
+    status = 0
+    plans = []
+    for display_name, (master_devices, error) in zip (display_names, loaded):
+        prefix = display_name+': ' if several else ''
+        if several and reporting:
+            print display_name+':'
+        plan = Plan ()
+        display_status = plan_display (args, plan, master_devices, error, display_name, prefix)
+        status = max (status, display_status)
+        if not display_status and not reporting:
+            plans.append ((display_name, prefix, plan))
+    
+    if reporting:
+        return status
+    
+    applied = map_concurrently (lambda entry: apply_commands (entry[2].all_commands, entry[0]), plans)
+    
+    for (display_name, prefix, plan), (results, error) in zip (plans, applied):
+        if error is not None and not isinstance (error, XI2Error):
+            raise error
+        status = max (status, report_results (results, error, prefix))
+    
+    return status
@@ -0,0 +1,230 @@
+# xinput-ui: running the commands of a plan.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Applying a command plan, through XInput2 or the xinput utility.
+
+"""
+
+import collections
+import subprocess
+import threading
+import time
+
+from xinputui import timing
+from xinputui.devices import get_xinput_path, get_xi2_display, xinput_environment
+from xinputui.transcript import get_transcript
+
+# Limits for CommandExecutor when applying changes through xinput
+APPLY_MAX_WORKERS = 4
+APPLY_TIMEOUT = 10.0 # seconds, per command
+
+# How many threads run_concurrently may start, all callers together
+MAX_HELPERS = 8
+_helper_slots = threading.BoundedSemaphore (MAX_HELPERS)
+
+# CommandExecutor runs commands in this order, one stage at a time. Commands
+# within a stage don't depend on each other and may run concurrently.
+COMMAND_STAGES = {
+    "remove-master": 0,
+    "create-master": 1,
+    "reattach": 2,
+    "float": 2,
+}
+
+def run_concurrently (func, items, max_workers):
+    
+    """Call func on every item, on up to max_workers threads at once.
+    
+    The calling thread is one of them. The others are helper threads, and
+    all callers together never have more than MAX_HELPERS of those, however
+    their calls overlap or nest (applying to several displays at once, say).
+    When no helper is to be had, the caller does the work alone.
+    
+    Returns a (result, error) pair for each item, in the same order, where
+    error is the exception func raised, or None if it returned normally.
+    
+    """
+    
+    results = [None] * len (items)
+    pending = collections.deque (enumerate (items))
+    
+    def work ():
+        while True:
+            try:
+                index, item = pending.popleft ()
+            except IndexError:
+                return
+            try:
+                results[index] = (func (item), None)
+            except Exception as e:
+                results[index] = (None, e)
+    
+    def helper ():
+        try:
+            work ()
+        finally:
+            _helper_slots.release ()
+    
+    # never wait for a helper: the caller may be a helper itself, and the
+    # one holding the slot it would be waiting for
+    helpers = []
+    for _ in range (min (max_workers, len (items)) - 1):
+        if not _helper_slots.acquire (False):
+            break
+        thread = threading.Thread (target = helper)
+        thread.start ()
+        helpers.append (thread)
+    
+    work ()
+    for thread in helpers:
+        thread.join ()
+    
+    return results
+
+class CommandResult:
+    
+    """The outcome of one command run by CommandExecutor.
+    
+    Attributes:
+    command     --  The command as it appeared in the plan.
+    returncode  --  The exit status, or None if it couldn't be started.
+    output      --  Everything the command wrote to stdout and stderr, or the
+                    reason it couldn't be started.
+    elapsed     --  Wall time in seconds.
+    timed_out   --  True if it was killed for taking longer than the timeout.
+    
+    """
+    
+    def __init__ (self, command, returncode, output, elapsed, timed_out = False):
+        self.command = command
+        self.returncode = returncode
+        self.output = output
+        self.elapsed = elapsed
+        self.timed_out = timed_out
+    
+    def succeeded (self):
+        return self.returncode == 0 and not self.timed_out
+    
+    def status_text (self):
+        if self.timed_out:
+            return "timed out"
+        elif self.returncode is None:
+            return "not started"
+        elif self.returncode:
+            return "exit "+str(self.returncode)
+        else:
+            return "OK"
+
+class CommandExecutor:
+    
+    """Runs a plan of xinput commands in dependency order.
+    
+    The plan is split into stages according to COMMAND_STAGES: master
+    removals first, then creations, then reattaches and floats. Each stage
+    finishes before the next one starts. Within a stage, commands are run
+    concurrently by up to max_workers threads. Every process is waited for,
+    and killed if it runs longer than timeout seconds. The commands are sent
+    to display_name, or to whatever $DISPLAY says if that's None.
+    
+    """
+    
+    def __init__ (self, max_workers = APPLY_MAX_WORKERS, timeout = APPLY_TIMEOUT, display_name = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.display_name = display_name
+    
+    def run (self, commands):
+        
+        """Run every command, return CommandResults in the same order."""
+        
+        results = [None] * len (commands)
+        
+        stages = {}
+        for index, cmd in enumerate (commands):
+            stage = COMMAND_STAGES.get (cmd[1], len (COMMAND_STAGES))
+            stages.setdefault (stage, []).append (index)
+        
+        for stage in sorted (stages):
+            self._run_stage (commands, stages[stage], results)
+        
+        return results
+    
+    def _run_stage (self, commands, indices, results):
+        
+        stage = run_concurrently (self.run_one, [commands[index] for index in indices], self.max_workers)
+        for index, (result, error) in zip (indices, stage):
+            if error is not None:
+                result = CommandResult (commands[index], None, str (error), 0.0)
+            results[index] = result
+    
+    @timing.timed ("CommandExecutor.run_one")
+    def run_one (self, cmd):
+        
+        """Run a single command to completion and return its CommandResult."""
+        
+        argv = cmd
+        if cmd[0] == "xinput":
+            argv = [get_xinput_path ()] + cmd[1:]
+        
+        transcript = get_transcript ()
+        if transcript is not None and transcript.replaying:
+            entry = transcript.replay (argv, self.display_name)
+            return CommandResult (cmd, entry.returncode, entry.output, entry.elapsed, entry.timed_out)
+        
+        start = time.time ()
+        
+        try:
+            p = subprocess.Popen (argv,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT,
+                                  env=xinput_environment (self.display_name))
+        except OSError as e:
+            if transcript is not None:
+                transcript.record (argv, None, str (e), time.time () - start,
+                                   display_name = self.display_name)
+            return CommandResult (cmd, None, str (e), time.time () - start)
+        
+        timed_out = []
+        def kill ():
+            timed_out.append (True)
+            try:
+                p.kill ()
+            except OSError:
+                pass # already exited
+        
+        timer = threading.Timer (self.timeout, kill)
+        timer.start ()
+        try:
+            output = p.communicate ()[0]
+        finally:
+            timer.cancel ()
+        timing.count_spawn (len (output))
+        
+        elapsed = time.time () - start
+        if transcript is not None:
+            transcript.record (argv, p.returncode, output, elapsed, bool (timed_out), self.display_name)
+        
+        return CommandResult (cmd, p.returncode, output, elapsed, bool (timed_out))
+
+def apply_commands (commands, display_name = None):
+    
+    """Carry out a command plan against the X server.
+    
+    With XInput2 available, the whole plan goes to the server as a single
+    XIChangeHierarchy request and None is returned. Otherwise each command
+    is run through the xinput utility by a CommandExecutor, and a list of
+    CommandResults is returned. display_name picks the X server; by default
+    it's whatever $DISPLAY says.
+    
+    Raises XI2Error if the XI2 request is refused.
+    
+    """
+    
+    display = get_xi2_display (display_name)
+    if display is not None:
+        display.change_hierarchy (commands)
+        return None
+    
+    return CommandExecutor (display_name = display_name).run (commands)
@@ -0,0 +1,1378 @@
+# xinput-ui: the device model, and how to read it from the X server.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Device model and enumeration.
+
+Nothing in here depends on wx, so it can be used without a display toolkit.
+
+"""
+
+from string import whitespace as str_whitespace
+import bisect
+import operator
+import os
+import re
+import struct
+import subprocess
+import threading
+import time
+import contextlib
+import ctypes, ctypes.util
+
+from xinputui import timing
+from xinputui.transcript import get_transcript
+
+INVALID_ID = -2
+FLOATING_ID = -1
+
+# The base name (see master_base_name) of the master the server always has
+CORE_MASTER_NAME = "Virtual core"
+
+# XInput2 constants, from <X11/extensions/XInput2.h>
+XI_ALL_DEVICES = 0
+XI_MASTER_POINTER = 1
+XI_MASTER_KEYBOARD = 2
+XI_SLAVE_POINTER = 3
+XI_SLAVE_KEYBOARD = 4
+XI_FLOATING_SLAVE = 5
+XI_KEY_CLASS = 0
+XI_BUTTON_CLASS = 1
+XI_VALUATOR_CLASS = 2
+XI_CLASS_NAMES = {
+    "XIKeyClass": XI_KEY_CLASS,
+    "XIButtonClass": XI_BUTTON_CLASS,
+    "XIValuatorClass": XI_VALUATOR_CLASS,
+}
+XI_ADD_MASTER = 1
+XI_REMOVE_MASTER = 2
+XI_ATTACH_SLAVE = 3
+XI_DETACH_SLAVE = 4
+XI_FLOATING = 2 # return_mode for XI_REMOVE_MASTER
+XI_DEVICE_CHANGED = 1
+XI_HIERARCHY_CHANGED = 11
+XI_PROPERTY_EVENT = 12
+XI_RAW_KEY_PRESS = 13
+XI_RAW_BUTTON_PRESS = 15
+XI_RAW_MOTION = 17
+GENERIC_EVENT = 35 # from <X11/X.h>
+PROP_MODE_REPLACE = 0
+XA_ATOM = 4 # from <X11/Xatom.h>
+XA_CARDINAL = 6
+XA_INTEGER = 19
+XA_STRING = 31
+
+# How much of a property XI2Display reads at most, in 32-bit units
+PROPERTY_READ_LENGTH = 1024
+
+# Matches one line of "xinput list --short" output, for example:
+#   "<box-drawing chars> Logitech USB Optical Mouse   \tid=9\t[slave  pointer  (2)]"
+# The name is greedy so that device names which themselves contain "id=" or
+# square brackets are still split on the LAST id/class field pair.
+DEVICE_LINE_RE = re.compile (r'^(.*)\sid=(\d+)\s+\[([^\[]*)\]\s*$')
+
+# Matches the class lines under each device in "xinput list --long" output,
+# for example "\t\tClass originated from: 9. Type: XIButtonClass"
+DEVICE_CLASS_RE = re.compile (r'\sType: (XI\w+Class)\s*$')
+
+# With the xinput fallback, a refresh that finds up to this many floating
+# slaves whose classes aren't cached asks xinput about each of them in turn;
+# with more, it reads the whole long listing again instead.
+METADATA_QUERY_LIMIT = 4
+
+_xinput_path = None
+
+# Guards the per-display caches below, which worker threads for different
+# displays may fill in at the same time
+_display_lock = threading.Lock ()
+
+# display name -> environment to run xinput in; see xinput_environment
+_environments = {}
+
+def get_xinput_path ():
+    
+    """Locate the xinput executable on $PATH, once.
+    
+    The result is cached, so subsequent calls don't touch the filesystem.
+    Falls back to the bare name "xinput" if it can't be found, in which case
+    starting it will fail the same way it always would have.
+    
+    """
+    
+    global _xinput_path
+    
+    if _xinput_path is None:
+        _xinput_path = "xinput"
+        for directory in os.environ.get ("PATH", os.defpath).split (os.pathsep):
+            candidate = os.path.join (directory, "xinput")
+            if os.path.isfile (candidate) and os.access (candidate, os.X_OK):
+                _xinput_path = candidate
+                break
+    
+    return _xinput_path
+
+def xinput_environment (display_name = None):
+    
+    """The environment xinput should run in to talk to a display.
+    
+    None, meaning our own environment, for the default display. Otherwise a
+    copy of it with $DISPLAY changed, made once per display and then reused
+    for every command sent there.
+    
+    """
+    
+    if display_name is None:
+        return None
+    
+    with _display_lock:
+        env = _environments.get (display_name)
+        if env is None:
+            env = dict (os.environ)
+            env["DISPLAY"] = display_name
+            _environments[display_name] = env
+    
+    return env
+
+@timing.timed ("run_command")
+def run_command (command, display_name = None):
+    transcript = get_transcript ()
+    if transcript is not None and transcript.replaying:
+        return iter (transcript.replay (command, display_name).output.splitlines (True))
+    start = time.time ()
+    p = subprocess.Popen(command,
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT,
+                         env=xinput_environment (display_name))
+    output = p.communicate ()[0] # also reaps the process
+    timing.count_spawn (len (output))
+    if transcript is not None:
+        transcript.record (command, p.returncode, output, time.time () - start, display_name = display_name)
+    return iter(output.splitlines (True))
+
+def mystrip (string):
+    """Strip the extra Unicode characters "xinput list" likes to output."""
+    str_special = '\xe2\x8e\xa1\xe2\x8e\x9c\xe2\x86\xb3\xe2\x8e\xa3\x88\xbc'
+    return string.strip(str_whitespace+str_special)
+
+def device_sort (device_set):
+    """Sort a set of devices by self_id. Can't be used with PendingDevices!"""
+    return sorted(device_set, key = operator.attrgetter ('self_id'))
+
+class DeviceList (object):
+    
+    """A set of devices that is always in device_sort order.
+    
+    Used for a master's children and for the lists in
+    Plan.display_heirarchy. Membership is a set lookup, add and discard
+    find their place by bisection, and iterating needs no sorting. Can't
+    hold PendingDevices, which have no self_id.
+    
+    """
+    
+    __slots__ = ("ids", "devices", "members")
+    
+    def __init__ (self, devices = ()):
+        self.ids = []
+        self.devices = []
+        self.members = set ()
+        for device in devices:
+            self.add (device)
+    
+    def add (self, device):
+        if device in self.members:
+            return
+        index = bisect.bisect (self.ids, device.self_id)
+        self.ids.insert (index, device.self_id)
+        self.devices.insert (index, device)
+        self.members.add (device)
+    
+    def discard (self, device):
+        if device not in self.members:
+            return
+        index = bisect.bisect_left (self.ids, device.self_id)
+        # IDs are unique, except for a moment while a refresh is merged in
+        while self.devices[index] is not device:
+            index += 1
+        del self.ids[index]
+        del self.devices[index]
+        self.members.remove (device)
+    
+    def remove (self, device):
+        if device not in self.members:
+            raise KeyError (device)
+        self.discard (device)
+    
+    def __contains__ (self, device):
+        return device in self.members
+    
+    def __iter__ (self):
+        return iter (self.devices)
+    
+    def __len__ (self):
+        return len (self.devices)
+
+def is_pointer_device (use, class_types):
+    
+    """Whether the X server treats a device as a pointer or a keyboard.
+    
+    use is one of the XI_* device use values, and class_types is a set of
+    XI_*_CLASS values. For floating slaves this mirrors IsPointerDevice() in
+    the X server, which is what decides which kind of master a device can be
+    attached to.
+    
+    """
+    
+    if use in (XI_MASTER_POINTER, XI_SLAVE_POINTER):
+        return True
+    if use in (XI_MASTER_KEYBOARD, XI_SLAVE_KEYBOARD):
+        return False
+    valuator = XI_VALUATOR_CLASS in class_types
+    return valuator and (XI_BUTTON_CLASS in class_types or XI_KEY_CLASS not in class_types)
+
+# These device classes must all have a public "name" attribute
+
+class MasterDevice (object):
+    
+    """A master pointer/keyboard pair that exists in the X server.
+    
+    Attributes:
+    name        --  A string used for display purposes.
+    pointer_id  --  The numeric ID of the master pointer of the pair.
+                    This is either a value assigned by the X server, or the
+                    special value FLOATING_ID.
+    keyboard_id --  The numeric ID of the master keyboard of the pair.
+                    This is either a value assigned by X server, or the
+                    special value FLOATING_ID.
+    self_id     --  Always the same as pointer_id. This is what is used to 
+                    uniquely identify the device.
+    children    --  A DeviceList of SlaveDevice objects corresponding to the
+                    physical input hardware devices that are CURRENTLY
+                    slaved to the pair.
+    
+    FLOATING_ID is used on only one instance of MasterDevice. This special
+    instance doesn't correspond to a pointer/keyboard pair that actually
+    exits, but is rather used to group all the "floating" (un-slaved) hardware
+    input devices together.
+    
+    """
+    
+    __slots__ = ("name", "children", "self_id", "pointer_id", "keyboard_id", "expanded")
+    
+    def __init__ (self, name):
+        self.name = name
+        self.children = DeviceList ()
+        self.self_id = self.pointer_id = self.keyboard_id = INVALID_ID
+        self.expanded = True
+    
+    def set_pointer_id (self, pointer_id):
+        """MUST be called before any devices are slaved!"""
+        self.pointer_id = pointer_id
+        self.self_id = pointer_id # for device_sort
+    
+    def set_keyboard_id (self, keyboard_id):
+        """MUST be called before any devices are slaved!"""
+        self.keyboard_id = keyboard_id
+    
+    def add_slave (self, slave_id, slave_name, is_pointer = None):
+        """Creates a SlaveDevice."""
+        assert self.self_id != INVALID_ID
+        assert self.pointer_id != INVALID_ID
+        assert self.keyboard_id != INVALID_ID
+        self.children.add (SlaveDevice (self, slave_id, slave_name, is_pointer))
+
+class SlaveDevice (object): # real physical hardware device
+    
+    """A slave (physical hardware) input device connected to the computer.
+    
+    Attributes:
+    name        --  A string used for display purposes.
+    self_id     --  A numeric ID assigned by the X server.
+    parent      --  The MasterDevice object that this device is CURRENTLY
+                    slaved to in the X server. 
+    is_pointer  --  True if the device can only be attached to a master
+                    pointer, False if only to a master keyboard, None if
+                    that couldn't be determined.
+    
+    """
+    
+    __slots__ = ("self_id", "name", "parent", "is_pointer")
+    
+    def __init__ (self, parent, self_id, name, is_pointer = None):
+        self.self_id = self_id
+        self.name = name
+        self.parent = parent
+        self.is_pointer = is_pointer
+    
+    def get_master_id (self, master):
+        
+        """The ID of the half of master that this device would attach to.
+        
+        Returns None if the device's type is unknown.
+        
+        """
+        
+        if self.is_pointer is None:
+            return None
+        elif self.is_pointer:
+            return master.pointer_id
+        else:
+            return master.keyboard_id
+
+class PendingDevice (object): # virtual device which is pending creation
+    
+    """A master pointer/keyboard pair which is pending creation.
+    
+    The user has given it a name, but it hasn't been actually created, so it
+    doesn't have any numeric IDs assigned yet. Until pending changes are 
+    applied, hardware input devices cannot be slaved to it.
+    
+    """
+    
+    __slots__ = ("name", "expanded")
+    
+    def __init__ (self, name):
+        self.name = name
+        self.expanded = False #really doesn't matter which
+
+def master_base_name (master):
+    
+    """The name a master was created with: its pointer's, minus " pointer"."""
+    
+    if master.__class__ == PendingDevice:
+        return master.name
+    if master.name.endswith (" pointer"):
+        return master.name[:-len (" pointer")]
+    return master.name
+
+def parse_device_line (line):
+    
+    """Parse one line of "xinput list --short" output.
+    
+    Also accepts the device lines of "xinput list --long".
+    
+    Returns a (self_id, name, raw_class_data) tuple, or None if the line isn't
+    a device line (for instance, an error message on stderr.) raw_class_data
+    is the bracketed field split into tokens, e.g. ['slave', 'pointer', '2']
+    or ['floating', 'slave'].
+    
+    """
+    
+    match = DEVICE_LINE_RE.match (line)
+    if match is None:
+        return None
+    
+    name = mystrip (match.group (1))
+    raw_class_data = [field.strip ('()') for field in match.group (3).split ()]
+    
+    return int (match.group (2)), name, raw_class_data
+
+class DeviceMetadataCache:
+    
+    """The classes of every device seen so far, keyed by X device ID.
+    
+    A device's classes never change while it exists, and telling a floating
+    slave's kind apart is all they're needed for, so a refresh only has to
+    find out about devices that are new since the last one. An entry is only
+    used while the device with that ID still has the same name, and entries
+    for IDs that have gone away are dropped, so an ID the server hands out
+    again is looked up afresh.
+    
+    """
+    
+    def __init__ (self):
+        self.lock = threading.Lock ()
+        self.entries = {} # self_id -> (name, class_types)
+    
+    def get (self, self_id, name):
+        
+        """The cached classes of a device, or None."""
+        
+        entry = self.entries.get (self_id)
+        if entry is None or entry[0] != name:
+            return None
+        return entry[1]
+    
+    def put (self, self_id, name, class_types):
+        
+        self.entries[self_id] = (name, class_types)
+    
+    def retain (self, self_ids):
+        
+        """Forget every device not in self_ids."""
+        
+        for self_id in self.entries.keys ():
+            if self_id not in self_ids:
+                del self.entries[self_id]
+    
+    def clear (self):
+        
+        self.entries = {}
+
+# shared by both backends; this one is for the default display
+metadata_cache = DeviceMetadataCache ()
+
+# display name -> its DeviceMetadataCache, since device IDs are per server
+_metadata_caches = {None: metadata_cache}
+
+def get_metadata_cache (display_name = None):
+    
+    with _display_lock:
+        cache = _metadata_caches.get (display_name)
+        if cache is None:
+            cache = _metadata_caches[display_name] = DeviceMetadataCache ()
+    
+    return cache
+
+def _parse_xinput_list (lines):
+    
+    """Parse "xinput list" output into {self_id: [name, raw_class_data, classes]}.
+    
+    classes is the set of classes listed under the device, which is empty
+    for the short format. XTEST devices are left out.
+    
+    """
+    
+    ret = {}
+    class_types = None
+    
+    for line in lines:
+        
+        match = DEVICE_CLASS_RE.search (line)
+        if match is not None:
+            if class_types is not None and match.group (1) in XI_CLASS_NAMES:
+                class_types.add (XI_CLASS_NAMES[match.group (1)])
+            continue
+        
+        parsed = parse_device_line (line)
+        if parsed is None:
+            continue
+        device_self_id, device_name, raw_class_data = parsed
+        
+        # the class lines that follow belong to this device
+        class_types = set ()
+        
+        # filter out XTEST devices
+        if device_name.find ("XTEST") == -1:
+            ret.update ({device_self_id: [device_name, raw_class_data, class_types]})
+    
+    return ret
+
+def read_raw_device_data_xinput (display_name = None):
+    
+    """Invokes the external program "xinput" and returns a "raw" device list.
+    
+    The output is cleaned up an split into lines and tokens, but still not
+    very useful without further processing.
+    
+    The first refresh reads everything from a single "xinput list --long"
+    invocation. The long format is used because it lists each device's
+    classes, which is the only way to tell whether a floating slave is a
+    keyboard or a pointer, but it's many times the size of the short one.
+    So later refreshes read "xinput list --short" and take the classes from
+    metadata_cache, asking about only the floating slaves that aren't in it
+    (or reading the long listing again, if there are a lot of those.)
+    Attached slaves whose classes aren't known get an empty set, since
+    their attachment already tells their kind.
+    
+    While a transcript is being recorded or replayed, every refresh reads
+    the long listing, so that a recording of one refresh can answer any
+    number of them. A short listing that comes back empty (say, because
+    xinput failed) is never trusted either; the long one is read instead.
+    
+    This is the fallback used when XInput2 can't be used directly; see
+    XI2Display.
+    
+    """
+    
+    xinput = get_xinput_path ()
+    metadata_cache = get_metadata_cache (display_name)
+    
+    with metadata_cache.lock:
+        
+        ret = {}
+        if len (metadata_cache.entries) and get_transcript () is None:
+            ret = _parse_xinput_list (run_command ([xinput, "list", "--short"], display_name))
+        
+        if len (ret):
+            missing = []
+            for device_id, rawdevice in ret.iteritems ():
+                class_types = metadata_cache.get (device_id, rawdevice[0])
+                if class_types is not None:
+                    rawdevice[2] = class_types
+                elif rawdevice[1][0] == 'floating':
+                    missing.append (device_id)
+            if len (missing) <= METADATA_QUERY_LIMIT:
+                for device_id in missing:
+                    found = _parse_xinput_list (run_command ([xinput, "list", "--long", str (device_id)], display_name))
+                    if device_id in found and found[device_id][0] == ret[device_id][0]:
+                        ret[device_id][2] = found[device_id][2]
+                        metadata_cache.put (device_id, ret[device_id][0], ret[device_id][2])
+                metadata_cache.retain (ret)
+                return ret
+        
+        ret = _parse_xinput_list (run_command ([xinput, "list", "--long"], display_name))
+        metadata_cache.clear ()
+        for device_id, rawdevice in ret.iteritems ():
+            metadata_cache.put (device_id, rawdevice[0], rawdevice[2])
+        return ret
+
+class _XIAnyClassInfo (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("sourceid", ctypes.c_int)]
+
+class _XIDeviceInfo (ctypes.Structure):
+    _fields_ = [("deviceid", ctypes.c_int),
+                ("name", ctypes.c_char_p),
+                ("use", ctypes.c_int),
+                ("attachment", ctypes.c_int),
+                ("enabled", ctypes.c_int),
+                ("num_classes", ctypes.c_int),
+                ("classes", ctypes.POINTER (ctypes.POINTER (_XIAnyClassInfo)))]
+
+class _XIAddMasterInfo (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("name", ctypes.c_char_p),
+                ("send_core", ctypes.c_int),
+                ("enable", ctypes.c_int)]
+
+class _XIRemoveMasterInfo (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("deviceid", ctypes.c_int),
+                ("return_mode", ctypes.c_int),
+                ("return_pointer", ctypes.c_int),
+                ("return_keyboard", ctypes.c_int)]
+
+class _XIAttachSlaveInfo (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("deviceid", ctypes.c_int),
+                ("new_master", ctypes.c_int)]
+
+class _XIDetachSlaveInfo (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("deviceid", ctypes.c_int)]
+
+class _XIAnyHierarchyChangeInfo (ctypes.Union):
+    _fields_ = [("type", ctypes.c_int),
+                ("add", _XIAddMasterInfo),
+                ("remove", _XIRemoveMasterInfo),
+                ("attach", _XIAttachSlaveInfo),
+                ("detach", _XIDetachSlaveInfo)]
+
+class _XErrorEvent (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("display", ctypes.c_void_p),
+                ("resourceid", ctypes.c_ulong),
+                ("serial", ctypes.c_ulong),
+                ("error_code", ctypes.c_ubyte),
+                ("request_code", ctypes.c_ubyte),
+                ("minor_code", ctypes.c_ubyte)]
+
+class _XIEventMask (ctypes.Structure):
+    _fields_ = [("deviceid", ctypes.c_int),
+                ("mask_len", ctypes.c_int),
+                ("mask", ctypes.POINTER (ctypes.c_ubyte))]
+
+class _XGenericEventCookie (ctypes.Structure):
+    _fields_ = [("type", ctypes.c_int),
+                ("serial", ctypes.c_ulong),
+                ("send_event", ctypes.c_int),
+                ("display", ctypes.c_void_p),
+                ("extension", ctypes.c_int),
+                ("evtype", ctypes.c_int),
+                ("cookie", ctypes.c_uint),
+                ("data", ctypes.c_void_p)]
+
+class _XEvent (ctypes.Union):
+    _fields_ = [("type", ctypes.c_int),
+                ("xcookie", _XGenericEventCookie),
+                ("pad", ctypes.c_long * 24)]
+
+class _XIRawEvent (ctypes.Structure):
+    # only the start of it; the valuators that follow aren't needed
+    _fields_ = [("type", ctypes.c_int),
+                ("serial", ctypes.c_ulong),
+                ("send_event", ctypes.c_int),
+                ("display", ctypes.c_void_p),
+                ("extension", ctypes.c_int),
+                ("evtype", ctypes.c_int),
+                ("time", ctypes.c_ulong),
+                ("deviceid", ctypes.c_int),
+                ("sourceid", ctypes.c_int)]
+
+_XErrorHandler = ctypes.CFUNCTYPE (ctypes.c_int, ctypes.c_void_p, ctypes.POINTER (_XErrorEvent))
+
+class XI2Unavailable (Exception):
+    
+    """Raised when XInput2 can't be used: no libXi, no X server, or no XI2."""
+
+class XI2Error (Exception):
+    
+    """Raised when the X server rejects (or would reject) a hierarchy change."""
+
+# Held while an XI2Display has its own Xlib error handler installed, since
+# connections to other displays may be used on other threads meanwhile
+_error_handler_lock = threading.Lock ()
+
+class XI2Display:
+    
+    """A persistent connection to the X server for talking XInput2 directly.
+    
+    Uses ctypes against libX11 and libXi, so that the device list can be
+    fetched with a single XIQueryDevice request instead of running xinput and
+    scraping its text output. The connection is opened once and kept around
+    for subsequent refreshes.
+    
+    Attributes:
+    display_name    --  The X display this is connected to, or None for
+                        whatever $DISPLAY says.
+    
+    minor_version is the XInput 2 minor version to announce to the server;
+    raw events only say which slave they came from from 2.1 on.
+    
+    """
+    
+    def __init__ (self, display_name = None, minor_version = 0):
+        
+        self.display_name = display_name
+        self.metadata_cache = get_metadata_cache (display_name)
+        
+        # Xlib isn't thread-safe unless XInitThreads was called first, which
+        # we can't guarantee, so every request goes through this lock.
+        self.lock = threading.Lock ()
+        
+        self.xlib = self._load_library ("X11")
+        self.xi = self._load_library ("Xi")
+        
+        self.xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self.xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self.xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib.XFlush.argtypes = [ctypes.c_void_p]
+        self.xlib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        self.xlib.XSetErrorHandler.restype = _XErrorHandler
+        self.xlib.XSetErrorHandler.argtypes = [_XErrorHandler]
+        self.xlib.XGetErrorText.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                                            ctypes.c_char_p, ctypes.c_int]
+        self.xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        self.xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self.xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        self.xlib.XPending.argtypes = [ctypes.c_void_p]
+        self.xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        self.xlib.XInternAtom.restype = ctypes.c_ulong
+        self.xlib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        self.xlib.XFree.argtypes = [ctypes.c_void_p]
+        self.xlib.XQueryExtension.argtypes = [ctypes.c_void_p, ctypes.c_char_p,
+                                              ctypes.POINTER (ctypes.c_int),
+                                              ctypes.POINTER (ctypes.c_int),
+                                              ctypes.POINTER (ctypes.c_int)]
+        self.xlib.XGetEventData.argtypes = [ctypes.c_void_p, ctypes.POINTER (_XGenericEventCookie)]
+        self.xlib.XFreeEventData.argtypes = [ctypes.c_void_p, ctypes.POINTER (_XGenericEventCookie)]
+        self.xlib.XGetAtomNames.argtypes = [ctypes.c_void_p, ctypes.POINTER (ctypes.c_ulong),
+                                            ctypes.c_int, ctypes.POINTER (ctypes.c_void_p)]
+        
+        self.xi.XIQueryVersion.restype = ctypes.c_int
+        self.xi.XIQueryVersion.argtypes = [ctypes.c_void_p,
+                                           ctypes.POINTER (ctypes.c_int),
+                                           ctypes.POINTER (ctypes.c_int)]
+        self.xi.XIQueryDevice.restype = ctypes.POINTER (_XIDeviceInfo)
+        self.xi.XIQueryDevice.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                                          ctypes.POINTER (ctypes.c_int)]
+        self.xi.XIFreeDeviceInfo.argtypes = [ctypes.POINTER (_XIDeviceInfo)]
+        self.xi.XIChangeHierarchy.restype = ctypes.c_int
+        self.xi.XIChangeHierarchy.argtypes = [ctypes.c_void_p,
+                                              ctypes.POINTER (_XIAnyHierarchyChangeInfo),
+                                              ctypes.c_int]
+        self.xi.XISelectEvents.argtypes = [ctypes.c_void_p, ctypes.c_ulong,
+                                           ctypes.POINTER (_XIEventMask),
+                                           ctypes.c_int]
+        self.xi.XIGetProperty.restype = ctypes.c_int
+        self.xi.XIGetProperty.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_ulong,
+                                          ctypes.c_long, ctypes.c_long, ctypes.c_int,
+                                          ctypes.c_ulong, ctypes.POINTER (ctypes.c_ulong),
+                                          ctypes.POINTER (ctypes.c_int),
+                                          ctypes.POINTER (ctypes.c_ulong),
+                                          ctypes.POINTER (ctypes.c_ulong),
+                                          ctypes.POINTER (ctypes.POINTER (ctypes.c_ubyte))]
+        self.xi.XIListProperties.restype = ctypes.POINTER (ctypes.c_ulong)
+        self.xi.XIListProperties.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                                             ctypes.POINTER (ctypes.c_int)]
+        self.xi.XIChangeProperty.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_ulong,
+                                             ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                             ctypes.c_char_p, ctypes.c_int]
+        
+        # atoms never change while the server runs, so they're only looked
+        # up once; name -> atom and atom -> name
+        self.atoms = {}
+        self.atom_names = {}
+        
+        self.display = self.xlib.XOpenDisplay (display_name)
+        if not self.display:
+            raise XI2Unavailable ("Cannot open display "+str(display_name))
+        
+        major = ctypes.c_int (2)
+        minor = ctypes.c_int (minor_version)
+        if self.xi.XIQueryVersion (self.display, ctypes.byref (major), ctypes.byref (minor)) != 0:
+            self.close ()
+            raise XI2Unavailable ("X server does not support XInput 2")
+        
+        # needed to tell XI2 events apart from other extensions' generic events
+        opcode = ctypes.c_int (0)
+        unused = ctypes.c_int (0)
+        self.xlib.XQueryExtension (self.display, "XInputExtension", ctypes.byref (opcode),
+                                   ctypes.byref (unused), ctypes.byref (unused))
+        self.opcode = opcode.value
+    
+    @staticmethod
+    def _load_library (name):
+        
+        path = ctypes.util.find_library (name)
+        if path is None:
+            raise XI2Unavailable ("lib"+name+" not found")
+        try:
+            return ctypes.CDLL (path)
+        except OSError as e:
+            raise XI2Unavailable (str (e))
+    
+    def close (self):
+        
+        if self.display:
+            self.xlib.XCloseDisplay (self.display)
+            self.display = None
+    
+    def fileno (self):
+        
+        """The socket of the X connection, for use with select()."""
+        
+        return self.xlib.XConnectionNumber (self.display)
+    
+    def select_hotplug_events (self):
+        
+        """Ask for XI_HierarchyChanged and XI_DeviceChanged events.
+        
+        These arrive whenever a device is added, removed, enabled, disabled,
+        attached, floated or changes its classes. Use a dedicated XI2Display
+        for this, since waiting for events would otherwise hold up requests.
+        
+        """
+        
+        self.select_events ((XI_HIERARCHY_CHANGED, XI_DEVICE_CHANGED))
+    
+    def select_events (self, events):
+        
+        """Ask for XI2 events of the given types from every device.
+        
+        Raw key presses, button presses and motion (XI_RAW_KEY_PRESS etc.)
+        come from the slaves themselves, whichever window has focus and even
+        while another client has grabbed the device, which is what telling
+        identical devices apart by using them needs. XI_PROPERTY_EVENT says
+        that one of a device's properties was changed, by anybody. Use a
+        dedicated XI2Display for this, as for select_hotplug_events. Motion
+        may arrive at 1000 Hz per mouse, so read it with read_device_events.
+        
+        """
+        
+        mask = (ctypes.c_ubyte * 4) ()
+        for event in events:
+            mask[event >> 3] |= 1 << (event & 7)
+        
+        event_mask = _XIEventMask (XI_ALL_DEVICES, len (mask), mask)
+        
+        with self.lock:
+            root = self.xlib.XDefaultRootWindow (self.display)
+            self.xi.XISelectEvents (self.display, root, ctypes.byref (event_mask), 1)
+            self.xlib.XFlush (self.display)
+    
+    def read_device_events (self, device_ids):
+        
+        """Read all queued events, adding their devices to device_ids.
+        
+        An event's device is the slave a raw event came from, or the device
+        whose property changed. device_ids is a set, so however many events
+        a device sent it's only in there once. Returns how many events there
+        were.
+        
+        """
+        
+        count = 0
+        event = _XEvent ()
+        cookie = ctypes.pointer (event.xcookie)
+        
+        with self.lock:
+            while self.xlib.XPending (self.display):
+                self.xlib.XNextEvent (self.display, ctypes.byref (event))
+                count += 1
+                if event.type != GENERIC_EVENT or event.xcookie.extension != self.opcode:
+                    continue
+                if not self.xlib.XGetEventData (self.display, cookie):
+                    continue
+                try:
+                    raw = ctypes.cast (event.xcookie.data, ctypes.POINTER (_XIRawEvent)).contents
+                    if event.xcookie.evtype == XI_PROPERTY_EVENT:
+                        # starts the same way, but has no sourceid
+                        device_ids.add (raw.deviceid)
+                    else:
+                        # sourceid is the slave it came from, except before
+                        # XI 2.1, where only a slave deviceid tells
+                        device_ids.add (raw.sourceid or raw.deviceid)
+                finally:
+                    self.xlib.XFreeEventData (self.display, cookie)
+        
+        return count
+    
+    def drain_events (self):
+        
+        """Read and discard all queued events. Returns how many there were."""
+        
+        count = 0
+        event = (ctypes.c_long * 24) () # sizeof (XEvent)
+        
+        with self.lock:
+            while self.xlib.XPending (self.display):
+                self.xlib.XNextEvent (self.display, event)
+                count += 1
+        
+        return count
+    
+    def _query_devices (self):
+        
+        """Returns (deviceid, name, use, attachment, class_types) tuples.
+        
+        class_types is a frozenset of the XI_*_CLASS values the device has.
+        The caller must hold self.lock.
+        
+        """
+        
+        ret = []
+        
+        ndevices = ctypes.c_int (0)
+        info = self.xi.XIQueryDevice (self.display, XI_ALL_DEVICES, ctypes.byref (ndevices))
+        if not info:
+            return ret
+        try:
+            metadata_cache = self.metadata_cache
+            with metadata_cache.lock:
+                for i in range (ndevices.value):
+                    device = info[i]
+                    # walking the class list is most of the cost of a query
+                    class_types = metadata_cache.get (device.deviceid, device.name)
+                    if class_types is None:
+                        class_types = frozenset (device.classes[j].contents.type for j in range (device.num_classes))
+                        metadata_cache.put (device.deviceid, device.name, class_types)
+                    ret.append ((device.deviceid, device.name, device.use, device.attachment, class_types))
+                metadata_cache.retain (set (device[0] for device in ret))
+        finally:
+            self.xi.XIFreeDeviceInfo (info)
+        
+        return ret
+    
+    def read_raw_device_data (self):
+        
+        """Same as read_raw_device_data_xinput, but in one XI2 round trip."""
+        
+        ret = {}
+        
+        with self.lock:
+            devices = self._query_devices ()
+        
+        for device_id, device_name, use, attachment, class_types in devices:
+            if device_name.find ("XTEST") == -1:
+                ret.update ({device_id: [device_name, self._raw_class_data (use, attachment), class_types]})
+        
+        return ret
+    
+    def _find_device (self, spec, devices):
+        
+        """Look up a device given by ID or, like xinput allows, by name."""
+        
+        if spec.isdigit ():
+            device_id = int (spec)
+            if device_id in devices:
+                return device_id
+        else:
+            for device in devices.values ():
+                if device[1] == spec:
+                    return device[0]
+        raise XI2Error ("No such device: "+spec)
+    
+    def _translate_command (self, cmd, devices):
+        
+        """Turn one xinput command line into a hierarchy change tuple.
+        
+        Returns None for a "reattach" whose master is the wrong type for the
+        slave. Changes.GetDeviceCommands still emits two of those per move
+        for devices whose type couldn't be determined; only one is right.
+        
+        """
+        
+        verb = cmd[1]
+        
+        try:
+            if verb == "create-master":
+                name = cmd[2]
+                if not isinstance (name, str):
+                    name = name.encode ("utf-8")
+                return (XI_ADD_MASTER, name)
+            
+            device_id = self._find_device (cmd[2], devices)
+            use = devices[device_id][2]
+            
+            if verb == "remove-master":
+                if use not in (XI_MASTER_POINTER, XI_MASTER_KEYBOARD):
+                    raise XI2Error ("Not a master device: "+cmd[2])
+                return (XI_REMOVE_MASTER, device_id)
+            
+            if verb == "float":
+                return (XI_DETACH_SLAVE, device_id)
+            
+            if verb == "reattach":
+                master_id = self._find_device (cmd[3], devices)
+                slave_is_pointer = is_pointer_device (use, devices[device_id][4])
+                master_is_pointer = is_pointer_device (devices[master_id][2], devices[master_id][4])
+                if slave_is_pointer != master_is_pointer:
+                    return None
+                return (XI_ATTACH_SLAVE, device_id, master_id)
+        
+        except IndexError:
+            pass
+        
+        raise XI2Error ("Unsupported command: "+" ".join (cmd))
+    
+    @contextlib.contextmanager
+    def _trap_errors (self):
+        
+        """Collect X errors instead of letting Xlib exit the process.
+        
+        The default Xlib error handler exits, so wrap requests that may fail
+        in this. Raises XI2Error afterwards if there were any errors. The
+        caller must hold self.lock.
+        
+        """
+        
+        errors = []
+        def on_error (display, event):
+            errors.append (event.contents.error_code)
+            return 0
+        handler = _XErrorHandler (on_error)
+        # the error handler is process-wide, not per connection
+        with _error_handler_lock:
+            old_handler = self.xlib.XSetErrorHandler (handler)
+            try:
+                yield
+                self.xlib.XSync (self.display, 0)
+            finally:
+                self.xlib.XSetErrorHandler (old_handler)
+        
+        if len (errors):
+            text = ctypes.create_string_buffer (256)
+            self.xlib.XGetErrorText (self.display, errors[0], text, len (text))
+            raise XI2Error (text.value)
+    
+    def _send_changes (self, commands):
+        
+        """Check and send one XIChangeHierarchy request. Needs self.lock."""
+        
+        devices = {device[0]: device for device in self._query_devices ()}
+        
+        changes = []
+        for cmd in commands:
+            change = self._translate_command (cmd, devices)
+            if change is not None:
+                changes.append (change)
+        
+        if not len (changes):
+            return
+        
+        array = (_XIAnyHierarchyChangeInfo * len (changes)) ()
+        for i, change in enumerate (changes):
+            if change[0] == XI_ADD_MASTER:
+                array[i].add.type = XI_ADD_MASTER
+                array[i].add.name = change[1]
+                array[i].add.send_core = 1
+                array[i].add.enable = 1
+            elif change[0] == XI_REMOVE_MASTER:
+                array[i].remove.type = XI_REMOVE_MASTER
+                array[i].remove.deviceid = change[1]
+                array[i].remove.return_mode = XI_FLOATING
+            elif change[0] == XI_ATTACH_SLAVE:
+                array[i].attach.type = XI_ATTACH_SLAVE
+                array[i].attach.deviceid = change[1]
+                array[i].attach.new_master = change[2]
+            else:
+                array[i].detach.type = XI_DETACH_SLAVE
+                array[i].detach.deviceid = change[1]
+        
+        with self._trap_errors ():
+            self.xi.XIChangeHierarchy (self.display, array, len (changes))
+    
+    def change_hierarchy (self, commands):
+        
+        """Apply a list of xinput commands as one XIChangeHierarchy request.
+        
+        Supports the commands Changes generates: create-master,
+        remove-master, reattach and float. Every command is checked against
+        the current device list before anything is sent, so a bad plan is
+        rejected as a whole rather than half-applied. The server itself stops
+        at the first change it refuses, so a plan that goes stale between
+        the check and the request can still be applied partially.
+        
+        A reattach may name its master instead of giving its ID, for masters
+        that the same plan creates. Such a plan is sent as two requests:
+        removals and creations first, then everything else, checked against
+        the device list as it is after the first request.
+        
+        Raises XI2Error if the plan is invalid or the server rejects it.
+        
+        """
+        
+        batches = [commands]
+        if any (cmd[1] == "reattach" and len (cmd) > 3 and not cmd[3].isdigit () for cmd in commands):
+            first = [cmd for cmd in commands if cmd[1] in ("remove-master", "create-master")]
+            rest = [cmd for cmd in commands if cmd[1] not in ("remove-master", "create-master")]
+            batches = [first, rest]
+        
+        with self.lock:
+            for batch in batches:
+                self._send_changes (batch)
+    
+    def get_device_nodes (self):
+        
+        """Returns {device ID: device node} for every device that has one.
+        
+        The device node (e.g. "/dev/input/event5") comes from the "Device
+        Node" property that the evdev and libinput drivers set. Devices
+        without one, and devices that vanish meanwhile, are left out.
+        
+        """
+        
+        ret = {}
+        
+        with self.lock:
+            
+            atom = self.xlib.XInternAtom (self.display, "Device Node", 1)
+            if not atom:
+                return ret # no driver has set it on any device
+            
+            try:
+                with self._trap_errors ():
+                    for device in self._query_devices ():
+                        prop = self._get_property (device[0], atom)
+                        if prop is not None and prop[1] == 8 and len (prop[2]):
+                            ret[device[0]] = prop[2].rstrip ("\0")
+            except XI2Error:
+                pass # a device went away meanwhile; the rest are still good
+        
+        return ret
+    
+    def _intern (self, name, only_if_exists = False):
+        
+        """The atom for name, or 0 if there isn't one yet. Needs self.lock."""
+        
+        atom = self.atoms.get (name)
+        if atom is None:
+            atom = self.xlib.XInternAtom (self.display, name, int (only_if_exists))
+            if atom:
+                self.atoms[name] = atom
+                self.atom_names[atom] = name
+        return atom
+    
+    def _get_atom_names (self, atoms):
+        
+        """The names of a list of atoms, in one round trip. Needs self.lock."""
+        
+        unknown = list (set (atom for atom in atoms if atom and atom not in self.atom_names))
+        if len (unknown):
+            array = (ctypes.c_ulong * len (unknown)) (*unknown)
+            names = (ctypes.c_void_p * len (unknown)) ()
+            if self.xlib.XGetAtomNames (self.display, array, len (unknown), names):
+                for atom, name in zip (unknown, names):
+                    self.atom_names[atom] = ctypes.string_at (name)
+                    self.atoms[self.atom_names[atom]] = atom
+                    self.xlib.XFree (name)
+        
+        return [self.atom_names.get (atom, "None") for atom in atoms]
+    
+    def _get_property (self, device_id, atom, length = PROPERTY_READ_LENGTH):
+        
+        """Read one property of a device: (type, format, data), or None.
+        
+        data is the value's bytes, length is how much of it to read in
+        32-bit units. None means the device doesn't have that property.
+        Needs self.lock, and X errors trapped.
+        
+        """
+        
+        type_return = ctypes.c_ulong (0)
+        format_return = ctypes.c_int (0)
+        num_items = ctypes.c_ulong (0)
+        bytes_after = ctypes.c_ulong (0)
+        data = ctypes.POINTER (ctypes.c_ubyte) ()
+        status = self.xi.XIGetProperty (
+            self.display, device_id, atom, 0, length, 0, 0,
+            ctypes.byref (type_return), ctypes.byref (format_return),
+            ctypes.byref (num_items), ctypes.byref (bytes_after),
+            ctypes.byref (data))
+        
+        value = ""
+        if data:
+            # unlike XGetWindowProperty, 32-bit items really are 32 bits
+            value = ctypes.string_at (data, num_items.value * format_return.value // 8)
+            self.xlib.XFree (data)
+        
+        if status != 0 or not type_return.value:
+            return None
+        return (type_return.value, format_return.value, value)
+    
+    def _property_code (self, prop_type, prop_format):
+        
+        """The struct code for one item of a property, or None.
+        
+        Needs self.lock.
+        
+        """
+        
+        if prop_type == XA_STRING:
+            return None
+        if prop_format == 32 and prop_type == self._intern ("FLOAT", True):
+            return "f"
+        code = {8: "b", 16: "h", 32: "i"}.get (prop_format)
+        if code is not None and prop_type != XA_INTEGER:
+            code = code.upper () # CARDINAL, ATOM and the rest are unsigned
+        return code
+    
+    def list_properties (self, device_id):
+        
+        """Returns (name, atom, values) for every property of a device.
+        
+        values is a list of strings, written the way "xinput list-props"
+        shows them, but without the quotes and atom numbers. Raises XI2Error
+        if there's no such device.
+        
+        """
+        
+        ret = []
+        
+        with self.lock:
+            with self._trap_errors ():
+                
+                count = ctypes.c_int (0)
+                array = self.xi.XIListProperties (self.display, device_id, ctypes.byref (count))
+                if not array:
+                    return ret
+                atoms = array[:count.value]
+                self.xlib.XFree (array)
+                
+                for name, atom in zip (self._get_atom_names (atoms), atoms):
+                    prop = self._get_property (device_id, atom)
+                    if prop is None:
+                        continue # deleted meanwhile
+                    prop_type, prop_format, data = prop
+                    code = self._property_code (prop_type, prop_format)
+                    if code is None:
+                        values = data.rstrip ("\0").split ("\0") if len (data) else []
+                    else:
+                        items = struct.unpack ("="+code * (len (data) // struct.calcsize (code)), data)
+                        if prop_type == XA_ATOM:
+                            values = self._get_atom_names (items)
+                        elif code == "f":
+                            values = ["%f" % item for item in items]
+                        else:
+                            values = [str (item) for item in items]
+                    ret.append ((name, atom, values))
+        
+        return ret
+    
+    def _encode_property (self, device_id, name, values):
+        
+        """Turn one property edit into XIChangeProperty arguments.
+        
+        Like "xinput set-prop", this keeps the property's current type and
+        format and converts values to match. Needs self.lock, and X errors
+        trapped.
+        
+        """
+        
+        atom = self._intern (name, True)
+        prop = self._get_property (device_id, atom, 0) if atom else None
+        if prop is None:
+            raise XI2Error ("Device "+str(device_id)+" has no property \""+name+"\"")
+        prop_type, prop_format = prop[0], prop[1]
+        
+        code = self._property_code (prop_type, prop_format)
+        if code is None:
+            if prop_format != 8:
+                raise XI2Error ("Cannot set \""+name+"\": unsupported format")
+            data = "".join (value+"\0" for value in values)
+            return (device_id, atom, prop_type, prop_format, data, len (data))
+        
+        try:
+            if prop_type == XA_ATOM:
+                items = [int (value) if value.isdigit () else self._intern (value) for value in values]
+            elif code == "f":
+                items = [float (value) for value in values]
+            else:
+                items = [int (value) for value in values]
+            data = struct.pack ("="+code * len (items), *items)
+        except (ValueError, struct.error):
+            raise XI2Error ("Invalid value for \""+name+"\": "+", ".join (values))
+        
+        return (device_id, atom, prop_type, prop_format, data, len (items))
+    
+    def set_properties (self, edits):
+        
+        """Change any number of device properties in one go.
+        
+        edits is a list of (device ID, property name, values) tuples, with
+        values as list_properties gives them. Every edit is checked and
+        converted before anything is sent, so a batch with a missing device
+        or property or a malformed value is rejected as a whole. Then all
+        the changes go out together, with a single round trip to wait for
+        them, however many devices they're for. A driver may still refuse
+        some values, in which case the rest are applied anyway.
+        
+        Raises XI2Error if the batch is invalid or the server refuses any
+        of it.
+        
+        """
+        
+        with self.lock:
+            with self._trap_errors ():
+                changes = [self._encode_property (*edit) for edit in edits]
+            with self._trap_errors ():
+                for device_id, atom, prop_type, prop_format, data, count in changes:
+                    self.xi.XIChangeProperty (self.display, device_id, atom, prop_type,
+                                              prop_format, PROP_MODE_REPLACE, data, count)
+    
+    @staticmethod
+    def _raw_class_data (use, attachment):
+        
+        """Produce the same tokens "xinput list --short" would have."""
+        
+        attachment = str (attachment)
+        
+        if use == XI_MASTER_POINTER:
+            return ['master', 'pointer', attachment]
+        elif use == XI_MASTER_KEYBOARD:
+            return ['master', 'keyboard', attachment]
+        elif use == XI_SLAVE_POINTER:
+            return ['slave', 'pointer', attachment]
+        elif use == XI_SLAVE_KEYBOARD:
+            return ['slave', 'keyboard', attachment]
+        else:
+            return ['floating', 'slave']
+
+# display name -> its XI2Display, or False if connecting failed. Displays
+# that haven't been tried yet aren't in here.
+_xi2_displays = {}
+
+def get_xi2_display (display_name = None):
+    
+    """Returns the shared XI2Display, or None if XInput2 isn't usable.
+    
+    There's one connection per display, opened the first time it's asked
+    for and kept for as long as the process runs. display_name None means
+    whatever $DISPLAY says.
+    
+    Setting XINPUT_UI_BACKEND=xinput in the environment forces the subprocess
+    fallback, and so does recording or replaying a transcript.
+    
+    """
+    
+    with _display_lock:
+        display = _xi2_displays.get (display_name)
+    
+    if display is None:
+        display = False
+        if os.environ.get ("XINPUT_UI_BACKEND") != "xinput" and get_transcript () is None:
+            try:
+                display = XI2Display (display_name)
+            except XI2Unavailable:
+                pass
+        # connecting is done outside the lock, so that a display that's slow
+        # to answer doesn't hold up the others
+        with _display_lock:
+            if display_name in _xi2_displays:
+                if display:
+                    display.close ()
+                display = _xi2_displays[display_name]
+            else:
+                _xi2_displays[display_name] = display
+    
+    return display or None
+
+@timing.timed ("read_raw_device_data")
+def read_raw_device_data (display_name = None):
+    
+    """Returns a "raw" device list: {self_id: [name, raw_class_data, classes]}.
+    
+    classes is the set of XI_*_CLASS values the device reports.
+    
+    Queries the X server directly over XInput2 where possible, otherwise
+    falls back to running the xinput utility.
+    
+    """
+    
+    display = get_xi2_display (display_name)
+    if display is not None:
+        return display.read_raw_device_data ()
+    
+    return read_raw_device_data_xinput (display_name)
+
+@timing.timed ("get_device_status")
+def get_device_status (display_name = None):
+    
+    """Returns a list of MasterDevice objects.
+    
+    Each of MasterDevice corresponds to a master pointer/master keyboard pair
+    that currently exists in the X server. Each MasterDevice may also be
+    populated with SlaveDevice objects.
+    
+    display_name picks the X server; by default it's whatever $DISPLAY says.
+    
+    """
+    
+    unsorted_devices = read_raw_device_data (display_name)
+    
+    all_masters = {}
+    # same as all_masters but with duplicate entries for keyboard device IDs.
+    all_master_aliases = {} 
+    
+    # initialize master devices
+    
+    device = MasterDevice ("Unattached Devices")
+    device.set_pointer_id (FLOATING_ID)
+    device.set_keyboard_id (FLOATING_ID)
+    all_master_aliases.update ({FLOATING_ID: device})
+    all_masters.update ({FLOATING_ID: device})
+    
+    for device_id, rawdevice in unsorted_devices.iteritems():
+        if rawdevice[1][0] != 'master' or rawdevice[1][1] != 'pointer':
+            continue
+        device = MasterDevice (rawdevice[0])
+        device.set_pointer_id (device_id)
+        all_master_aliases.update ({device_id: device})
+        all_masters.update ({device_id: device})
+    
+    for device_id, rawdevice in unsorted_devices.iteritems ():
+        if rawdevice[1][0] != 'master' or rawdevice[1][1] != 'keyboard':
+            continue
+        device = all_master_aliases[int(rawdevice[1][2])]
+        device.set_keyboard_id (device_id)
+        all_master_aliases.update ({device_id: device})
+    
+    # initialize slave devices and attach them to their parent master devices
+    
+    for device_id, rawdevice in unsorted_devices.iteritems ():
+        if rawdevice[1][0] == 'master':
+            continue 
+        master_id = None
+        if rawdevice[1][0] == 'floating':
+            master_id = FLOATING_ID
+            is_pointer = None # no classes at all means we couldn't find out
+            if len (rawdevice[2]):
+                is_pointer = is_pointer_device (XI_FLOATING_SLAVE, rawdevice[2])
+        else:
+            master_id = int(rawdevice[1][2])
+            is_pointer = rawdevice[1][1] == 'pointer'
+        all_master_aliases[master_id].add_slave (device_id, rawdevice[0], is_pointer)
+    
+    return all_masters
@@ -0,0 +1,41 @@
+# xinput-ui: working with several X displays at once.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Multi-display mode.
+
+Set XINPUT_UI_DISPLAYS to a list of X displays, separated by commas or
+spaces (e.g. ":1,:2,kiosk3:0"), and the GUI shows one tab for each instead
+of just the one $DISPLAY names. On the command line, give --display once
+per display instead.
+
+Every display keeps its own XI2 connection (see get_xi2_display) or xinput
+environment (see xinput_environment) and its own device metadata cache, so
+the work for different displays can run side by side; map_concurrently is
+how it's spread over threads.
+
+"""
+
+import os
+
+from xinputui.commands import run_concurrently
+
+# How many displays are read or applied to at once
+DISPLAY_MAX_WORKERS = 8
+
+def get_display_names ():
+    
+    """The displays XINPUT_UI_DISPLAYS names, or [] if it isn't set."""
+    
+    names = []
+    for name in os.environ.get ("XINPUT_UI_DISPLAYS", "").replace (",", " ").split ():
+        if name not in names:
+            names.append (name)
+    return names
+
+def map_concurrently (func, items, max_workers = DISPLAY_MAX_WORKERS):
+    
+    """commands.run_concurrently, with DISPLAY_MAX_WORKERS threads by default."""
+    
+    return run_concurrently (func, items, max_workers)
@@ -0,0 +1,1752 @@
+# xinput-ui: the wx front-end.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""The wxPython GUI, built on top of the rest of the xinputui package.
+
+This is the only module that imports wx, and the launcher only imports it
+when the GUI is actually wanted.
+
+"""
+
+import wx, wx.gizmos
+import bisect
+import collections
+
+from xinputui import timing
+from xinputui.activity import ActivityMonitor, PROPERTY_EVENTS
+from xinputui.devices import MasterDevice, SlaveDevice, PendingDevice, XI2Error, \
+                             device_sort, get_device_status
+from xinputui.commands import apply_commands
+from xinputui.displays import get_display_names, map_concurrently
+from xinputui.hotplug import DeviceWatcher, DeviceScanner
+from xinputui.plan import Plan, PlanError
+from xinputui.properties import get_properties, get_property_cache, write_properties, \
+                                parse_property_values, format_property_values
+
+# With more devices than this, the tree starts with every master collapsed,
+# and the items for a master's slaves are only made when it's expanded.
+LAZY_TREE_DEVICES = 200
+
+# IDs of the actions wx has no stock ID for; see ActionRegistry
+ID_CANCEL_CHANGE = wx.NewId ()
+ID_RESET_MASTER = wx.NewId ()
+ID_DETACH_ALL = wx.NewId ()
+ID_APPLY_ALL = wx.NewId ()
+ID_SHOW_ACTIVITY = wx.NewId ()
+
+# Background of the rows of devices that are being used; see ShowActivity
+ACTIVITY_COLOUR = (255, 230, 120)
+
+# Background of the properties that have edits waiting; see PropertyList
+PENDING_PROPERTY_COLOUR = (200, 225, 255)
+
+class DeviceTree (wx.gizmos.TreeListCtrl):
+    
+    """Tree list control widget displaying the master/slave device heirarchy.
+    
+    Inherits from wxPython's TreeListCtrl, and adds semantics to interactions
+    like drag-and-drop, right-click, etc. The widget keeps an index from each
+    device to its tree item, so that when something changes only the affected
+    items are moved, inserted or relabeled (see Changes.UpdateDevice.) It is
+    only emptied when the device list is reloaded.
+    
+    A master's slaves only get items once the master has been expanded, so
+    that collapsed masters cost one item each however many slaves they have.
+    Until then the master just shows an expander.
+    
+    """
+    
+    def __init__ (self, page, panel):
+        
+        self.page = page
+        self.UI = page.UI
+        
+        label = wx.StaticBox (panel, label = "Devices:")
+        sizer = wx.StaticBoxSizer (label, wx.VERTICAL)
+        
+        super (DeviceTree, self).__init__(panel, style = wx.TR_HIDE_ROOT | wx.TR_DEFAULT_STYLE | wx.TR_MULTIPLE | wx.SUNKEN_BORDER)
+        
+        self.AddColumn ("Name", 350)
+        self.AddColumn ("ID", 30)
+        self.root = self.AddRoot ("Pointers")
+        sizer.Add(self, flag = wx.EXPAND, proportion = 1)
+        
+        panel.SetMinSize ((-1, 75))
+        
+        panel.SetSizer (sizer)
+        
+        self.Bind (wx.EVT_TREE_BEGIN_DRAG, self.OnBeginDrag)
+        self.Bind (wx.EVT_TREE_END_DRAG, self.OnEndDrag)
+        self.Bind (wx.EVT_TREE_ITEM_RIGHT_CLICK, self.OnRightClick)
+        self.Bind (wx.EVT_TREE_KEY_DOWN, self.OnKeyDown)
+        
+        self.Bind (wx.EVT_TREE_SEL_CHANGED, self.OnSelectItem)
+        self.Bind (wx.EVT_TREE_ITEM_COLLAPSED, self.OnCollapseOrExpandItem)
+        self.Bind (wx.EVT_TREE_ITEM_EXPANDING, self.OnExpandingItem)
+        self.Bind (wx.EVT_TREE_ITEM_EXPANDED, self.OnCollapseOrExpandItem)
+        
+        self.ResetIndex ()
+    
+    def ResetIndex (self):
+        
+        # device -> tree item, for every device currently shown
+        self.items = {}
+        # device -> text currently in its "Name" column
+        self.labels = {}
+        # master devices in the order they're shown
+        self.masters = []
+        # master device -> sorted self_ids of the slaves shown under it
+        self.slave_ids = {}
+        # master devices whose slaves have items; see Populate
+        self.populated = set ()
+        # devices whose items are highlighted; see ShowActivity
+        self.highlighted = set ()
+    
+    def UpdateDeviceName (self, device, menuitem):
+        
+        """Set the device's display name.
+        
+        Call this if the device's status changes and the display needs to 
+        reflect the change. Does nothing if the text hasn't changed.
+        
+        """
+        
+        # "Name" column
+        text = device.name + self.page.changes.GetDeviceStatusText (device)
+        if self.labels.get (device) != text:
+            self.SetItemText (menuitem, text)
+            self.labels[device] = text
+    
+    @timing.timed ("DeviceTree.addMaster")
+    def addMaster (self, device, slavelist, index = None):
+        
+        """Add widgets to display a MasterDevice and all its current slaves.
+        
+        The master is inserted at position index among the other masters, or
+        appended if index is None. Usually called through ShowMaster.
+        
+        Note that the widgets for the slaves may be moved to other groups by
+        other methods to reflect pending changes.
+        
+        """
+        
+        if index is None or index >= len (self.masters):
+            device_menuitem = self.AppendItem (self.root, "")
+            self.masters.append (device)
+        else:
+            device_menuitem = self.InsertItemBefore (self.root, index, "")
+            self.masters.insert (index, device)
+        
+        self.items[device] = device_menuitem
+        self.slave_ids[device] = []
+        self.SetItemPyData (device_menuitem, device)
+        self.UpdateDeviceName (device, device_menuitem)
+        
+        for slave in device_sort(slavelist):
+            self.PlaceSlave (slave, device)
+        
+        if device.expanded:
+            self.Populate (device)
+            self.Expand (device_menuitem)
+    
+    def Populate (self, master):
+        
+        """Make the items for a master's slaves, if they aren't there yet."""
+        
+        if master in self.populated:
+            return
+        self.populated.add (master)
+        
+        for slave in self.page.changes.display_heirarchy.get (master, ()):
+            self.PlaceSlave (slave, master)
+    
+    @timing.timed ("DeviceTree.PlaceSlave")
+    def PlaceSlave (self, slave, master):
+        
+        """Show a slave under a master, keeping the slaves sorted by ID.
+        
+        If the slave is already shown somewhere else, its item is moved. If
+        it's already in the right place, only its label is updated.
+        
+        """
+        
+        master_menuitem = self.items[master]
+        slave_menuitem = self.items.get (slave)
+        
+        if slave_menuitem is not None:
+            if self.GetItemParent (slave_menuitem) == master_menuitem:
+                self.UpdateDeviceName (slave, slave_menuitem)
+                return
+            self.RemoveDevice (slave)
+        
+        # it'll get its item when the master is expanded
+        if master not in self.populated:
+            self.SetItemHasChildren (master_menuitem, True)
+            return
+        
+        ids = self.slave_ids[master]
+        index = bisect.bisect (ids, slave.self_id)
+        if index == len (ids):
+            slave_menuitem = self.AppendItem (master_menuitem, "")
+        else:
+            slave_menuitem = self.InsertItemBefore (master_menuitem, index, "")
+        ids.insert (index, slave.self_id)
+        
+        self.items[slave] = slave_menuitem
+        self.SetItemPyData (slave_menuitem, slave)
+        self.UpdateDeviceName (slave, slave_menuitem)
+        self.SetItemText (slave_menuitem, str(slave.self_id), 1) # "ID" column
+    
+    def RemoveDevice (self, device):
+        
+        """Remove a device's item (and, for a master, its slaves' items.)"""
+        
+        menuitem = self.items.pop (device)
+        self.labels.pop (device, None)
+        
+        if device in self.slave_ids:
+            child, cookie = self.GetFirstChild (menuitem)
+            while child.IsOk ():
+                slave = self.GetItemPyData (child)
+                self.items.pop (slave, None)
+                self.labels.pop (slave, None)
+                child, cookie = self.GetNextChild (menuitem, cookie)
+            del self.slave_ids[device]
+            self.populated.discard (device)
+            self.masters.remove (device)
+        else:
+            master = self.GetItemPyData (self.GetItemParent (menuitem))
+            self.slave_ids[master].remove (device.self_id)
+        
+        self.Delete (menuitem)
+    
+    def ShowMaster (self, device):
+        
+        """Show a master device, or update its item if it's already shown.
+        
+        Real masters are kept sorted by ID, followed by pending masters, and
+        the floating group always stays last.
+        
+        """
+        
+        menuitem = self.items.get (device)
+        
+        if menuitem is None:
+            index = None
+            floating_group = self.page.changes.floating_group
+            if device.__class__ == PendingDevice:
+                if floating_group in self.items:
+                    index = len (self.masters) - 1
+            elif device != floating_group:
+                index = 0
+                for master in self.masters:
+                    if master.__class__ != MasterDevice or master == floating_group or master.self_id > device.self_id:
+                        break
+                    index += 1
+            self.addMaster (device, [], index)
+            return
+        
+        self.UpdateDeviceName (device, menuitem)
+        if device.expanded and not self.IsExpanded (menuitem):
+            self.Populate (device)
+            self.Expand (menuitem)
+    
+    def ShowActivity (self, device_ids):
+        
+        """Highlight the slaves in device_ids, and no other devices.
+        
+        Called a few times a second at most; see ActivityMonitor. A slave
+        that's hidden in a collapsed master highlights the master instead.
+        
+        """
+        
+        highlight = set ()
+        if len (device_ids):
+            for slave, master in self.page.changes.display_parent.iteritems ():
+                if slave.self_id not in device_ids:
+                    continue
+                if slave in self.items and self.IsExpanded (self.items[master]):
+                    highlight.add (slave)
+                elif master in self.items:
+                    highlight.add (master)
+        
+        for device in self.highlighted - highlight:
+            if device in self.items:
+                self.SetItemBackgroundColour (self.items[device], self.GetBackgroundColour ())
+        for device in highlight - self.highlighted:
+            self.SetItemBackgroundColour (self.items[device], wx.Colour (*ACTIVITY_COLOUR))
+        self.highlighted = highlight
+    
+    def DeleteAllItems (self, *args, **kwargs):
+        
+        """Wrapped wxWidgets method."""
+        
+        super (DeviceTree, self).DeleteAllItems (*args, **kwargs)
+        
+        self.root = self.AddRoot ("Pointers")
+        self.ResetIndex ()
+    
+    def GetSelectedDevices (self):
+        
+        """Returns the devices of all the selected items."""
+        
+        devices = []
+        for menuitem in self.GetSelections ():
+            if menuitem.IsOk () and self.GetItemPyData (menuitem) != None:
+                devices.append (self.GetItemPyData (menuitem))
+        return devices
+    
+    def OnBeginDrag (self, evt):
+        
+        """Drag-and-drop callback: start dragging.
+        
+        If the drag starts on one of several selected items, all the selected
+        slave devices are dragged together.
+        
+        """
+        
+        it = self.GetItemPyData (evt.GetItem ())
+        self.dragItems = []
+        if it.__class__ != SlaveDevice:
+            return
+        selected = self.GetSelectedDevices ()
+        if it in selected:
+            self.dragItems = [device for device in selected if device.__class__ == SlaveDevice]
+        else:
+            self.dragItems = [it]
+        evt.Allow ()
+    
+    def OnEndDrag (self, evt):
+        
+        """Drag-and-drop callback: drop."""
+        
+        moved_devices = self.dragItems
+        
+        if not len (moved_devices):
+            #someone tried to drag a master device
+            return
+        
+        if evt.GetItem ().IsOk ():
+            
+            target_menuitem = evt.GetItem ()
+            target_device = self.GetItemPyData (target_menuitem)
+            # If the user dragged one slave onto another slave, he probably
+            # meant to drag it onto a master device.
+            if target_device.__class__ == SlaveDevice:
+                target_menuitem = self.GetItemParent (target_menuitem)
+                target_device = self.GetItemPyData (target_menuitem)
+            
+            # Generate the pending commands for this action
+            self.page.changes.MoveDevicesCmd (moved_devices, target_device)
+        
+        else:
+            
+            # assume it was dragged past the bottom of the list, and interpret
+            # this as a detach
+            self.page.changes.DetachDevicesCmd (moved_devices)
+    
+    
+    def OnCollapseOrExpandItem (self, evt):
+        
+        """Item collapse/expand callback
+        
+        Since the widgets in this list may be inserted or recreated, we need a
+        way to persistently track which have been collapsed.
+        
+        """
+        
+        if evt.GetItem ().IsOk ():
+            expanded = self.IsExpanded (evt.GetItem ())
+            self.GetItemPyData (evt.GetItem ()).expanded = expanded
+    
+    def OnExpandingItem (self, evt):
+        
+        """Item expand callback: make the slaves' items, if need be."""
+        
+        if evt.GetItem ().IsOk ():
+            device = self.GetItemPyData (evt.GetItem ())
+            if device in self.slave_ids:
+                self.Populate (device)
+    
+    def OnSelectItem (self, evt):
+        
+        """Selection callback: the toolbar acts on the selected items.
+        
+        The property list shows the selected physical device, too.
+        
+        """
+        
+        self.UI.actions.UpdateToolbar ()
+        self.page.properties.ShowDevices (self.GetSelectedDevices ())
+    
+    def OnKeyDown (self, evt):
+        
+        if evt.GetKeyCode () in (wx.WXK_DELETE, wx.WXK_NUMPAD_DELETE):
+            self.UI.actions.Run (wx.ID_REMOVE)
+        else:
+            evt.Skip ()
+    
+    def OnRightClick (self, evt):
+        
+        """Right-click callback: update selection, display context menu.
+        
+        Right-clicking one of several selected items keeps the selection, so
+        that the menu acts on all of them.
+        
+        """
+        
+        if evt.GetItem ().IsOk ():
+            target = evt.GetItem ()
+        else:
+            return
+        
+        if target not in self.GetSelections ():
+            self.SelectItem (target)
+        
+        menu = self.UI.actions.MakeMenu (self.UI.actions.tree_menu)
+        if menu is not None:
+            self.PopupMenu (menu)
+            menu.Destroy ()
+
+class MainBar (wx.Panel):
+    
+    """The main toolbar."""
+    
+    def __init__ (self, parent, panel):
+        
+        super (MainBar, self).__init__(panel)
+        
+        self.parent = parent
+        
+        sizer = wx.BoxSizer (wx.HORIZONTAL)
+        
+        # Refresh, Apply (all) and Remove are actions; see ActionRegistry
+        
+        self.button_refresh = wx.Button (self, label='Refresh', id = wx.ID_REFRESH)
+        refresh_tooltip = wx.ToolTip ("Abandon changes and reload device list (F5)")
+        self.button_refresh.SetToolTip (refresh_tooltip)
+        sizer.Add (self.button_refresh)
+        
+        self.button_apply = wx.Button (self, label='Apply', id = wx.ID_APPLY)
+        self.button_apply.Enable (False)
+        apply_tooltip = wx.ToolTip ("Apply pending changes")
+        self.button_apply.SetToolTip (apply_tooltip)
+        sizer.Add (self.button_apply)
+        
+        self.button_apply_all = None
+        if len (parent.pages) > 1:
+            self.button_apply_all = wx.Button (self, label='Apply all', id = ID_APPLY_ALL)
+            self.button_apply_all.Enable (False)
+            apply_all_tooltip = wx.ToolTip ("Apply pending changes on every display at once")
+            self.button_apply_all.SetToolTip (apply_all_tooltip)
+            sizer.Add (self.button_apply_all)
+        
+        button_new = wx.Button (self, label='Add', id = wx.ID_ADD)
+        new_tooltip = wx.ToolTip ("Add a new master device")
+        button_new.SetToolTip (new_tooltip)
+        sizer.Add (button_new)
+        self.Bind (wx.EVT_BUTTON, self.OnNewMasterStart, button_new)
+        
+        self.button_del = wx.Button (self, label='Remove', id = wx.ID_REMOVE)
+        self.button_del.Enable (False)
+        del_tooltip = wx.ToolTip ("Delete or detach the selected devices (Del)")
+        self.button_del.SetToolTip (del_tooltip)
+        sizer.Add (self.button_del)
+        
+        self.button_stop = wx.Button (self, label='Stop', id = wx.ID_STOP)
+        self.button_stop.Enable (False)
+        stop_tooltip = wx.ToolTip ("Stop reloading the device list")
+        self.button_stop.SetToolTip (stop_tooltip)
+        sizer.Add (self.button_stop)
+        self.Bind (wx.EVT_BUTTON, self.OnStop, self.button_stop)
+        
+        self.gauge = wx.Gauge (self, size = (50, -1))
+        sizer.Add (self.gauge, flag = wx.ALIGN_CENTER | wx.LEFT, border = 5)
+        self.pulse_timer = wx.Timer (self)
+        self.Bind (wx.EVT_TIMER, self.OnPulse, self.pulse_timer)
+        
+        self.SetSizer (sizer)
+    
+    def ShowBusy (self, busy):
+        
+        """Show or hide the progress indicator for a device list reload."""
+        
+        self.button_stop.Enable (busy)
+        if busy:
+            self.gauge.Pulse ()
+            self.pulse_timer.Start (100)
+        else:
+            self.pulse_timer.Stop ()
+            self.gauge.SetValue (0)
+    
+    def OnPulse (self, _):
+        
+        self.gauge.Pulse ()
+    
+    def OnStop (self, _):
+        
+        self.parent.UI.page.changes.CancelReset ()
+    
+    def OnNewMasterStart (self, _):
+        
+        self.parent.createmaster_toolbar.Show ()
+
+class NewMasterBar (wx.Panel):
+    
+    """The toolbar used for adding new master pointers.
+    
+    This toolbar is normally hidden, but it appears when you click on "Add."
+    It has a text field for editing the name of the master pointer which will
+    be created, as well as "OK" and "Cancel" buttons.
+    
+    """
+    
+    def __init__ (self, parent, panel):
+        
+        self.parent = parent
+        
+        super (NewMasterBar, self).__init__(panel)
+        
+        sizer = wx.BoxSizer (wx.HORIZONTAL)
+        
+        label = wx.StaticText (self, label = "Name:")
+        sizer.Add (label, flag = wx.ALIGN_CENTER)
+        
+        self.input = wx.TextCtrl (self, style = wx.TE_PROCESS_ENTER)
+        sizer.Add (self.input, flag = wx.EXPAND, proportion = 1)
+        self.Bind (wx.EVT_TEXT_ENTER, self.OnNewMasterDone, self.input)
+        
+        button_confirm = wx.Button (self, label='OK', style = wx.BU_EXACTFIT, id = wx.ID_OK)
+        sizer.Add (button_confirm, flag = wx.ALIGN_RIGHT)
+        self.Bind (wx.EVT_BUTTON, self.OnNewMasterDone, button_confirm)
+        
+        button_cancel = wx.Button (self, label='Cancel', style = wx.BU_EXACTFIT, id = wx.ID_CANCEL)
+        sizer.Add (button_cancel, flag = wx.ALIGN_RIGHT)
+        self.Bind (wx.EVT_BUTTON, self.OnCancel, button_cancel)
+        
+        self.SetSizer (sizer)
+    
+    def Show (self):
+        
+        """Make the toolbar visible, set default master pointer name."""
+        
+        self.parent.Show (self, True, True)
+        
+        self.input.SetValue ("New Pointer")
+        self.input.SetSelection (0, -1)
+        self.input.SetFocus()
+        
+        self.parent.Layout ()
+    
+    def Hide (self):
+        
+        """Make the toolbar invisible."""
+        
+        self.parent.Show (self, False, True)
+        self.parent.Layout ()
+    
+    def OnCancel (self, _):
+        self.Hide ()
+    
+    def OnNewMasterDone (self, _):
+        
+        newdevice = PendingDevice (self.input.GetValue ())
+        self.Hide ()
+        
+        self.parent.UI.page.changes.CreateDeviceCmd (newdevice)
+
+class CommandList (wx.ListCtrl):
+    
+    """Widget listing the "xinput" commands corresponding to pending changes.
+    
+    This widget is not interactive in any way, apart from being scrollable.
+    It's a virtual list that reads its rows straight from
+    Changes.all_commands, so only the rows on screen ever exist; call
+    CommandsChanged after all_commands changes.
+    
+    """
+    
+    def __init__ (self, page, panel):
+        
+        self.page = page
+        
+        # set up the GUI command list preview widget
+        
+        label = wx.StaticBox (panel, label = "Pending Commands:")
+        sizer = wx.StaticBoxSizer (label, wx.VERTICAL)
+        
+        super (CommandList, self).__init__(panel, style = wx.LC_REPORT | wx.LC_VIRTUAL | wx.SUNKEN_BORDER | wx.LC_NO_HEADER)
+        self.InsertColumn (0, "Commands", width = 250)
+        sizer.Add (self, flag = wx.EXPAND, proportion = 1)
+        
+        panel.SetMinSize ((-1, 50))
+        
+        panel.SetSizer (sizer)
+    
+    def OnGetItemText (self, item, column):
+        
+        """Called by wx for each row it draws."""
+        
+        return " ".join (self.page.changes.all_commands[item])
+    
+    def CommandsChanged (self, first = 0):
+        
+        """Redraw the rows from first onwards, which may have changed."""
+        
+        count = len (self.page.changes.all_commands)
+        if self.GetItemCount () != count:
+            self.SetItemCount (count)
+        if first < count:
+            self.RefreshItems (first, count - 1)
+
+class PropertyList (wx.ListCtrl):
+    
+    """Widget listing the properties of the selected physical device.
+    
+    Nothing is read until a device is selected, and then only that device's
+    properties, on a worker thread and through the display's PropertyCache,
+    so that going back to a device shows them straight away. The cache
+    forgets a device when XI2 says its properties changed, or without XI2,
+    on every refresh.
+    
+    Double-clicking a property (or pressing Enter on it) asks for a new
+    value, which is queued for every selected physical device instead of
+    being set there and then. "Apply" writes all the queued edits as one
+    batch; see write_properties.
+    
+    """
+    
+    def __init__ (self, page, panel):
+        
+        self.page = page
+        self.UI = page.UI
+        
+        label = wx.StaticBox (panel, label = "Properties:")
+        sizer = wx.StaticBoxSizer (label, wx.VERTICAL)
+        
+        super (PropertyList, self).__init__(panel, style = wx.LC_REPORT | wx.LC_SINGLE_SEL | wx.SUNKEN_BORDER)
+        self.InsertColumn (0, "Property", width = 200)
+        self.InsertColumn (1, "Value", width = 150)
+        sizer.Add (self, flag = wx.EXPAND, proportion = 1)
+        self.Bind (wx.EVT_LIST_ITEM_ACTIVATED, self.OnActivate)
+        
+        buttons = wx.BoxSizer (wx.HORIZONTAL)
+        
+        self.button_apply = wx.Button (panel, label = 'Apply')
+        self.button_apply.Enable (False)
+        self.button_apply.SetToolTip (wx.ToolTip ("Set the edited properties, all at once"))
+        buttons.Add (self.button_apply)
+        panel.Bind (wx.EVT_BUTTON, self.OnApply, self.button_apply)
+        
+        self.button_discard = wx.Button (panel, label = 'Discard')
+        self.button_discard.Enable (False)
+        self.button_discard.SetToolTip (wx.ToolTip ("Forget the edited properties"))
+        buttons.Add (self.button_discard)
+        panel.Bind (wx.EVT_BUTTON, self.OnDiscard, self.button_discard)
+        
+        self.note = wx.StaticText (panel)
+        buttons.Add (self.note, flag = wx.ALIGN_CENTER | wx.LEFT, border = 5, proportion = 1)
+        
+        sizer.Add (buttons, flag = wx.EXPAND)
+        
+        panel.SetMinSize ((-1, 50))
+        
+        panel.SetSizer (sizer)
+        
+        self.cache = get_property_cache (page.display_name)
+        
+        # the selected physical devices, the one of them whose properties
+        # are wanted, and the one whose properties are listed
+        self.selected = []
+        self.device = None
+        self.shown = None
+        self.properties = []
+        
+        # (device, property name) -> values, in the order they were edited
+        self.edits = collections.OrderedDict ()
+        
+        # reads self.device's properties in the background
+        self.loader = DeviceScanner (self.OnLoaded, self.Read)
+        
+        # only while XI2 can say when properties change
+        self.monitor = None
+    
+    def Start (self):
+        
+        monitor = ActivityMonitor (self.OnPropertiesChanged, self.page.display_name, events = PROPERTY_EVENTS)
+        if monitor.start ():
+            self.monitor = monitor
+    
+    def Stop (self):
+        
+        self.loader.cancel ()
+        if self.monitor is not None:
+            self.monitor.stop ()
+            self.monitor = None
+    
+    def ShowDevices (self, devices):
+        
+        """List the properties of the first physical device in devices."""
+        
+        self.selected = [device for device in devices if device.__class__ == SlaveDevice]
+        device = self.selected[0] if len (self.selected) else None
+        
+        if device is self.device:
+            self.ShowEdits ()
+            return
+        
+        self.device = device
+        self.Load ()
+    
+    def Load (self):
+        
+        """List self.device's properties, reading them if need be."""
+        
+        if self.shown is not self.device:
+            self.shown = None
+            self.properties = []
+            self.DeleteAllItems ()
+            self.ShowEdits ()
+        
+        if self.device is None:
+            self.loader.cancel ()
+            return
+        
+        properties = self.cache.get (self.device.self_id, self.device.name)
+        if properties is not None:
+            self.loader.cancel ()
+            self.ShowProperties (properties)
+            return
+        
+        self.note.SetLabel ("Reading properties...")
+        self.loader.request ()
+    
+    def Read (self):
+        
+        """Called from the loader's worker thread."""
+        
+        device = self.device
+        if device is None:
+            return (None, [])
+        return (device, get_properties (device.self_id, device.name, self.page.display_name))
+    
+    def OnLoaded (self, generation, result, error):
+        
+        """Called from the loader's worker thread."""
+        
+        wx.CallAfter (self.FinishLoad, generation, result, error)
+    
+    def FinishLoad (self, generation, result, error):
+        
+        # another device was selected meanwhile
+        if not self.loader.is_current (generation):
+            return
+        
+        if error is not None:
+            self.note.SetLabel ('Could not read properties: '+str(error))
+            return
+        
+        device, properties = result
+        if device is self.device:
+            self.ShowProperties (properties)
+    
+    def ShowProperties (self, properties):
+        
+        self.shown = self.device
+        self.properties = properties
+        
+        self.DeleteAllItems ()
+        for prop in properties:
+            row = self.InsertStringItem (self.GetItemCount (), prop.name)
+            self.SetStringItem (row, 1, prop.text ())
+        
+        self.ShowEdits ()
+    
+    def ShowEdits (self):
+        
+        """Show the queued values of the listed properties, and count them."""
+        
+        for row, prop in enumerate (self.properties):
+            values = self.edits.get ((self.shown, prop.name))
+            if values is None:
+                self.SetStringItem (row, 1, prop.text ())
+                self.SetItemBackgroundColour (row, self.GetBackgroundColour ())
+            else:
+                self.SetStringItem (row, 1, format_property_values (values))
+                self.SetItemBackgroundColour (row, wx.Colour (*PENDING_PROPERTY_COLOUR))
+        
+        note = ""
+        if len (self.edits):
+            note = str(len (self.edits))+" edits pending"
+        if len (self.selected) > 1:
+            note += ("; " if len (note) else "")+"editing "+str(len (self.selected))+" devices"
+        self.note.SetLabel (note)
+        
+        self.button_apply.Enable (bool (len (self.edits)))
+        self.button_discard.Enable (bool (len (self.edits)))
+    
+    def OnActivate (self, evt):
+        
+        """Ask for a new value, and queue it for every selected device.
+        
+        Devices whose cached properties already have that value are left
+        alone.
+        
+        """
+        
+        prop = self.properties[evt.GetIndex ()]
+        values = self.edits.get ((self.shown, prop.name), prop.values)
+        
+        message = 'New value for "'+prop.name+'"'
+        if len (self.selected) > 1:
+            message += ' on '+str(len (self.selected))+' devices'
+        dialog = wx.TextEntryDialog (self.UI, message+', separated by commas:', 'Set Property',
+                                     format_property_values (values))
+        
+        if dialog.ShowModal () == wx.ID_OK:
+            values = parse_property_values (dialog.GetValue ())
+            for device in self.selected:
+                current = None
+                properties = self.cache.get (device.self_id, device.name)
+                if properties is not None:
+                    current = [known.values for known in properties if known.name == prop.name]
+                if current == [values]:
+                    self.edits.pop ((device, prop.name), None)
+                else:
+                    self.edits[(device, prop.name)] = values
+            self.ShowEdits ()
+        
+        dialog.Destroy ()
+    
+    def OnApply (self, _):
+        
+        self.ApplyEdits ()
+    
+    def OnDiscard (self, _):
+        
+        self.edits.clear ()
+        self.ShowEdits ()
+    
+    def ApplyEdits (self):
+        
+        """Set every queued property, as one batch; see write_properties.
+        
+        As with Changes.Apply, the edits are dropped whatever happens, and
+        when they were made through the xinput utility, a window lists how
+        each of them turned out.
+        
+        """
+        
+        edits = [(device.self_id, name, values) for (device, name), values in self.edits.iteritems ()]
+        device_ids = set (device.self_id for device, _ in self.edits)
+        self.edits.clear ()
+        
+        results = None
+        try:
+            with timing.phase ("PropertyList.ApplyEdits"):
+                results = write_properties (edits, self.page.display_name)
+        except XI2Error as e:
+            wx.MessageBox (
+                self.page.prefix+'Could not set properties: '+str(e),
+                'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+        
+        # the property events would say so too, but only without the
+        # xinput fallback, and not before the list is read again
+        self.cache.invalidate (device_ids)
+        self.ShowEdits ()
+        self.Load ()
+        
+        if results is not None:
+            dialog = ApplyResultsDialog (self.UI, results)
+            dialog.ShowModal ()
+            dialog.Destroy ()
+    
+    def OnPropertiesChanged (self, device_ids):
+        
+        """Called from the property monitor's thread."""
+        
+        if not len (device_ids):
+            return # just the monitor saying it's gone quiet
+        self.cache.invalidate (device_ids)
+        wx.CallAfter (self.FinishPropertiesChanged, device_ids)
+    
+    def FinishPropertiesChanged (self, device_ids):
+        
+        if self.device is not None and self.device.self_id in device_ids:
+            self.Load ()
+    
+    def DevicesReloaded (self):
+        
+        """After a refresh; without property events, read everything afresh."""
+        
+        if self.monitor is None:
+            self.cache.clear ()
+            self.Load ()
+    
+    def ForgetDevice (self, device):
+        
+        """Drop a device that's gone, with its queued edits."""
+        
+        if device.__class__ != SlaveDevice:
+            return
+        
+        # X hands its ID out again, to whatever is plugged in next
+        self.cache.invalidate ([device.self_id])
+        
+        for key in self.edits.keys ():
+            if key[0] is device:
+                del self.edits[key]
+        
+        if device in self.selected:
+            self.ShowDevices ([selected for selected in self.selected if selected is not device])
+        else:
+            self.ShowEdits ()
+
+class ApplyResultsDialog (wx.Dialog):
+    
+    """Dialog showing how each command run by "Apply" turned out.
+    
+    One row per command, with its result, how long it took, and whatever it
+    printed. This replaces the error messages that used to go to stderr.
+    
+    After "Apply all", displays gives the display each result came from, and
+    is shown in a column of its own.
+    
+    """
+    
+    def __init__ (self, parent, results, displays = None):
+        
+        super (ApplyResultsDialog, self).__init__(parent, title = "Apply Results", size = (500, 300), style = wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        
+        sizer = wx.BoxSizer (wx.VERTICAL)
+        
+        table = wx.ListCtrl (self, style = wx.LC_REPORT | wx.SUNKEN_BORDER)
+        first = 0
+        if displays is not None:
+            table.InsertColumn (0, "Display", width = 70)
+            first = 1
+        table.InsertColumn (first, "Command", width = 200)
+        table.InsertColumn (first + 1, "Result", width = 70)
+        table.InsertColumn (first + 2, "Time", width = 60)
+        table.InsertColumn (first + 3, "Output", width = 200)
+        
+        for index, result in enumerate (results):
+            command = " ".join (result.command)
+            if displays is not None:
+                row = table.InsertStringItem (table.GetItemCount (), displays[index])
+                table.SetStringItem (row, 1, command)
+            else:
+                row = table.InsertStringItem (table.GetItemCount (), command)
+            table.SetStringItem (row, first + 1, result.status_text ())
+            table.SetStringItem (row, first + 2, "%.0f ms" % (result.elapsed * 1000))
+            table.SetStringItem (row, first + 3, " ".join (result.output.split ()))
+        
+        sizer.Add (table, flag = wx.EXPAND, proportion = 1)
+        sizer.Add (self.CreateButtonSizer (wx.OK), flag = wx.EXPAND | wx.ALL, border = 5)
+        
+        self.SetSizer (sizer)
+
+class Changes (Plan):
+    
+    """Class for tracking, updating, and applying pending changes.
+    
+    The planning itself is done by Plan; this keeps the device tree, the
+    CommandList and the toolbar in step with it. There's one per
+    DisplayPage.
+    
+    """
+    
+    def __init__ (self, page):
+        
+        Plan.__init__ (self)
+        
+        self.page = page
+        self.UI = page.UI
+        
+        # Reloads the device list in the background, for Reset and Rescan
+        self.scanner = DeviceScanner (self.OnScanDone, lambda: get_device_status (page.display_name))
+        
+        # Whether the scan under way is for Reset, rather than just Rescan
+        self.reload_wanted = False
+        
+        # The lowest index in all_commands that has changed since the
+        # CommandList was last told
+        self.first_changed_command = 0
+        
+        # timing.snapshot () from when the current reload was started, for
+        # the status bar; None when there's no reload going on
+        self.status_counters = None
+    
+    def CommandRemoved (self, index):
+        
+        self.first_changed_command = min (self.first_changed_command, index)
+    
+    def CommandAdded (self, command):
+        
+        self.first_changed_command = min (self.first_changed_command, len (self.all_commands) - 1)
+    
+    @timing.timed ("Changes.Update")
+    def Update (self, devices):
+        Plan.Update (self, devices)
+    
+    @timing.timed ("Changes.UpdateDevice")
+    def UpdateDevice (self, device):
+        
+        """Bring the command plan and the widgets up to date for one device.
+        
+        Replaces the device's commands in all_commands and the CommandList,
+        and updates its item in the device tree.
+        
+        """
+        
+        tree = self.page.tree
+        
+        Plan.UpdateDevice (self, device)
+        
+        if device.__class__ == SlaveDevice:
+            tree.PlaceSlave (device, self.display_parent[device])
+        elif device.__class__ == PendingDevice and device not in self.all_creations:
+            if device in tree.items:
+                tree.RemoveDevice (device)
+        else:
+            tree.ShowMaster (device)
+    
+    def UpdateFinished (self):
+        
+        # the CommandList is only told once per batch of changes
+        self.page.cmdlist.CommandsChanged (self.first_changed_command)
+        self.first_changed_command = len (self.all_commands)
+        
+        # the selected items' status may have changed too
+        self.UI.actions.UpdateToolbar ()
+    
+    @timing.timed ("Changes.Regenerate")
+    def Regenerate (self):
+        
+        self.first_changed_command = 0
+        self.page.tree.DeleteAllItems ()
+        
+        devices = sum (len (master.children) for master in self.master_devices.values ())
+        if devices > LAZY_TREE_DEVICES:
+            for master in self.master_devices.values ():
+                master.expanded = False
+        
+        Plan.Regenerate (self)
+    
+    def Apply (self):
+        
+        """Run pending commands, then load the new state of the X server.
+        
+        See apply_commands. When the commands were run through the xinput
+        utility, a window lists how each of them turned out.
+        
+        """
+        
+        results = None
+        
+        # the status bar reports on applying and the reload that follows
+        self.status_counters = timing.snapshot ()
+        
+        try:
+            with timing.phase ("Changes.Apply"):
+                results = apply_commands (self.all_commands, self.page.display_name)
+        except XI2Error as e:
+            wx.MessageBox (
+                self.page.prefix+'Could not apply pending changes: '+str(e),
+                'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+        
+        self.ApplyDone ()
+        
+        if results is not None:
+            dialog = ApplyResultsDialog (self.UI, results)
+            dialog.ShowModal ()
+            dialog.Destroy ()
+    
+    def ApplyDone (self):
+        
+        """Reload after the pending commands have been applied."""
+        
+        # They're no longer pending, whatever happened; this also
+        # suppresses the "unapplied pending changes" warning. The reload
+        # then only has to redisplay the devices that actually changed.
+        self.DiscardChanges ()
+        
+        self.Reset ()
+    
+    def MoveDevicesCmd (self, moved_devices, target_device):
+        
+        # The plan could handle this, but the tree can't show it yet
+        if target_device in self.all_creations:
+            wx.MessageBox (
+                'Cannot add input devices to a pending pointer! '+
+                'Hit "Apply" first to finish creating pointer "'+
+                target_device.name+'"', 'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+            return
+        
+        try:
+            Plan.MoveDevicesCmd (self, moved_devices, target_device)
+        except PlanError as e:
+            wx.MessageBox (str(e), 'Error', wx.OK | wx.ICON_EXCLAMATION)
+    
+    def CreateDeviceCmd (self, new_device):
+        
+        # Loading the first device list starts over with nothing pending,
+        # which would silently drop it
+        if self.master_devices is None:
+            wx.MessageBox (
+                'The device list has not been loaded yet. Wait for it to '+
+                'appear, or hit "Refresh", before adding pointer "'+
+                new_device.name+'"', 'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+            return
+        
+        Plan.CreateDeviceCmd (self, new_device)
+    
+    def Reset (self):
+        
+        """Discard pending changes and reload the device list.
+        
+        The device list is loaded on a worker thread; FinishReset takes over
+        when it's done, so the window stays responsive meanwhile.
+        
+        """
+        
+        if len (self.all_commands):
+            confirm = wx.MessageDialog (self.UI,
+                    'You still have pending changes! These will be lost if '+
+                    'you refresh the device list. Refresh anyway?',
+                    'Proceed?', wx.YES_NO | wx.ICON_QUESTION
+                )
+            result = confirm.ShowModal ()
+            confirm.Destroy ()
+            if result == wx.ID_NO:
+                return
+        
+        if self.status_counters is None:
+            self.status_counters = timing.snapshot ()
+        
+        self.reload_wanted = True
+        self.page.ShowBusy (True)
+        self.scanner.request ()
+    
+    def Rescan (self):
+        
+        """Merge in devices that came or went, keeping pending changes.
+        
+        Shares the scanner with Reset, so a scan that a refresh superseded
+        is never merged afterwards; if a refresh is under way, its result
+        will include these devices anyway.
+        
+        """
+        
+        self.scanner.request ()
+    
+    def CancelReset (self):
+        
+        self.scanner.cancel ()
+        self.reload_wanted = False
+        self.page.ShowBusy (False)
+        self.status_counters = None
+    
+    def OnScanDone (self, generation, master_devices, error):
+        
+        """Called from the scanner's worker thread."""
+        
+        wx.CallAfter (self.FinishReset, generation, master_devices, error)
+    
+    def FinishReset (self, generation, master_devices, error):
+        
+        # a newer scan was requested, or this one was cancelled
+        if not self.scanner.is_current (generation):
+            return
+        
+        if not self.reload_wanted:
+            # just a Rescan; a failure there (often a device that went away
+            # halfway through) shouldn't pop up a box, and the next event or
+            # refresh will try again
+            if error is not None:
+                self.page.SetStatusText ('Could not update the device list: '+str(error))
+            else:
+                self.MergeDeviceStatus (master_devices)
+            return
+        
+        self.reload_wanted = False
+        self.page.ShowBusy (False)
+        
+        if error is not None:
+            self.status_counters = None
+            wx.MessageBox (
+                self.page.prefix+'Could not load the device list: '+str(error),
+                'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+            return
+        
+        self.Reload (master_devices)
+        timing.mark ("device list loaded")
+        self.page.properties.DevicesReloaded ()
+        
+        self.page.SetStatusText (timing.describe (self.status_counters))
+        self.status_counters = None
+    
+    def ForgetDevice (self, device):
+        
+        Plan.ForgetDevice (self, device)
+        
+        tree = self.page.tree
+        if device in tree.items:
+            tree.RemoveDevice (device)
+        
+        self.page.properties.ForgetDevice (device)
+
+class Action:
+    
+    """Something the user can do from a menu, the toolbar or the keyboard.
+    
+    offer is called with the selected devices, and returns a (label, run)
+    pair for what the action would do to them, where run takes no arguments,
+    or None if the action doesn't apply to them. enabled is called the same
+    way; by default an action is enabled whenever it applies. checked, if
+    given, makes the action a check item in menus, and is called the same
+    way to say whether it's ticked.
+    
+    """
+    
+    def __init__ (self, action_id, offer, enabled = None, checked = None):
+        self.id = action_id
+        self.offer = offer
+        self.enabled = enabled or (lambda devices: offer (devices) is not None)
+        self.checked = checked
+
+class ActionRegistry:
+    
+    """Every Action in the window, each under an ID that never changes.
+    
+    Menu items, toolbar buttons and keyboard shortcuts for an action all use
+    its ID, so they're all handled by OnCommand, which asks the action what
+    to do for whatever is selected at the time, on the current DisplayPage.
+    Nothing is made in advance:
+    menus are only built when they pop up (see MakeMenu), and a selection
+    change just re-enables the toolbar buttons (see UpdateToolbar.)
+    
+    """
+    
+    def __init__ (self, UI):
+        
+        self.UI = UI
+        
+        # action id -> Action
+        self.actions = {}
+        # action id -> the toolbar button for it
+        self.buttons = {}
+        
+        self.Add (ID_CANCEL_CHANGE, self.OfferCancel)
+        self.Add (wx.ID_REMOVE, self.OfferRemove)
+        self.Add (ID_RESET_MASTER, self.OfferResetMaster)
+        self.Add (ID_DETACH_ALL, self.OfferDetachAll)
+        self.Add (wx.ID_UNDO, lambda _: ('Undo\tCtrl+Z', self.GetChanges ().Undo),
+                  lambda _: self.GetChanges ().CanUndo ())
+        self.Add (wx.ID_REDO, lambda _: ('Redo\tCtrl+Shift+Z', self.GetChanges ().Redo),
+                  lambda _: self.GetChanges ().CanRedo ())
+        self.Add (wx.ID_REFRESH, lambda _: ('Refresh\tF5', self.GetChanges ().Reset))
+        self.Add (wx.ID_APPLY, lambda _: ('Apply', self.GetChanges ().Apply),
+                  lambda _: bool (len (self.GetChanges ().all_commands)))
+        self.Add (ID_APPLY_ALL, lambda _: ('Apply all', UI.ApplyAll),
+                  lambda _: any (len (page.changes.all_commands) for page in UI.vbox.pages))
+        self.Add (wx.ID_SAVEAS, lambda _: ('Save trace...', UI.SaveTrace))
+        self.Add (ID_SHOW_ACTIVITY, lambda _: ('Highlight devices in use\tCtrl+I', UI.ToggleActivity),
+                  checked = lambda _: UI.showing_activity)
+        
+        # the device tree's context menu: what can be done to the selected
+        # devices, then what can be done to the whole plan
+        self.tree_menu = [
+            [ID_CANCEL_CHANGE, wx.ID_REMOVE, ID_RESET_MASTER, ID_DETACH_ALL],
+            [wx.ID_UNDO, wx.ID_REDO],
+            [ID_SHOW_ACTIVITY],
+        ]
+        self.status_menu = [[wx.ID_SAVEAS]]
+        
+        toolbar = UI.vbox.toolbar
+        self.buttons[wx.ID_REFRESH] = toolbar.button_refresh
+        self.buttons[wx.ID_APPLY] = toolbar.button_apply
+        self.buttons[wx.ID_REMOVE] = toolbar.button_del
+        if toolbar.button_apply_all is not None:
+            self.buttons[ID_APPLY_ALL] = toolbar.button_apply_all
+        
+        for action_id in self.actions:
+            UI.Bind (wx.EVT_MENU, self.OnCommand, id = action_id)
+            UI.Bind (wx.EVT_BUTTON, self.OnCommand, id = action_id)
+        
+        # Delete is handled by the device tree, so that it still works in
+        # the NewMasterBar's text field
+        UI.SetAcceleratorTable (wx.AcceleratorTable ([
+            (wx.ACCEL_NORMAL, wx.WXK_F5, wx.ID_REFRESH),
+            (wx.ACCEL_CTRL, ord ('Z'), wx.ID_UNDO),
+            (wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord ('Z'), wx.ID_REDO),
+            (wx.ACCEL_CTRL, ord ('Y'), wx.ID_REDO),
+            (wx.ACCEL_CTRL, ord ('I'), ID_SHOW_ACTIVITY),
+        ]))
+        
+        self.UpdateToolbar ()
+    
+    def Add (self, action_id, offer, enabled = None, checked = None):
+        
+        self.actions[action_id] = Action (action_id, offer, enabled, checked)
+    
+    def GetChanges (self):
+        
+        return self.UI.page.changes
+    
+    def GetSelectedDevices (self):
+        
+        return self.UI.page.tree.GetSelectedDevices ()
+    
+    def Run (self, action_id):
+        
+        """Do an action to the selected devices, if it's enabled for them."""
+        
+        action = self.actions[action_id]
+        devices = self.GetSelectedDevices ()
+        if not action.enabled (devices):
+            return
+        offer = action.offer (devices)
+        if offer is not None:
+            offer[1] ()
+    
+    def OnCommand (self, evt):
+        
+        self.Run (evt.GetId ())
+    
+    def UpdateToolbar (self):
+        
+        """Enable the toolbar buttons whose actions are enabled right now."""
+        
+        devices = self.GetSelectedDevices ()
+        for action_id, button in self.buttons.iteritems ():
+            button.Enable (self.actions[action_id].enabled (devices))
+    
+    def MakeMenu (self, groups):
+        
+        """Build a menu of the actions that apply to the selected devices.
+        
+        groups is a list of lists of action IDs. Groups with nothing enabled
+        in them are left out, and the rest are separated. Returns None if
+        the menu would be empty; otherwise the caller destroys it after
+        popping it up.
+        
+        """
+        
+        devices = self.GetSelectedDevices ()
+        menu = None
+        
+        for group in groups:
+            
+            entries = []
+            for action_id in group:
+                action = self.actions[action_id]
+                offer = action.offer (devices)
+                if offer is not None:
+                    entries.append ((action, offer[0], action.enabled (devices)))
+            
+            if not any (enabled for _, _, enabled in entries):
+                continue
+            
+            if menu is None:
+                menu = wx.Menu ()
+            else:
+                menu.AppendSeparator ()
+            
+            for action, label, enabled in entries:
+                if action.checked is None:
+                    item = wx.MenuItem (menu, action.id, label)
+                else:
+                    item = wx.MenuItem (menu, action.id, label, kind = wx.ITEM_CHECK)
+                menu.AppendItem (item)
+                if action.checked is not None:
+                    item.Check (action.checked (devices))
+                item.Enable (enabled)
+        
+        return menu
+    
+    def OfferCancel (self, devices):
+        
+        if len (devices) != 1:
+            return None
+        device = devices[0]
+        changes = self.GetChanges ()
+        
+        if device in changes.all_deletions:
+            return ('Cancel delete '+device.name, lambda: changes.UndoDeleteDeviceCmd (device))
+        
+        if device in changes.all_creations:
+            return ('Cancel create pointer '+device.name, lambda: changes.UndoCreateDeviceCmd (device))
+        
+        if device in changes.all_moves and device.parent not in changes.all_deletions:
+            if changes.all_moves[device] == changes.floating_group:
+                text = 'Cancel detach '+device.name
+            else:
+                text = 'Cancel reattach '+device.name
+            return (text, lambda: changes.UndoMoveDeviceCmd (device))
+        
+        return None
+    
+    def OfferRemove (self, devices):
+        
+        changes = self.GetChanges ()
+        removable = [device for device in devices if changes.CanRemove (device)]
+        
+        if not len (removable):
+            return None
+        
+        if len (devices) > 1:
+            return ('Remove '+str(len(removable))+' selected devices\tDel',
+                    lambda: changes.RemoveDevicesCmd (removable))
+        
+        device = removable[0]
+        if device.__class__ != SlaveDevice:
+            return ('Delete '+device.name+'\tDel', lambda: changes.DeleteDeviceCmd (device))
+        return ('Detach '+device.name+'\tDel', lambda: changes.DetachDeviceCmd (device))
+    
+    def GetActiveMaster (self, devices):
+        
+        """The selected master, if it's the only selection and is real."""
+        
+        if len (devices) != 1:
+            return None
+        device = devices[0]
+        changes = self.GetChanges ()
+        if      device.__class__ == SlaveDevice or \
+                device in changes.all_creations or \
+                device in changes.all_deletions or \
+                device == changes.floating_group:
+            return None
+        return device
+    
+    def OfferResetMaster (self, devices):
+        
+        device = self.GetActiveMaster (devices)
+        if device is None:
+            return None
+        return ('Reset all devices for '+device.name,
+                lambda: self.GetChanges ().ResetAllSlavesOfDeviceCmd (device))
+    
+    def OfferDetachAll (self, devices):
+        
+        device = self.GetActiveMaster (devices)
+        if device is None:
+            return None
+        return ('Detatch all devices from '+device.name,
+                lambda: self.GetChanges ().DetachAllSlavesFromDeviceCmd (device))
+
+class DisplayPage (wx.Panel):
+    
+    """The device tree, properties and pending commands for one X display.
+    
+    Each has its own Changes, so its own plan, undo history and background
+    reloads, its own DeviceWatcher and its own queue of property edits.
+    Normally there's just one, for $DISPLAY; in multi-display mode (see
+    xinputui.displays) there's one per display, each on a tab of its own.
+    
+    """
+    
+    def __init__ (self, UI, parent, display_name = None):
+        
+        super (DisplayPage, self).__init__(parent)
+        
+        self.UI = UI
+        self.display_name = display_name
+        # goes in front of error messages, to tell which display they're about
+        self.prefix = display_name+': ' if display_name is not None else ''
+        
+        # whether a reload is running, and what the status bar should say,
+        # for when this becomes the current page
+        self.busy = False
+        self.status_text = ""
+        
+        self.changes = Changes (self)
+        
+        splitter = wx.SplitterWindow (self, -1)
+        # the properties and the pending commands share the bottom half
+        lower = wx.SplitterWindow (splitter, -1)
+        
+        cmdpanel = wx.Panel (lower)
+        self.cmdlist = CommandList (self, cmdpanel)
+        proppanel = wx.Panel (lower)
+        self.properties = PropertyList (self, proppanel)
+        treepanel = wx.Panel (splitter)
+        self.tree = DeviceTree (self, treepanel)
+        
+        lower.SplitHorizontally (proppanel, cmdpanel)
+        lower.SetSashGravity (1.0)
+        lower.SetSashPosition (-100)
+        
+        splitter.SplitHorizontally (treepanel, lower)
+        splitter.SetSashGravity (0.5)
+        
+        sizer = wx.BoxSizer (wx.VERTICAL)
+        sizer.Add (splitter, flag = wx.EXPAND, proportion = 1)
+        self.SetSizer (sizer)
+        
+        # pick up devices being plugged in and removed without a refresh
+        self.watcher = DeviceWatcher (self.OnDevicesChanged, display_name)
+        
+        # only while devices in use are being highlighted
+        self.activity_monitor = None
+    
+    def Start (self):
+        
+        self.changes.Reset ()
+        self.watcher.start ()
+        self.properties.Start ()
+    
+    def Stop (self):
+        
+        self.watcher.stop ()
+        self.properties.Stop ()
+        self.ShowActivity (False)
+    
+    def ShowActivity (self, show):
+        
+        """Start or stop highlighting devices in use; False if it can't."""
+        
+        if show and self.activity_monitor is None:
+            monitor = ActivityMonitor (self.OnActivity, self.display_name)
+            if not monitor.start ():
+                return False
+            self.activity_monitor = monitor
+        elif not show and self.activity_monitor is not None:
+            self.activity_monitor.stop ()
+            self.activity_monitor = None
+            self.tree.ShowActivity (())
+        return True
+    
+    def OnActivity (self, device_ids):
+        
+        """Called from the activity monitor's thread."""
+        
+        wx.CallAfter (self.FinishActivity, device_ids)
+    
+    def FinishActivity (self, device_ids):
+        
+        # it may have been turned off meanwhile
+        if self.activity_monitor is not None:
+            self.tree.ShowActivity (device_ids)
+    
+    def IsCurrent (self):
+        
+        return self.UI.page is self
+    
+    def ShowBusy (self, busy):
+        
+        """Show or hide that the device list is being reloaded."""
+        
+        self.busy = busy
+        self.SetStatusText ("Reloading device list..." if busy else "")
+        if self.IsCurrent ():
+            self.UI.vbox.toolbar.ShowBusy (busy)
+    
+    def SetStatusText (self, text):
+        
+        self.status_text = text
+        if self.IsCurrent ():
+            self.UI.SetStatusText (text)
+    
+    def OnDevicesChanged (self):
+        
+        """Called from the watcher thread when devices come or go."""
+        
+        wx.CallAfter (self.changes.Rescan)
+
+class MainColumn (wx.BoxSizer):
+    
+    """Container widget containing all the other widgets in the GUI.
+    
+    Not much interesting functionality here, just layout stuff and a couple of
+    callbacks. Should probably be merged with UI class below.
+    
+    """
+    
+    def __init__ (self, UI):
+        
+        self.UI = UI
+        
+        panel = wx.Panel (self.UI)
+        
+        super (MainColumn, self).__init__(wx.VERTICAL)
+        
+        if len (UI.display_names):
+            body = wx.Notebook (panel)
+            self.pages = [DisplayPage (UI, body, name) for name in UI.display_names]
+            for page in self.pages:
+                body.AddPage (page, page.display_name)
+            body.Bind (wx.EVT_NOTEBOOK_PAGE_CHANGED, UI.OnPageChanged)
+        else:
+            body = DisplayPage (UI, panel)
+            self.pages = [body]
+        UI.page = self.pages[0]
+        
+        self.toolbar = MainBar (self, panel)
+        self.createmaster_toolbar = NewMasterBar (self, panel)
+        
+        self.Add (self.toolbar, flag = wx.ALIGN_TOP)
+        self.Add (self.createmaster_toolbar, proportion = 0, flag = wx.ALIGN_TOP | wx.EXPAND)
+        self.createmaster_toolbar.Hide ()
+        self.Add (body, flag = wx.EXPAND, proportion = 1)
+        
+        panel.SetSizer (self)
+
+class UI (wx.Frame):
+    
+    """Top-level window widget.
+    
+    Besides some initialization code, there's not much interesting
+    functionality here.  Just layout stuff and a couple of callbacks.
+    
+    """
+    
+    def __init__(self, parent, title):
+        
+        super(UI, self).__init__(parent, title = title, size = (400, 600))
+        
+        self.SetMinSize ((340, 150))
+        
+        status_bar = self.CreateStatusBar ()
+        status_bar.SetToolTip (wx.ToolTip ("Right-click to save a trace of where the time went"))
+        status_bar.Bind (wx.EVT_RIGHT_UP, self.OnStatusRightClick)
+        
+        # several displays, one tab each, or [] for just $DISPLAY
+        self.display_names = get_display_names ()
+        
+        # the DisplayPage being shown; set by MainColumn
+        self.page = None
+        
+        # whether devices in use are being highlighted, on every page
+        self.showing_activity = False
+        
+        self.vbox = MainColumn (self)
+        
+        # menus, toolbar buttons and keyboard shortcuts
+        self.actions = ActionRegistry (self)
+        
+        self.page.tree.GetMainWindow ().Bind (wx.EVT_PAINT, self.OnPaint)
+        
+        # each page reloads on a thread of its own, so the displays are
+        # all read at the same time
+        for page in self.vbox.pages:
+            page.Start ()
+        
+        self.Bind (wx.EVT_CLOSE, self.OnClose)
+        
+        self.Show ()
+    
+    def OnPageChanged (self, evt):
+        
+        self.page = self.vbox.pages[evt.GetSelection ()]
+        self.vbox.toolbar.ShowBusy (self.page.busy)
+        self.SetStatusText (self.page.status_text)
+        self.actions.UpdateToolbar ()
+        evt.Skip ()
+    
+    def ApplyAll (self):
+        
+        """Apply the pending changes of every display at once.
+        
+        Like Changes.Apply, but the displays are applied to concurrently,
+        and the results for all of them are shown together.
+        
+        """
+        
+        pages = [page for page in self.vbox.pages if len (page.changes.all_commands)]
+        for page in pages:
+            page.changes.status_counters = timing.snapshot ()
+        
+        with timing.phase ("UI.ApplyAll"):
+            applied = map_concurrently (
+                lambda page: apply_commands (page.changes.all_commands, page.display_name), pages)
+        
+        results = []
+        displays = []
+        errors = []
+        for page, (page_results, error) in zip (pages, applied):
+            page.changes.ApplyDone ()
+            if error is not None:
+                if not isinstance (error, XI2Error):
+                    raise error
+                errors.append (page.prefix+str(error))
+            elif page_results is not None:
+                results.extend (page_results)
+                displays.extend ([page.display_name] * len (page_results))
+        
+        if len (errors):
+            wx.MessageBox (
+                'Could not apply pending changes:\n'+'\n'.join (errors),
+                'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+        
+        if len (results):
+            dialog = ApplyResultsDialog (self, results, displays)
+            dialog.ShowModal ()
+            dialog.Destroy ()
+    
+    def ToggleActivity (self):
+        
+        """Start or stop highlighting devices as they're used."""
+        
+        show = not self.showing_activity
+        started = [page.ShowActivity (show) for page in self.vbox.pages]
+        
+        if show and not any (started):
+            wx.MessageBox (
+                'Highlighting devices in use needs XInput 2, which is not available.',
+                'Error', wx.OK | wx.ICON_EXCLAMATION
+            )
+            return
+        
+        self.showing_activity = show
+    
+    def OnPaint (self, evt):
+        
+        timing.mark ("first paint")
+        evt.Skip ()
+    
+    def OnStatusRightClick (self, evt):
+        
+        menu = self.actions.MakeMenu (self.actions.status_menu)
+        self.GetStatusBar ().PopupMenu (menu, evt.GetPosition ())
+        menu.Destroy ()
+    
+    def SaveTrace (self):
+        
+        """Save the instrumentation as a Chrome trace; see timing.write_trace."""
+        
+        dialog = wx.FileDialog (self, 'Save trace', defaultFile = 'xinput-ui-trace.json',
+                                wildcard = 'Trace files (*.json)|*.json',
+                                style = wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dialog.ShowModal () == wx.ID_OK:
+            try:
+                timing.write_trace (dialog.GetPath ())
+            except (IOError, OSError) as e:
+                wx.MessageBox (
+                    'Could not save the trace: '+str(e),
+                    'Error', wx.OK | wx.ICON_EXCLAMATION
+                )
+        dialog.Destroy ()
+    
+    def OnClose (self, evt):
+        
+        for page in self.vbox.pages:
+            page.Stop ()
+        evt.Skip ()
+
+def main ():
+    
+    """Open the main window and run until it's closed."""
+    
+    app = wx.App ()
+    timing.mark ("wx.App created")
+    UI (None, title = 'Xinput-UI')
+    app.MainLoop ()
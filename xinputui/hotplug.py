@@ -0,0 +1,236 @@
+# xinput-ui: noticing devices coming and going.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Hotplug watching and background device scans.
+
+"""
+
+import ctypes, ctypes.util
+import os
+import select
+import sys
+import threading
+
+from xinputui.devices import XI2Display, XI2Unavailable, get_device_status
+from xinputui.transcript import get_transcript
+
+# How long DeviceWatcher waits for a burst of hotplug events to settle before
+# reloading the device list, in seconds
+HOTPLUG_SETTLE_TIME = 0.5
+
+class HotplugUnavailable (Exception):
+    
+    """Raised when there's no way to be told about devices coming and going."""
+
+class InotifyHotplugSource:
+    
+    """Watches /dev/input with inotify, for when XI2 events can't be used.
+    
+    Device nodes appear and disappear there as hardware is plugged in and
+    removed. Has the same fileno/drain_events/close interface as the
+    XI2Display that DeviceWatcher would otherwise use.
+    
+    """
+    
+    IN_ATTRIB = 0x004
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    
+    def __init__ (self, path = "/dev/input"):
+        
+        libc_path = ctypes.util.find_library ("c")
+        if libc_path is None:
+            raise HotplugUnavailable ("libc not found")
+        libc = ctypes.CDLL (libc_path, use_errno = True)
+        
+        try:
+            self.fd = libc.inotify_init ()
+        except AttributeError:
+            raise HotplugUnavailable ("inotify not supported")
+        if self.fd < 0:
+            raise HotplugUnavailable (os.strerror (ctypes.get_errno ()))
+        
+        mask = self.IN_ATTRIB | self.IN_CREATE | self.IN_DELETE
+        if libc.inotify_add_watch (self.fd, path, mask) < 0:
+            error = os.strerror (ctypes.get_errno ())
+            self.close ()
+            raise HotplugUnavailable (path+": "+error)
+    
+    def fileno (self):
+        return self.fd
+    
+    def drain_events (self):
+        return len (os.read (self.fd, 65536))
+    
+    def close (self):
+        if self.fd >= 0:
+            os.close (self.fd)
+            self.fd = -1
+
+class DeviceWatcher:
+    
+    """Watches for input devices being plugged in or removed.
+    
+    Runs a background thread which waits for XI2 hierarchy events on a
+    connection of its own, or failing that for inotify events on /dev/input.
+    Events tend to come in bursts, so the callback isn't called until there
+    have been no more for settle_time seconds. The callback is called from
+    the watcher thread, not the main thread.
+    
+    """
+    
+    def __init__ (self, callback, display_name = None, settle_time = HOTPLUG_SETTLE_TIME):
+        
+        self.callback = callback
+        self.display_name = display_name
+        self.settle_time = settle_time
+        self.source = None
+        self.thread = None
+    
+    def _open_source (self):
+        
+        # a replayed session has nothing to do with the devices here
+        transcript = get_transcript ()
+        if transcript is not None and transcript.replaying:
+            return None
+        
+        if os.environ.get ("XINPUT_UI_BACKEND") != "xinput":
+            try:
+                display = XI2Display (self.display_name)
+                display.select_hotplug_events ()
+                return display
+            except XI2Unavailable:
+                pass
+        
+        try:
+            return InotifyHotplugSource ()
+        except HotplugUnavailable:
+            return None
+    
+    def start (self):
+        
+        """Start watching. Returns False if there's no way to watch."""
+        
+        self.source = self._open_source ()
+        if self.source is None:
+            return False
+        
+        # written to by stop(), to wake the thread up
+        self.wake_read, self.wake_write = os.pipe ()
+        
+        self.thread = threading.Thread (target = self._run)
+        self.thread.daemon = True
+        self.thread.start ()
+        
+        return True
+    
+    def stop (self):
+        
+        if self.thread is None:
+            return
+        
+        os.write (self.wake_write, b'x')
+        self.thread.join ()
+        self.thread = None
+        
+        os.close (self.wake_read)
+        os.close (self.wake_write)
+        self.source.close ()
+    
+    def _run (self):
+        
+        pending = False
+        
+        while True:
+            timeout = self.settle_time if pending else None
+            readable = select.select ([self.source.fileno (), self.wake_read], [], [], timeout)[0]
+            if self.wake_read in readable:
+                return
+            if len (readable):
+                self.source.drain_events ()
+                pending = True
+            elif pending:
+                pending = False
+                # one failure mustn't stop hotplug for the rest of the session
+                try:
+                    self.callback ()
+                except Exception as e:
+                    sys.stderr.write ('xinput-ui: reacting to a hotplug event failed: '+str(e)+'\n')
+
+class DeviceScanner:
+    
+    """Runs get_device_status, or another scan, on a worker thread.
+    
+    Only one scan runs at a time. Each call to request() supersedes the
+    previous ones. If a scan is already running, no second scan is started;
+    instead, once it finishes, its (now outdated) result is thrown away and
+    exactly one more scan is run, however many requests came in meanwhile.
+    cancel() throws away the result of the running scan without starting
+    another.
+    
+    callback (generation, master_devices, error) is called from the worker
+    thread, with whatever scan returned as master_devices. Since a request
+    or cancel may sneak in before the result is used, check is_current
+    (generation) on the receiving end as well.
+    
+    """
+    
+    def __init__ (self, callback, scan = get_device_status):
+        
+        self.callback = callback
+        self.scan = scan
+        
+        self.lock = threading.Lock ()
+        self.generation = 0
+        self.wanted = False
+        self.running = False
+    
+    def request (self):
+        
+        with self.lock:
+            self.generation += 1
+            self.wanted = True
+            if self.running:
+                return
+            self.running = True
+        
+        thread = threading.Thread (target = self._run)
+        thread.daemon = True
+        thread.start ()
+    
+    def cancel (self):
+        
+        with self.lock:
+            self.generation += 1
+            self.wanted = False
+    
+    def is_current (self, generation):
+        
+        with self.lock:
+            return generation == self.generation
+    
+    def _run (self):
+        
+        while True:
+            
+            with self.lock:
+                generation = self.generation
+            
+            master_devices = error = None
+            try:
+                master_devices = self.scan ()
+            except Exception as e:
+                error = e
+            
+            with self.lock:
+                if generation == self.generation:
+                    self.running = self.wanted = False
+                    break
+                if not self.wanted:
+                    self.running = False
+                    return # cancelled
+                # superseded by a newer request, so go around again
+        
+        self.callback (generation, master_devices, error)
@@ -0,0 +1,830 @@
+# xinput-ui: planning changes to the device hierarchy.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""The command planner shared by the GUI and the command-line interface."""
+
+import collections
+import contextlib
+
+from xinputui.devices import CORE_MASTER_NAME, FLOATING_ID, SlaveDevice, PendingDevice, DeviceList, device_sort, master_base_name
+
+# The pending state of a device with no pending changes; see Plan.DeviceState
+NO_CHANGES = (None, False, False)
+
+# Up to this many replaced commands, Plan.DropStaleCommands looks each one up
+# in all_commands; with more, it filters the whole list once
+STALE_LOOKUP_LIMIT = 4
+
+class PlanError (Exception):
+    
+    """Raised when a requested change can't be planned."""
+
+class Plan:
+    
+    """Class for tracking and updating pending changes.
+    
+    Knows nothing about how the changes are displayed. A front-end subclasses
+    this and overrides the hooks (CommandRemoved, CommandAdded, UpdateDevice,
+    UpdateFinished, ForgetDevice) to keep its widgets in step.
+    
+    """
+    
+    def __init__ (self):
+        
+        # Used for categorizing different types of commands. Call Update
+        # with the affected devices after updating any of these.
+        self.all_moves = {}
+        self.all_deletions = set()
+        self.all_creations = set()
+        
+        # Will be fed one at a time to run_command function. Updated by
+        # UpdateDevice, in the order they were planned.
+        self.all_commands = []
+        
+        # The entries of all_commands, grouped by the device they're for.
+        self.device_commands = {}
+        
+        # Entries of all_commands that have been replaced, by id(), left
+        # there until Update drops them all at once.
+        self.stale_commands = {}
+        
+        # reflects what's currently on-screen (i.e. current state plus pending
+        # changes): master -> DeviceList of the slaves shown under it.
+        # Updated by UpdateDevice.
+        self.display_heirarchy = None
+        
+        # The reverse of display_heirarchy: slave device -> the master it's
+        # currently shown under. Use this rather than searching
+        # display_heirarchy to find where a slave will end up.
+        self.display_parent = {}
+        
+        # While a transaction is open, Update only collects the devices here
+        # (as an ordered set) and CommitTransaction updates them all at once.
+        self.transaction_depth = 0
+        self.transaction_devices = collections.OrderedDict ()
+        
+        # copy of the floating master for convenience
+        self.floating_group = None
+        
+        # Essentially the device heirarchy as it currently exists, before
+        # changes. None until Load is first called.
+        self.master_devices = None
+        
+        # Undo history. Each step is {device: (old state, new state)} for
+        # just the devices one change affected (see DeviceState), so a step
+        # costs memory in proportion to what it changed, and everything it
+        # didn't change is shared with the steps around it. recorded_states
+        # holds the state of every device with pending changes as of the
+        # last step, for working out the next one.
+        self.undo_steps = []
+        self.redo_steps = []
+        self.recorded_states = {}
+    
+    def GetDeviceStatusText (self, device):
+        
+        """For use in the device tree view display."""
+        
+        if device in self.all_moves:
+            return " (move pending)"
+        elif device in self.all_creations:
+            return " (pending)"
+        elif device in self.all_deletions:
+            return " (deleted)"
+        else:
+            return ""
+    
+    def GetDeviceCommands (self, device):
+        
+        """Returns the commands needed to carry out one device's changes."""
+        
+        if device in self.all_creations:
+            return [["xinput", "create-master", device.name]]
+        
+        if device in self.all_deletions:
+            return [["xinput", "remove-master", str(device.self_id)]]
+        
+        if device not in self.all_moves:
+            return []
+        
+        dest_device = self.all_moves[device]
+        self_id_str = str(device.self_id)
+        
+        if dest_device == self.floating_group:
+            # don't have to explicitly run a float command if the
+            # parent is being deleted; that happens automatically
+            if device.parent in self.all_deletions:
+                return []
+            return [["xinput", "float", self_id_str]]
+        elif dest_device.__class__ == PendingDevice:
+            # No IDs yet, so go by the names the X server will give the new
+            # pair. The creation is run first; see COMMAND_STAGES.
+            pointer_name = dest_device.name+" pointer"
+            keyboard_name = dest_device.name+" keyboard"
+            if device.is_pointer is not None:
+                return [["xinput", "reattach", self_id_str, pointer_name if device.is_pointer else keyboard_name]]
+            return [["xinput", "reattach", self_id_str, pointer_name],
+                    ["xinput", "reattach", self_id_str, keyboard_name]]
+        elif device.is_pointer is not None:
+            return [["xinput", "reattach", self_id_str, str(device.get_master_id (dest_device))]]
+        else:
+            # Unknown device type, so brute-force it; one of these
+            # is guaranteed to fail.
+            return [["xinput", "reattach", self_id_str, str(dest_device.pointer_id)],
+                    ["xinput", "reattach", self_id_str, str(dest_device.keyboard_id)]]
+    
+    def UpdateDisplayHeirarchy (self, device):
+        
+        """Move a slave within display_heirarchy if its destination changed."""
+        
+        if device.__class__ != SlaveDevice:
+            return
+        
+        dest_device = self.all_moves.get (device, device.parent)
+        old_dest_device = self.display_parent.get (device)
+        if old_dest_device != dest_device:
+            if old_dest_device is not None:
+                self.display_heirarchy[old_dest_device].remove (device)
+            self.display_heirarchy[dest_device].add (device)
+            self.display_parent[device] = dest_device
+    
+    def CommandRemoved (self, index):
+        
+        """Hook: all_commands[index] has just been deleted."""
+    
+    def CommandAdded (self, command):
+        
+        """Hook: command has just been appended to all_commands."""
+    
+    def SetDeviceCommands (self, device, commands):
+        
+        """Replace a device's commands in all_commands.
+        
+        The old ones are only marked stale; DropStaleCommands removes them.
+        
+        """
+        
+        old_commands = self.device_commands.pop (device, [])
+        if commands != old_commands:
+            for cmd in old_commands:
+                self.stale_commands[id (cmd)] = cmd
+            for cmd in commands:
+                self.all_commands.append (cmd)
+                self.CommandAdded (cmd)
+        else:
+            commands = old_commands
+        if len (commands):
+            self.device_commands[device] = commands
+    
+    def DropStaleCommands (self):
+        
+        """Remove the commands SetDeviceCommands replaced from all_commands.
+        
+        A few are looked up one by one. Past STALE_LOOKUP_LIMIT, a single
+        pass over all_commands is cheaper, so a bulk change costs one pass
+        rather than one per command it replaced.
+        
+        """
+        
+        stale = self.stale_commands
+        self.stale_commands = {}
+        
+        if len (stale) <= STALE_LOOKUP_LIMIT:
+            for cmd in stale.itervalues ():
+                index = self.all_commands.index (cmd)
+                del self.all_commands[index]
+                self.CommandRemoved (index)
+            return
+        
+        removed = [index for index, cmd in enumerate (self.all_commands) if id (cmd) in stale]
+        self.all_commands[:] = [cmd for cmd in self.all_commands if id (cmd) not in stale]
+        
+        # as if deleted one at a time from the end, so every index is right
+        for index in reversed (removed):
+            self.CommandRemoved (index)
+    
+    def UpdateDevice (self, device):
+        
+        """Bring the command plan up to date for one device.
+        
+        Front-ends extend this to update the device's widgets as well.
+        
+        """
+        
+        self.SetDeviceCommands (device, self.GetDeviceCommands (device))
+    
+    def UpdateFinished (self):
+        
+        """Hook: called after Update has updated a batch of devices."""
+    
+    def Update (self, devices):
+        
+        """Updates the pending commands and the display for some devices.
+        
+        Only the given devices are looked at, so the cost depends on how much
+        changed rather than on how many devices there are. Called after a
+        device is moved, floated, deleted, created, etc.
+        
+        display_heirarchy is always updated straight away, since later steps
+        of a bulk operation may depend on it. Inside a transaction, everything
+        else waits until the transaction is committed.
+        
+        """
+        
+        for device in devices:
+            self.UpdateDisplayHeirarchy (device)
+        
+        if self.transaction_depth:
+            for device in devices:
+                self.transaction_devices[device] = None
+            return
+        
+        self.RecordStep (devices)
+        
+        for device in devices:
+            self.UpdateDevice (device)
+        self.DropStaleCommands ()
+        
+        self.UpdateFinished ()
+    
+    def BeginTransaction (self):
+        
+        """Start a group of changes that should be displayed as one.
+        
+        Until the matching CommitTransaction, changed devices are only
+        recorded; the commit then updates each of them once. Transactions
+        nest, and only the outermost commit does anything.
+        
+        """
+        
+        self.transaction_depth += 1
+    
+    def CommitTransaction (self):
+        
+        self.transaction_depth -= 1
+        if self.transaction_depth:
+            return
+        
+        devices = self.transaction_devices.keys ()
+        self.transaction_devices = collections.OrderedDict ()
+        self.Update (devices)
+    
+    @contextlib.contextmanager
+    def Transaction (self):
+        
+        """Context manager wrapping BeginTransaction and CommitTransaction."""
+        
+        self.BeginTransaction ()
+        try:
+            yield
+        finally:
+            self.CommitTransaction ()
+    
+    def Regenerate (self):
+        
+        """Regenerates the pending command list from scratch.
+        
+        Also rebuilds the preview of the new device heirarchy as it will
+        exist after changes are applied. Only needed after the device list
+        has been reloaded; after that, use Update.
+        
+        """
+        
+        self.floating_group = self.master_devices[FLOATING_ID]
+        
+        self.all_commands = []
+        self.device_commands = {}
+        self.stale_commands = {}
+        self.display_heirarchy = {master: DeviceList () for master in self.master_devices.values()}
+        for master in self.all_creations:
+            self.display_heirarchy[master] = DeviceList ()
+        self.display_parent = {}
+        
+        # real masters first, then the floating group, then their slaves,
+        # then pending masters (which get shown before the floating group.)
+        masters = device_sort (self.master_devices.values())
+        devices = [master for master in masters if master != self.floating_group]
+        devices.append (self.floating_group)
+        for master in masters:
+            devices.extend (master.children)
+        devices.extend (self.all_creations)
+        
+        self.Update (devices)
+    
+    def DeviceState (self, device):
+        
+        """A device's pending changes, as (move destination, deleted, created).
+        
+        NO_CHANGES for a device with none.
+        
+        """
+        
+        return (self.all_moves.get (device), device in self.all_deletions, device in self.all_creations)
+    
+    def RecordStep (self, devices):
+        
+        """Add whatever has happened to devices to the undo history.
+        
+        Called by Update, so every change made through it, or through a
+        transaction, becomes one step. Clears the redo history if anything
+        changed.
+        
+        """
+        
+        step = {}
+        for device in devices:
+            state = self.DeviceState (device)
+            old_state = self.recorded_states.get (device, NO_CHANGES)
+            if state == old_state:
+                continue
+            step[device] = (old_state, state)
+            if state == NO_CHANGES:
+                del self.recorded_states[device]
+            else:
+                self.recorded_states[device] = state
+        
+        if len (step):
+            self.undo_steps.append (step)
+            self.redo_steps = []
+    
+    def ClearHistory (self):
+        
+        """Forget the undo history, e.g. after the device list has changed."""
+        
+        self.undo_steps = []
+        self.redo_steps = []
+        self.recorded_states = {}
+        for device in set (self.all_moves) | self.all_deletions | self.all_creations:
+            self.recorded_states[device] = self.DeviceState (device)
+    
+    def CanUndo (self):
+        
+        return bool (len (self.undo_steps))
+    
+    def CanRedo (self):
+        
+        return bool (len (self.redo_steps))
+    
+    def Undo (self):
+        
+        """Take back the last change. Costs as much as that change did."""
+        
+        if not self.CanUndo ():
+            return
+        step = self.undo_steps.pop ()
+        self.RestoreStates ([(device, states[0]) for device, states in step.iteritems ()])
+        self.redo_steps.append (step)
+    
+    def Redo (self):
+        
+        """Make the last change that was undone again."""
+        
+        if not self.CanRedo ():
+            return
+        step = self.redo_steps.pop ()
+        self.RestoreStates ([(device, states[1]) for device, states in step.iteritems ()])
+        self.undo_steps.append (step)
+    
+    def RestoreStates (self, states):
+        
+        """Put devices back into the given DeviceStates, without recording it.
+        
+        states is a list of (device, state) pairs. Masters whose creation is
+        restored are updated first, so that their slaves have somewhere to
+        go, and those whose creation is taken back go last, once their slaves
+        have left them.
+        
+        """
+        
+        created = []
+        changed = []
+        dropped = []
+        
+        for device, state in states:
+            
+            dest_device, deleted, creating = state
+            
+            if creating and device not in self.all_creations:
+                self.all_creations.add (device)
+                self.display_heirarchy[device] = DeviceList ()
+                created.append (device)
+            elif not creating and device in self.all_creations:
+                self.all_creations.remove (device)
+                dropped.append (device)
+            else:
+                changed.append (device)
+            
+            if deleted != (device in self.all_deletions):
+                if deleted:
+                    self.all_deletions.add (device)
+                else:
+                    self.all_deletions.remove (device)
+                # their float commands depend on it
+                changed.extend (device.children)
+            
+            if dest_device is None:
+                self.all_moves.pop (device, None)
+            else:
+                self.all_moves[device] = dest_device
+            
+            if state == NO_CHANGES:
+                self.recorded_states.pop (device, None)
+            else:
+                self.recorded_states[device] = state
+        
+        with self.Transaction ():
+            self.Update (created + changed + dropped)
+        
+        for master in dropped:
+            del self.display_heirarchy[master]
+    
+    def Load (self, master_devices):
+        
+        """Start over from a get_device_status result, with nothing pending."""
+        
+        self.master_devices = master_devices
+        self.all_moves = {}
+        self.all_deletions = set()
+        self.all_creations = set()
+        self.ClearHistory ()
+        
+        self.Regenerate ()
+    
+    def Reload (self, master_devices):
+        
+        """Like Load, but only redisplays what has changed.
+        
+        Pending changes are dropped, and then the new device list is merged
+        in with MergeDeviceStatus, so devices that are still there keep
+        their objects and widgets. Used after a refresh or after applying,
+        where most devices are usually as they were.
+        
+        """
+        
+        if self.master_devices is None:
+            self.Load (master_devices)
+            return
+        
+        with self.Transaction ():
+            self.DiscardChanges ()
+            self.MergeDeviceStatus (master_devices)
+    
+    def DiscardChanges (self):
+        
+        """Drop every pending change, updating only the devices involved."""
+        
+        changed = self.all_moves.keys ()
+        for master in self.all_deletions:
+            changed.append (master)
+            changed.extend (master.children)
+        changed.extend (self.all_creations)
+        dropped = list (self.all_creations)
+        
+        self.all_moves = {}
+        self.all_deletions = set()
+        self.all_creations = set()
+        
+        # every command goes, so don't look each one up on its own
+        while len (self.all_commands):
+            self.all_commands.pop ()
+            self.CommandRemoved (len (self.all_commands))
+        self.device_commands = {}
+        self.stale_commands = {}
+        
+        self.ClearHistory ()
+        
+        with self.Transaction ():
+            self.Update (changed)
+        
+        # only now that their slaves have been moved off them
+        for master in dropped:
+            del self.display_heirarchy[master]
+    
+    def MoveDeviceCmd (self, moved_device, target_device):
+        
+        self.MoveDevicesCmd ([moved_device], target_device)
+    
+    def MoveDevicesCmd (self, moved_devices, target_device):
+        
+        if target_device in self.all_deletions:
+            raise PlanError (
+                'Pointer "'+target_device.name+'" is pending deletion! '+
+                'To cancel deletion of this pointer, right-click it and '+
+                'select "Cancel delete."'
+            )
+        
+        with self.Transaction ():
+            
+            for moved_device in moved_devices:
+                
+                if moved_device.parent == target_device:
+                    # a normal drag-and-drop operation has coincidentally had
+                    # the same effect as an undo operation
+                    if moved_device not in self.all_moves:
+                        continue # don't need to do anything
+                    self.all_moves.pop (moved_device, None)
+                else:
+                    if moved_device in self.all_moves and self.all_moves[moved_device] == target_device:
+                        continue #don't need to do anything
+                    self.all_moves.update ({moved_device: target_device})
+                
+                self.Update ([moved_device])
+            
+            target_device.expanded = True
+            
+            self.Update ([target_device])
+    
+    def DetachDeviceCmd (self, child_device):
+        
+        self.MoveDeviceCmd (child_device, self.floating_group)
+    
+    def DetachDevicesCmd (self, child_devices):
+        
+        self.MoveDevicesCmd (child_devices, self.floating_group)
+    
+    def UndoMoveDeviceCmd (self, device):
+        
+        self.MoveDeviceCmd (device, device.parent)
+    
+    def CreateDeviceCmd (self, new_device):
+        
+        self.all_creations.add (new_device)
+        if self.display_heirarchy is not None:
+            self.display_heirarchy[new_device] = DeviceList ()
+        self.Update ([new_device])
+    
+    def UndoCreateDeviceCmd (self, device):
+        
+        with self.Transaction ():
+            # copied, since each undo removes the slave from this list
+            for slave in list (self.display_heirarchy.get (device, ())):
+                self.UndoMoveDeviceCmd (slave)
+            self.all_creations.remove (device)
+            self.display_heirarchy.pop (device, None)
+            self.Update ([device])
+    
+    def DetachAllSlavesFromDeviceCmd (self, device):
+        
+        # copied, since each detach removes the slave from this list
+        current_slave_list = list (self.display_heirarchy[device])
+        self.DetachDevicesCmd (current_slave_list)
+    
+    def ResetAllSlavesOfDeviceCmd (self, device):
+        
+        with self.Transaction ():
+            self._ResetAllSlavesOfDevice (device)
+    
+    def _ResetAllSlavesOfDevice (self, device):
+        
+        # First undo any devices that have been moved to this master
+        
+        # can't modify and iterate through the contents of the device tree
+        # simultaneously, so we need to defer our modifications
+        slaves_to_move = set()
+        
+        for slave in self.display_heirarchy[device]:
+            if slave.parent != device:
+                slaves_to_move.add (slave)
+        
+        for slave in slaves_to_move:
+            self.UndoMoveDeviceCmd (slave)
+        
+        # Now undo any devices that have been moved away from this master
+        
+        for slave in device.children:
+            self.UndoMoveDeviceCmd (slave)
+    
+    def DeleteDeviceCmd (self, device):
+        
+        with self.Transaction ():
+            self.DetachAllSlavesFromDeviceCmd (device)
+            self.all_deletions.add (device)
+            # the children no longer need explicit float commands
+            self.Update ([device] + list (device.children))
+    
+    def RemoveDevicesCmd (self, devices):
+        
+        """Detach each slave and delete each master in devices, in one go."""
+        
+        with self.Transaction ():
+            for device in devices:
+                if device.__class__ == SlaveDevice:
+                    self.DetachDeviceCmd (device)
+                else:
+                    self.DeleteDeviceCmd (device)
+    
+    def UndoDeleteDeviceCmd (self, device):
+        
+        self.all_deletions.remove (device)
+        self.Update ([device] + list (device.children))
+    
+    def Reconcile (self, masters, floating = (), prune = False):
+        
+        """Plan the fewest changes that turn the hierarchy into a target one.
+        
+        masters maps the names masters were created with (see
+        master_base_name) to the slaves that should end up on them, and
+        floating lists the slaves that should end up floating. Existing and
+        pending masters are reused by name, and a master pending deletion
+        that the target wants is kept after all; only missing ones are
+        created. Slaves that are already where the target has them get no
+        commands, and their pending moves are dropped. With prune set,
+        masters not in the target are removed, except the virtual core one.
+        Slaves the target doesn't mention stay where they are, unless their
+        master is removed.
+        
+        Unlike the *Cmd methods, this works on all_moves, all_creations and
+        all_deletions directly, and then updates every affected device once.
+        
+        """
+        
+        existing = {}
+        for master in self.master_devices.values ():
+            if master != self.floating_group:
+                existing[master_base_name (master)] = master
+        for master in self.all_creations:
+            existing[master.name] = master
+        
+        changed = []
+        destinations = collections.OrderedDict ()
+        dropped = [] # pending masters that are no longer wanted
+        
+        def set_destination (slave, master):
+            if destinations.get (slave, master) != master:
+                raise PlanError ('"'+slave.name+'" can only go to one place')
+            destinations[slave] = master
+        
+        for name in sorted (masters):
+            master = existing.get (name)
+            if master is None:
+                master = PendingDevice (name)
+                self.all_creations.add (master)
+                self.display_heirarchy[master] = DeviceList ()
+                changed.append (master)
+            elif master in self.all_deletions:
+                self.all_deletions.remove (master)
+                changed.append (master)
+                changed.extend (master.children)
+            for slave in masters[name]:
+                set_destination (slave, master)
+        
+        for slave in floating:
+            set_destination (slave, self.floating_group)
+        
+        if prune:
+            for name, master in existing.iteritems ():
+                # the virtual core master can't be removed
+                if name in masters or name == CORE_MASTER_NAME:
+                    continue
+                if master in self.all_creations:
+                    # its slaves never left their old masters, so that's
+                    # the cheapest place for them to stay
+                    for slave in self.display_heirarchy[master]:
+                        destinations.setdefault (slave, slave.parent)
+                    self.all_creations.remove (master)
+                    dropped.append (master)
+                else:
+                    for slave in self.display_heirarchy[master]:
+                        destinations.setdefault (slave, self.floating_group)
+                    if master not in self.all_deletions:
+                        self.all_deletions.add (master)
+                        changed.extend (master.children)
+                changed.append (master)
+        
+        for slave, master in destinations.iteritems ():
+            if master == slave.parent:
+                if self.all_moves.pop (slave, None) is None:
+                    continue # already in place
+            elif self.all_moves.get (slave) != master:
+                self.all_moves[slave] = master
+            else:
+                continue # already planned
+            master.expanded = True
+            changed.append (slave)
+        
+        with self.Transaction ():
+            self.Update (changed)
+        
+        # only now that their slaves have been moved off them
+        for master in dropped:
+            del self.display_heirarchy[master]
+    
+    def ForgetDevice (self, device):
+        
+        """Drop a device that has disappeared from the X server.
+        
+        Its pending changes and commands go with it. Front-ends extend this
+        to remove its widgets as well.
+        
+        """
+        
+        self.all_moves.pop (device, None)
+        self.all_deletions.discard (device)
+        self.transaction_devices.pop (device, None)
+        
+        self.SetDeviceCommands (device, [])
+        
+        dest_device = self.display_parent.pop (device, None)
+        if dest_device is not None:
+            self.display_heirarchy[dest_device].remove (device)
+        self.display_heirarchy.pop (device, None)
+    
+    def MergeDeviceStatus (self, new_master_devices):
+        
+        """Fold a fresh get_device_status result into the current state.
+        
+        Unlike Load, this keeps pending changes. Devices that are still
+        there (same ID and name) keep their existing objects, and with them
+        their pending changes. Devices that appeared are added, and devices
+        that vanished are removed along with any pending changes involving
+        them. Only the devices that differ are redisplayed.
+        
+        """
+        
+        if self.master_devices is None:
+            return # the first scan hasn't finished, and will include these
+        
+        old_slaves = {}
+        for master in self.master_devices.values ():
+            for slave in master.children:
+                old_slaves[slave.self_id] = slave
+        
+        # match up the masters first
+        merged = {}
+        added_masters = []
+        for master_id, new_master in new_master_devices.iteritems ():
+            master = self.master_devices.get (master_id)
+            if master is None or master.name != new_master.name:
+                master = new_master
+                added_masters.append (master)
+            merged[master_id] = master
+        
+        removed_masters = set (master for master in self.master_devices.values () if merged.get (master.self_id) is not master)
+        
+        # then the slaves, which get attached to the matched masters
+        kept_slaves = set ()
+        changed_slaves = []
+        children = {}
+        for master_id, new_master in new_master_devices.iteritems ():
+            master = merged[master_id]
+            children[master] = DeviceList ()
+            for new_slave in new_master.children:
+                slave = old_slaves.get (new_slave.self_id)
+                if slave is None or slave.name != new_slave.name:
+                    slave = new_slave
+                    changed_slaves.append (slave)
+                else:
+                    kept_slaves.add (slave)
+                    if slave.parent != master: # changed outside of xinput-ui
+                        changed_slaves.append (slave)
+                slave.parent = master
+                children[master].add (slave)
+        
+        for master, slaves in children.iteritems ():
+            master.children = slaves
+        
+        removed_slaves = [old_slave for old_slave in old_slaves.values () if old_slave not in kept_slaves]
+        
+        self.master_devices = merged
+        
+        with self.Transaction ():
+            
+            for slave in removed_slaves:
+                self.ForgetDevice (slave)
+            
+            # drop moves that have become impossible or pointless
+            dropped_moves = False
+            for slave, dest_device in self.all_moves.items ():
+                if dest_device in removed_masters or dest_device == slave.parent:
+                    del self.all_moves[slave]
+                    changed_slaves.append (slave)
+                    dropped_moves = True
+            
+            for master in device_sort (added_masters):
+                self.display_heirarchy[master] = DeviceList ()
+                self.Update ([master])
+            
+            self.Update (changed_slaves)
+            
+            for master in removed_masters:
+                self.ForgetDevice (master)
+            
+            # the history may refer to devices that are gone, or to moves
+            # that no longer make sense
+            if len (removed_slaves) or len (removed_masters) or dropped_moves:
+                self.ClearHistory ()
+    
+    def CanRemove (self, device):
+        
+        """Whether a device can be deleted (masters) or detached (slaves.)"""
+        
+        if device in self.all_deletions or device in self.all_creations or device == self.floating_group:
+            return False
+        
+        elif device.__class__ != SlaveDevice:
+            # the server refuses to remove the virtual core master
+            return master_base_name (device) != CORE_MASTER_NAME
+        
+        else:
+            return self.display_parent.get (device) != self.floating_group
@@ -0,0 +1,267 @@
+# xinput-ui: saving and restoring MPX layouts.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Named profiles: MPX layouts saved to disk and restored later.
+
+X device IDs are handed out afresh every time a device appears, so a profile
+can't refer to slaves by self_id. Instead each slave is saved with every
+stable identity that could be found for it:
+
+by_path     --  Its link in /dev/input/by-path, which names the port it's
+                plugged into. This tells identical mice apart.
+by_id       --  Its link in /dev/input/by-id, which is made from the vendor,
+                product and serial number.
+name        --  Its X device name, together with
+ordinal     --  its position among the slaves of the same name, by ID.
+
+The first two need the device node, which is only available over XInput2;
+with the xinput fallback, slaves are matched by name and ordinal alone.
+
+Masters are saved by the name they were created with, e.g. "Virtual core"
+for "Virtual core pointer".
+
+"""
+
+import errno
+import json
+import os
+
+from xinputui.devices import device_sort, get_xi2_display, master_base_name
+
+PROFILE_VERSION = 1
+
+# the kinds of identity DeviceIndex tries, best first
+IDENTITY_KEYS = ("by_path", "by_id", "name")
+
+class ProfileError (Exception):
+    
+    """Raised when a profile can't be read, written or found."""
+
+def profile_dir ():
+    
+    """Where profiles are stored, following the XDG base directory spec."""
+    
+    config_home = os.environ.get ("XDG_CONFIG_HOME") or os.path.expanduser ("~/.config")
+    return os.path.join (config_home, "xinput-ui", "profiles")
+
+def profile_path (name):
+    
+    if not len (name) or "/" in name or name.startswith ("."):
+        raise ProfileError ("Invalid profile name: "+repr (name))
+    return os.path.join (profile_dir (), name+".json")
+
+def list_profiles ():
+    
+    try:
+        files = os.listdir (profile_dir ())
+    except OSError:
+        return []
+    return sorted (f[:-len (".json")] for f in files if f.endswith (".json"))
+
+def _from_json (value):
+    
+    """json gives back unicode; the rest of xinput-ui uses UTF-8 strs."""
+    
+    if isinstance (value, unicode):
+        return value.encode ("utf-8")
+    if isinstance (value, list):
+        return [_from_json (item) for item in value]
+    if isinstance (value, dict):
+        return {_from_json (key): _from_json (item) for key, item in value.iteritems ()}
+    return value
+
+def load_profile (name):
+    
+    try:
+        with open (profile_path (name)) as f:
+            profile = _from_json (json.load (f))
+    except IOError as e:
+        if e.errno == errno.ENOENT:
+            raise ProfileError ("No such profile: "+name)
+        raise ProfileError (str (e))
+    except ValueError as e:
+        raise ProfileError (name+": "+str (e))
+    
+    if profile.get ("version") != PROFILE_VERSION:
+        raise ProfileError (name+": unsupported profile version")
+    return profile
+
+def save_profile (name, profile):
+    
+    """Write a profile atomically, so a crash never leaves half of one."""
+    
+    path = profile_path (name)
+    try:
+        if not os.path.isdir (profile_dir ()):
+            os.makedirs (profile_dir ())
+        with open (path+".tmp", "w") as f:
+            json.dump (profile, f, indent = 1, sort_keys = True)
+        os.rename (path+".tmp", path)
+    except (IOError, OSError) as e:
+        raise ProfileError (str (e))
+
+def _read_links (directory):
+    
+    """Returns {resolved device node: link name} for a /dev/input/by-* dir."""
+    
+    ret = {}
+    try:
+        names = os.listdir (directory)
+    except OSError:
+        return ret
+    for name in names:
+        ret[os.path.realpath (os.path.join (directory, name))] = name
+    return ret
+
+def get_slave_identities (master_devices, device_nodes = None, display_name = None):
+    
+    """Work out the stable identity of every slave, in one pass.
+    
+    Returns {SlaveDevice: identity}, where identity is a dict with the keys
+    described at the top of this module (by_path and by_id only where
+    known.) device_nodes maps device IDs to device nodes; by default it's
+    read over XInput2, if available, from display_name, which has to be
+    the display master_devices came from.
+    
+    """
+    
+    if device_nodes is None:
+        display = get_xi2_display (display_name)
+        device_nodes = display.get_device_nodes () if display is not None else {}
+    
+    by_id = {}
+    by_path = {}
+    if len (device_nodes):
+        by_id = _read_links ("/dev/input/by-id")
+        by_path = _read_links ("/dev/input/by-path")
+    
+    slaves = []
+    for master in master_devices.values ():
+        slaves.extend (master.children)
+    
+    ret = {}
+    ordinals = {}
+    for slave in device_sort (slaves):
+        ordinal = ordinals.get (slave.name, 0)
+        ordinals[slave.name] = ordinal + 1
+        identity = {"name": slave.name, "ordinal": ordinal}
+        node = device_nodes.get (slave.self_id)
+        if node is not None:
+            node = os.path.realpath (node)
+            if node in by_id:
+                identity["by_id"] = by_id[node]
+            if node in by_path:
+                identity["by_path"] = by_path[node]
+        ret[slave] = identity
+    
+    return ret
+
+def _identity_key (kind, identity):
+    
+    if kind == "name":
+        return (identity["name"], identity.get ("ordinal", 0))
+    return identity.get (kind)
+
+class DeviceIndex:
+    
+    """Resolves saved identities against the devices that exist right now.
+    
+    Built once from the slaves' identities (see get_slave_identities), after
+    which every lookup is a dictionary access. Each slave is handed out at
+    most once, so two profile entries can't claim the same device.
+    
+    """
+    
+    def __init__ (self, identities):
+        
+        # kind -> key -> slave. A by_id shared by several slaves (identical
+        # devices without serial numbers) says nothing, so those are dropped.
+        self.slaves = {kind: {} for kind in IDENTITY_KEYS}
+        ambiguous = set ()
+        for slave, identity in identities.iteritems ():
+            for kind in IDENTITY_KEYS:
+                key = _identity_key (kind, identity)
+                if key is None:
+                    continue
+                if key in self.slaves[kind]:
+                    ambiguous.add ((kind, key))
+                self.slaves[kind][key] = slave
+        for kind, key in ambiguous:
+            del self.slaves[kind][key]
+        
+        self.claimed = set ()
+    
+    def find_slave (self, identity):
+        
+        """The slave a saved identity refers to, or None."""
+        
+        for kind in IDENTITY_KEYS:
+            key = _identity_key (kind, identity)
+            if key is None:
+                continue
+            slave = self.slaves[kind].get (key)
+            if slave is not None and slave not in self.claimed:
+                self.claimed.add (slave)
+                return slave
+        return None
+
+def capture_profile (plan, identities):
+    
+    """Make a profile of the layout plan currently shows.
+    
+    That's the current layout plus any pending moves. Masters that are
+    pending deletion or creation are left out.
+    
+    """
+    
+    masters = {}
+    floating = []
+    
+    for master, slaves in plan.display_heirarchy.iteritems ():
+        if master in plan.all_deletions or master in plan.all_creations:
+            continue
+        entries = [identities[slave] for slave in slaves]
+        if master == plan.floating_group:
+            floating = entries
+        else:
+            masters[master_base_name (master)] = entries
+    
+    return {"version": PROFILE_VERSION, "masters": masters, "floating": floating}
+
+def restore_profile (plan, profile, identities, prune = False):
+    
+    """Plan the changes that bring the current layout in line with profile.
+    
+    Resolves the profile's slaves with a DeviceIndex and hands the result
+    to Plan.Reconcile, so only the devices that aren't where the profile
+    has them get commands. Missing masters are created; with prune set,
+    masters that aren't in the profile are removed, otherwise they're left
+    alone, as are slaves the profile doesn't mention.
+    
+    Returns the identities that didn't match any device.
+    
+    """
+    
+    index = DeviceIndex (identities)
+    missing = []
+    
+    def resolve (entries):
+        slaves = []
+        for identity in entries:
+            slave = index.find_slave (identity)
+            if slave is None:
+                missing.append (identity)
+            else:
+                slaves.append (slave)
+        return slaves
+    
+    masters = {}
+    for name, entries in profile["masters"].iteritems ():
+        masters[name] = resolve (entries)
+    floating = resolve (profile["floating"])
+    
+    plan.Reconcile (masters, floating, prune)
+    
+    return missing
@@ -0,0 +1,204 @@
+# xinput-ui: device properties.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Reading, caching and writing device properties.
+
+A device's properties (acceleration, button mapping, "Device Enabled" and
+so on) are only read when somebody wants to see them, and then kept in a
+PropertyCache per display until they change: XI_PropertyEvent says when,
+see activity.PROPERTY_EVENTS. Edits are written in batches, so that setting
+the acceleration of thirty mice is one XI2 round trip rather than thirty
+runs of "xinput set-prop".
+
+Property values are lists of strings, the way "xinput list-props" shows
+them but without the quotes around strings and atom names.
+
+"""
+
+import re
+import threading
+
+from xinputui import timing
+from xinputui.commands import CommandExecutor
+from xinputui.devices import get_xi2_display, get_xinput_path, run_command
+
+# Matches one property in "xinput list-props" output, for example
+# "\tlibinput Accel Speed (290):\t0.000000"
+PROPERTY_LINE_RE = re.compile (r'^\s+(.+?) \((\d+)\):\s*(.*?)\s*$')
+
+# Matches one item of a property's value: a quoted string or atom name,
+# which may be followed by the atom's number, or anything up to a comma
+PROPERTY_VALUE_RE = re.compile (r'"([^"]*)"(?: \(\d+\))?|([^,\s][^,]*)')
+
+class DeviceProperty:
+    
+    """One property of a device.
+    
+    Attributes:
+    name        --  The property's name, e.g. "libinput Accel Speed".
+    prop_id     --  Its atom, which only means something on the same server.
+    values      --  Its value, as a list of strings.
+    
+    """
+    
+    def __init__ (self, name, prop_id, values):
+        self.name = name
+        self.prop_id = prop_id
+        self.values = values
+    
+    def text (self):
+        return format_property_values (self.values)
+
+def parse_property_values (text):
+    
+    """Split a property value as xinput shows it, or as typed, into items."""
+    
+    text = text.strip ()
+    if text == "<no items>":
+        return []
+    return [match.group (1) if match.group (1) is not None else match.group (2).strip ()
+            for match in PROPERTY_VALUE_RE.finditer (text)]
+
+def format_property_values (values):
+    
+    """The opposite of parse_property_values."""
+    
+    if not len (values):
+        return "<no items>"
+    return ", ".join ('"'+value+'"' if "," in value else value for value in values)
+
+def parse_list_props (lines):
+    
+    """Parse "xinput list-props" output into DeviceProperty objects."""
+    
+    ret = []
+    for line in lines:
+        match = PROPERTY_LINE_RE.match (line)
+        if match is not None:
+            ret.append (DeviceProperty (match.group (1), int (match.group (2)),
+                                        parse_property_values (match.group (3))))
+    return ret
+
+@timing.timed ("read_properties")
+def read_properties (device_id, display_name = None):
+    
+    """Returns a list of DeviceProperty objects for one device.
+    
+    Over XInput2 where possible, otherwise with "xinput list-props". A
+    device that has gone away has no properties, or raises XI2Error.
+    
+    """
+    
+    display = get_xi2_display (display_name)
+    if display is not None:
+        return [DeviceProperty (*prop) for prop in display.list_properties (device_id)]
+    
+    return parse_list_props (run_command ([get_xinput_path (), "list-props", str (device_id)], display_name))
+
+@timing.timed ("write_properties")
+def write_properties (edits, display_name = None):
+    
+    """Change device properties, as one batch.
+    
+    edits is a list of (device ID, property name, values) tuples. With
+    XInput2 available they're all sent at once by XI2Display.set_properties
+    and None is returned. Otherwise each is an "xinput set-prop" command,
+    run concurrently by a CommandExecutor, and a list of CommandResults is
+    returned.
+    
+    Raises XI2Error if the XI2 batch is refused.
+    
+    """
+    
+    display = get_xi2_display (display_name)
+    if display is not None:
+        display.set_properties (edits)
+        return None
+    
+    commands = [["xinput", "set-prop", str (device_id), name] + values for device_id, name, values in edits]
+    return CommandExecutor (display_name = display_name).run (commands)
+
+class PropertyCache:
+    
+    """The properties of devices read so far, keyed by X device ID.
+    
+    As in DeviceMetadataCache, an entry is only used while the device with
+    that ID still has the same name. Entries stay until invalidate() is
+    called for the device, which should happen whenever an
+    XI_PropertyEvent says it changed. Safe to use from several threads.
+    
+    """
+    
+    def __init__ (self):
+        self.lock = threading.Lock ()
+        self.entries = {} # self_id -> (name, properties)
+        # goes up with every invalidation, so that a read which was already
+        # under way doesn't put back what was just thrown out
+        self.version = 0
+    
+    def get (self, self_id, name):
+        
+        """The cached properties of a device, or None."""
+        
+        with self.lock:
+            entry = self.entries.get (self_id)
+        if entry is None or entry[0] != name:
+            return None
+        return entry[1]
+    
+    def fetch (self, self_id, name, read):
+        
+        """The properties of a device, from the cache or else from read ()."""
+        
+        with self.lock:
+            entry = self.entries.get (self_id)
+            if entry is not None and entry[0] == name:
+                return entry[1]
+            version = self.version
+        
+        properties = read ()
+        
+        with self.lock:
+            if version == self.version:
+                self.entries[self_id] = (name, properties)
+        return properties
+    
+    def invalidate (self, self_ids):
+        
+        with self.lock:
+            self.version += 1
+            for self_id in self_ids:
+                self.entries.pop (self_id, None)
+    
+    def clear (self):
+        
+        with self.lock:
+            self.version += 1
+            self.entries = {}
+
+_caches_lock = threading.Lock ()
+
+# display name -> its PropertyCache
+_property_caches = {}
+
+def get_property_cache (display_name = None):
+    
+    with _caches_lock:
+        cache = _property_caches.get (display_name)
+        if cache is None:
+            cache = _property_caches[display_name] = PropertyCache ()
+    
+    return cache
+
+def get_properties (device_id, name, display_name = None):
+    
+    """read_properties, through the display's PropertyCache.
+    
+    name is the device's name, which the cache entry has to match.
+    
+    """
+    
+    return get_property_cache (display_name).fetch (
+        device_id, name, lambda: read_properties (device_id, display_name))
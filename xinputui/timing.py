@@ -0,0 +1,252 @@
+# xinput-ui: startup timing.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Startup timing and hot-path instrumentation.
+
+The launcher calls start() before importing anything else, and the rest of
+the program calls mark() as it reaches milestones such as "engine imported"
+or "first paint". Each mark is reported as milliseconds since start() on
+stderr when XINPUT_UI_TIMING is set.
+
+The functions that can be slow run inside a phase(), which counts its calls,
+wall time, and the processes spawned and bytes read while it was running.
+snapshot() and describe() turn that into a line for the status bar, and
+write_trace() saves every phase and mark as a Chrome trace-event file, for
+chrome://tracing or Perfetto. With XINPUT_UI_TRACE=FILE set, the trace is
+written to FILE on exit.
+
+"""
+
+import atexit
+import collections
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+enabled = bool (os.environ.get ("XINPUT_UI_TIMING"))
+
+# (label, seconds since start) for every milestone reached so far
+marks = []
+
+# Trace events older than this many are dropped, so a long session doesn't
+# keep growing.
+MAX_EVENTS = 100000
+
+class PhaseStats:
+    
+    """Running totals for one phase, across all threads.
+    
+    seconds is wall time including nested phases; own_seconds leaves them
+    out, so that e.g. parsing can be told apart from the xinput run it
+    waits for. spawns and bytes_read include those of nested phases.
+    
+    """
+    
+    def __init__ (self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.own_seconds = 0.0
+        self.spawns = 0
+        self.bytes_read = 0
+    
+    def copy (self):
+        ret = PhaseStats ()
+        ret.__dict__.update (self.__dict__)
+        return ret
+
+# phase name -> PhaseStats
+phases = {}
+
+# Processes spawned and bytes read from them, in or out of any phase
+totals = {"spawns": 0, "bytes_read": 0}
+
+# (name, thread ident, start, duration, spawns, bytes_read) per finished
+# phase, oldest first; times are in seconds since start()
+events = collections.deque (maxlen = MAX_EVENTS)
+
+# thread ident -> name, for the trace
+_thread_names = {}
+
+_lock = threading.Lock ()
+
+# the phases open on each thread, innermost last
+_local = threading.local ()
+
+_started = time.time ()
+
+def start (started = None):
+    
+    """Set the time marks are measured from; defaults to now."""
+    
+    global _started
+    
+    _started = time.time () if started is None else started
+
+def mark (label):
+    
+    """Record a milestone. Only the first mark with a given label counts."""
+    
+    for old_label, _ in marks:
+        if old_label == label:
+            return
+    
+    elapsed = time.time () - _started
+    marks.append ((label, elapsed))
+    
+    if enabled:
+        sys.stderr.write ("xinput-ui: %8.1f ms  %s\n" % (elapsed * 1000.0, label))
+
+class phase:
+    
+    """Context manager that times a block as the named phase.
+    
+    Phases may nest; a nested phase's time is taken out of the outer one's
+    own_seconds.
+    
+    """
+    
+    def __init__ (self, name):
+        self.name = name
+    
+    def __enter__ (self):
+        stack = getattr (_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append (self)
+        self.nested = 0.0
+        self.spawns = 0
+        self.bytes_read = 0
+        self.start = time.time ()
+        return self
+    
+    def __exit__ (self, *exc_info):
+        elapsed = time.time () - self.start
+        stack = _local.stack
+        stack.pop ()
+        if len (stack):
+            stack[-1].nested += elapsed
+        
+        thread = threading.current_thread ()
+        with _lock:
+            stats = phases.get (self.name)
+            if stats is None:
+                stats = phases[self.name] = PhaseStats ()
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.own_seconds += elapsed - self.nested
+            stats.spawns += self.spawns
+            stats.bytes_read += self.bytes_read
+            _thread_names[thread.ident] = thread.name
+            events.append ((self.name, thread.ident, self.start - _started, elapsed,
+                            self.spawns, self.bytes_read))
+
+def timed (name):
+    
+    """Decorator that runs every call of a function as the named phase."""
+    
+    def decorate (func):
+        @functools.wraps (func)
+        def wrapper (*args, **kwargs):
+            with phase (name):
+                return func (*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count_spawn (bytes_read):
+    
+    """Record a process spawned, and how much output was read from it.
+    
+    It's counted against every phase open on the calling thread.
+    
+    """
+    
+    for open_phase in getattr (_local, "stack", ()):
+        open_phase.spawns += 1
+        open_phase.bytes_read += bytes_read
+    with _lock:
+        totals["spawns"] += 1
+        totals["bytes_read"] += bytes_read
+
+def snapshot ():
+    
+    """The counters as they are now, to pass to describe() later."""
+    
+    with _lock:
+        return dict ((name, stats.copy ()) for name, stats in phases.iteritems ()), dict (totals)
+
+def describe (since = None):
+    
+    """One line about what the phases have done since a snapshot().
+    
+    Lists the spawns and bytes read, then each phase that ran with its own
+    time (without nested phases), slowest first. With since None, covers
+    everything since the program started.
+    
+    """
+    
+    old_phases, old_totals = since if since is not None else ({}, {})
+    new_phases, new_totals = snapshot ()
+    
+    spawns = new_totals["spawns"] - old_totals.get ("spawns", 0)
+    bytes_read = new_totals["bytes_read"] - old_totals.get ("bytes_read", 0)
+    parts = ["%d spawned, %.1f KB read" % (spawns, bytes_read / 1024.0)]
+    
+    ran = []
+    for name, stats in new_phases.iteritems ():
+        old = old_phases.get (name, PhaseStats ())
+        calls = stats.calls - old.calls
+        if calls:
+            ran.append ((stats.own_seconds - old.own_seconds, calls, name))
+    
+    for seconds, calls, name in sorted (ran, reverse = True):
+        text = "%s %.1f ms" % (name, seconds * 1000.0)
+        if calls > 1:
+            text += " (%dx)" % calls
+        parts.append (text)
+    
+    return "; ".join (parts)
+
+def write_trace (path):
+    
+    """Save every phase and mark as a Chrome trace-event JSON file."""
+    
+    pid = os.getpid ()
+    trace = []
+    
+    with _lock:
+        for name, tid, start, elapsed, spawns, bytes_read in events:
+            trace.append ({
+                "name": name, "cat": "phase", "ph": "X", "pid": pid, "tid": tid,
+                "ts": start * 1e6, "dur": elapsed * 1e6,
+                "args": {"spawns": spawns, "bytes_read": bytes_read},
+            })
+        for tid, thread_name in _thread_names.iteritems ():
+            trace.append ({
+                "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                "args": {"name": thread_name},
+            })
+    
+    main_tid = threading.current_thread ().ident
+    for label, elapsed in marks:
+        trace.append ({
+            "name": label, "cat": "mark", "ph": "i", "s": "p", "pid": pid,
+            "tid": main_tid, "ts": elapsed * 1e6,
+        })
+    
+    with open (path, "w") as f:
+        json.dump ({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+def _write_trace_at_exit ():
+    
+    try:
+        write_trace (os.environ["XINPUT_UI_TRACE"])
+    except (IOError, OSError) as e:
+        sys.stderr.write ("xinput-ui: could not write trace: %s\n" % e)
+
+if os.environ.get ("XINPUT_UI_TRACE"):
+    atexit.register (_write_trace_at_exit)
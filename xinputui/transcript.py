@@ -0,0 +1,159 @@
+# xinput-ui: recording and replaying xinput sessions.
+#
+# Copyright (c) 2013 Max Eliaser
+# Distributed under the same terms as xinput-ui.py; see COPYING.
+
+"""Record every xinput invocation to a transcript, or replay one.
+
+Set XINPUT_UI_RECORD=FILE to append each command that run_command or a
+CommandExecutor runs, together with its output, exit status and timing, to
+FILE. Set XINPUT_UI_REPLAY=FILE to have those commands answered from FILE
+instead of running anything, so that a session captured on one machine can
+be profiled on another with no X server and no input hardware.
+
+Either way XInput2 is not used, since that would bypass xinput.
+
+The transcript has one JSON object per line:
+
+argv        --  The command, with the path of xinput reduced to "xinput".
+display     --  The X display it was run against, if not the default one.
+returncode  --  Its exit status, or null if it couldn't be started.
+output      --  What it wrote to stdout and stderr.
+elapsed     --  How long it took, in seconds.
+started     --  When it was started, in seconds since recording began.
+timed_out   --  Whether it was killed for taking too long.
+
+"""
+
+import json
+import os
+import threading
+import time
+
+class TranscriptEntry:
+    
+    """One recorded command. See the module docstring for the attributes."""
+    
+    def __init__ (self, argv, returncode, output, elapsed, started = 0.0, timed_out = False,
+                  display_name = None):
+        self.argv = argv
+        self.display_name = display_name
+        self.returncode = returncode
+        self.output = output
+        self.elapsed = elapsed
+        self.started = started
+        self.timed_out = timed_out
+
+def normalize_argv (argv):
+    
+    """Make a command line comparable between machines."""
+    
+    if len (argv) and os.path.basename (argv[0]) == "xinput":
+        return ["xinput"] + list (argv[1:])
+    return list (argv)
+
+class TranscriptRecorder:
+    
+    """Appends entries to a transcript file as commands finish.
+    
+    Commands may finish on several threads at once, so writes are locked,
+    and each entry is flushed straight away so that a session that crashes
+    or hangs still leaves a usable transcript behind.
+    
+    """
+    
+    replaying = False
+    
+    def __init__ (self, path):
+        self.lock = threading.Lock ()
+        self.file = open (path, "a")
+        self.start = time.time ()
+    
+    def record (self, argv, returncode, output, elapsed, timed_out = False, display_name = None):
+        entry = {
+            "argv": normalize_argv (argv),
+            "returncode": returncode,
+            "output": output.decode ("utf-8", "replace"),
+            "elapsed": elapsed,
+            "started": time.time () - elapsed - self.start,
+            "timed_out": timed_out,
+        }
+        if display_name is not None:
+            entry["display"] = display_name
+        line = json.dumps (entry)
+        with self.lock:
+            self.file.write (line+"\n")
+            self.file.flush ()
+
+class TranscriptReplayer:
+    
+    """Answers commands from a transcript instead of running them.
+    
+    Entries for the same command line and display are served in the order
+    they were recorded; once they run out, the last one is served again, so
+    a replay can refresh more often than the recording did. A command that
+    was never recorded gets a result as if it couldn't be started.
+    
+    """
+    
+    replaying = True
+    
+    def __init__ (self, path):
+        
+        self.lock = threading.Lock ()
+        
+        # (display, command line) -> entries not served yet, oldest first
+        self.entries = {}
+        
+        with open (path) as f:
+            for line in f:
+                if not len (line.strip ()):
+                    continue
+                data = json.loads (line)
+                display_name = data.get ("display")
+                if display_name is not None:
+                    display_name = display_name.encode ("utf-8")
+                entry = TranscriptEntry (
+                    [arg.encode ("utf-8") for arg in data["argv"]],
+                    data["returncode"], data["output"].encode ("utf-8"),
+                    data["elapsed"], data.get ("started", 0.0),
+                    data.get ("timed_out", False), display_name)
+                self.entries.setdefault ((display_name, tuple (entry.argv)), []).append (entry)
+    
+    def replay (self, argv, display_name = None):
+        
+        """Returns the TranscriptEntry for the next run of argv."""
+        
+        key = (display_name, tuple (normalize_argv (argv)))
+        with self.lock:
+            entries = self.entries.get (key)
+            if not entries:
+                return TranscriptEntry (list (key[1]), None, "not in transcript\n", 0.0,
+                                        display_name = display_name)
+            if len (entries) > 1:
+                return entries.pop (0)
+            return entries[0]
+
+# None until first asked for, False if neither variable is set.
+_transcript = None
+_transcript_lock = threading.Lock ()
+
+def get_transcript ():
+    
+    """The recorder or replayer the environment asks for, or None."""
+    
+    global _transcript
+    
+    # several displays' workers can get here first at once; without the
+    # lock they could each open a recorder, or see no transcript at all
+    # while another was still opening it
+    with _transcript_lock:
+        if _transcript is None:
+            if os.environ.get ("XINPUT_UI_REPLAY"):
+                _transcript = TranscriptReplayer (os.environ["XINPUT_UI_REPLAY"])
+            elif os.environ.get ("XINPUT_UI_RECORD"):
+                _transcript = TranscriptRecorder (os.environ["XINPUT_UI_RECORD"])
+            else:
+                _transcript = False
+    
+    return _transcript or None